@@ -30,6 +30,8 @@ from app.api.routes import (
     upload,
     bulk_operations,
     analytics,
+    imports,
+    lookups,
 )
 
 # Export bulk_router for registration
@@ -127,3 +129,15 @@ api_router.include_router(
     prefix="/analytics",
     tags=["Analytics"],
 )
+
+api_router.include_router(
+    imports.router,
+    prefix="/imports",
+    tags=["Imports"],
+)
+
+api_router.include_router(
+    lookups.router,
+    prefix="/lookups",
+    tags=["Lookups"],
+)
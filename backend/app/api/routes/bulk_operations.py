@@ -1,19 +1,135 @@
 """Bulk operations API routes."""
 
-from fastapi import APIRouter, Depends, HTTPException
+import os
+import shutil
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.core.database import get_db
 from app.api.dependencies import require_permission
 from app.models.employee import Employee
+from app.models.employee_language import EmployeeLanguage
+from app.models.employee_document import EmployeeDocument
+from app.models.employee_warning import EmployeeWarning
+from app.models.employee_warning_document import EmployeeWarningDocument
+from app.models.general_item_employee_balance import GeneralItemEmployeeBalance
+from app.models.restricted_item_employee_balance import RestrictedItemEmployeeBalance
 
 router = APIRouter()
 
 
+def _employee_upload_root() -> str:
+    # backend/app/api/routes -> project root
+    base = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+    return os.path.join(base, "uploads", "employees")
+
+
+def remove_employee_files(paths: List[str], employee_db_ids: List[int]) -> None:
+    """Best-effort removal of attachment files and per-employee upload folders."""
+
+    for p in paths:
+        try:
+            if p and os.path.exists(p):
+                os.remove(p)
+        except Exception:
+            pass
+
+    root = _employee_upload_root()
+    for emp_db_id in employee_db_ids:
+        d = os.path.join(root, str(int(emp_db_id)))
+        try:
+            if os.path.isdir(d):
+                shutil.rmtree(d, ignore_errors=True)
+        except Exception:
+            pass
+
+
+def delete_employees_bulk(db: Session, employee_ids: List[str]) -> tuple[dict, List[str], List[int]]:
+    """Delete employees and their dependent rows with set-based statements.
+
+    Runs in the caller's transaction (committed here) and returns
+    ``(summary, file_paths, employee_db_ids)`` so the caller can schedule
+    file cleanup after the response.
+    """
+
+    rows = db.query(Employee.id, Employee.employee_id).filter(Employee.employee_id.in_(employee_ids)).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="No employees found with provided IDs")
+
+    db_ids = [int(r[0]) for r in rows]
+    found_ids = [str(r[1]) for r in rows]
+    missing_ids = sorted(set(employee_ids) - set(found_ids))
+
+    warning_ids = db.query(EmployeeWarning.id).filter(EmployeeWarning.employee_db_id.in_(db_ids))
+
+    doc_paths = [r[0] for r in db.query(EmployeeDocument.path).filter(EmployeeDocument.employee_db_id.in_(db_ids)).all()]
+    warning_doc_paths = [
+        r[0]
+        for r in db.query(EmployeeWarningDocument.path)
+        .filter(EmployeeWarningDocument.warning_id.in_(warning_ids))
+        .all()
+    ]
+
+    removed: dict[str, int] = {}
+    try:
+        removed["warning_documents"] = (
+            db.query(EmployeeWarningDocument)
+            .filter(EmployeeWarningDocument.warning_id.in_(warning_ids))
+            .delete(synchronize_session=False)
+        )
+        removed["warnings"] = (
+            db.query(EmployeeWarning)
+            .filter(EmployeeWarning.employee_db_id.in_(db_ids))
+            .delete(synchronize_session=False)
+        )
+        removed["languages"] = (
+            db.query(EmployeeLanguage)
+            .filter(EmployeeLanguage.employee_db_id.in_(db_ids))
+            .delete(synchronize_session=False)
+        )
+        removed["documents"] = (
+            db.query(EmployeeDocument)
+            .filter(EmployeeDocument.employee_db_id.in_(db_ids))
+            .delete(synchronize_session=False)
+        )
+        removed["general_item_balances"] = (
+            db.query(GeneralItemEmployeeBalance)
+            .filter(GeneralItemEmployeeBalance.employee_id.in_(found_ids))
+            .delete(synchronize_session=False)
+        )
+        removed["restricted_item_balances"] = (
+            db.query(RestrictedItemEmployeeBalance)
+            .filter(RestrictedItemEmployeeBalance.employee_id.in_(found_ids))
+            .delete(synchronize_session=False)
+        )
+        removed["employees"] = (
+            db.query(Employee)
+            .filter(Employee.id.in_(db_ids))
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Bulk delete failed: {e}") from e
+
+    result = {
+        "message": f"Successfully deleted {removed['employees']} employee(s)",
+        "deleted_count": removed["employees"],
+        "deleted_ids": found_ids,
+        "removed": removed,
+    }
+    if missing_ids:
+        result["warning"] = f"Could not find {len(missing_ids)} employee(s): {', '.join(missing_ids)}"
+
+    return result, doc_paths + warning_doc_paths, db_ids
+
+
 @router.post("/employees/delete")
 async def bulk_delete_employees(
     employee_ids: List[str],
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     _user=Depends(require_permission("employees:delete")),
 ):
@@ -21,35 +137,14 @@ async def bulk_delete_employees(
     
     if not employee_ids:
         raise HTTPException(status_code=400, detail="No employee IDs provided")
-    
-    # Find all employees to delete
-    employees = db.query(Employee).filter(Employee.employee_id.in_(employee_ids)).all()
-    
-    if not employees:
-        raise HTTPException(status_code=404, detail="No employees found with provided IDs")
-    
-    found_ids = {emp.employee_id for emp in employees}
-    missing_ids = set(employee_ids) - found_ids
-    
-    # Delete found employees
-    for employee in employees:
-        db.delete(employee)
-    
-    db.commit()
-    
-    result = {
-        "message": f"Successfully deleted {len(employees)} employee(s)",
-        "deleted_count": len(employees),
-        "deleted_ids": list(found_ids)
-    }
-    
-    if missing_ids:
-        result["warning"] = f"Could not find {len(missing_ids)} employee(s): {', '.join(missing_ids)}"
-    
+
+    result, paths, db_ids = delete_employees_bulk(db, employee_ids)
+    background_tasks.add_task(remove_employee_files, paths, db_ids)
+    result["files_scheduled_for_removal"] = len(paths)
     return result
 
 
 @router.get("/test")
 async def test_bulk_operations():
     """Test endpoint to verify bulk operations API is working."""
-    return {"message": "Bulk operations API is working"}
\ No newline at end of file
+    return {"message": "Bulk operations API is working"}
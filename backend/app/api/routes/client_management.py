@@ -1,18 +1,39 @@
-import json
+import hashlib
 import os
 import uuid
-from datetime import date, datetime
-from typing import List, Optional
-
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Iterator, List, Optional
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, Response, UploadFile
 from fastapi.responses import StreamingResponse
 from fpdf import FPDF
-from sqlalchemy import and_, or_
-from sqlalchemy.orm import Session
-
+from sqlalchemy import and_, case, func, literal, or_, select, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased, selectinload
+
+from app.core.allocations import (
+    CONTRACT_STATUSES,
+    SITE_STATUSES,
+    busy_clause,
+    check_batch,
+    find_conflict,
+    free_guards,
+    keeps_allocation,
+)
+from app.core.cache import cached, mark_tables_changed, table_version
+from app.core.coverage import compute_coverage
 from app.core.database import get_db
+from app.core.invoicing import run_monthly_invoicing
+from app.core.profitability import TABLES as PROFITABILITY_TABLES, compute_profitability
+from app.core.sequences import next_value
 from app.api.dependencies import require_permission
+from app.api.routes.payroll import build_payroll_report
 from app.models.employee import Employee
+from app.models.employee_language import EmployeeLanguage
 from app.models.client import Client
 from app.models.client_address import ClientAddress
 from app.models.client_contact import ClientContact
@@ -24,6 +45,8 @@ from app.models.client_invoice import ClientInvoice
 from app.models.client_rate_card import ClientRateCard
 from app.models.client_site import ClientSite
 from app.schemas.client_management import (
+    AllocationBatchCheck,
+    AllocationConflictOut,
     ClientAddressCreate,
     ClientAddressOut,
     ClientAddressUpdate,
@@ -107,7 +130,7 @@ def _client_public_url(client_id: int, abs_path: str) -> str:
 
 
 def _parse_invoice_number(invoice_number: str) -> dict:
-    # expected: INV-{client_id}-{site_id}-{requirement_id}-{timestamp}
+    # expected: INV-{client_id}-{site_id}-{requirement_id}-{seq} (older rows end in a timestamp)
     try:
         parts = str(invoice_number or "").split("-")
         if len(parts) < 5 or parts[0] != "INV":
@@ -121,6 +144,12 @@ def _parse_invoice_number(invoice_number: str) -> dict:
         return {}
 
 
+def _next_invoice_number(db: Session, *, client_id: int, site_id: int, requirement_id: int) -> str:
+    # INV-{client_id}-{site_id}-{requirement_id}-{seq}; seq is global so numbers never collide
+    n = next_value(db, "client_invoice")
+    return f"INV-{client_id}-{site_id}-{requirement_id}-{n:06d}"
+
+
 def _pdf_new_document() -> FPDF:
     pdf = FPDF()
     pdf.set_auto_page_break(auto=True, margin=14)
@@ -137,52 +166,6 @@ def _pdf_text(pdf: FPDF, text: str, bold: bool = False, size: int = 10, ln: bool
         pdf.ln(1)
 
 
-def _parse_json_list(v: Optional[str]) -> list:
-    if not v:
-        return []
-    try:
-        parsed = json.loads(v)
-        return parsed if isinstance(parsed, list) else []
-    except Exception:
-        return []
-
-
-def _employee_languages(e: Employee) -> list[str]:
-    out: list[str] = []
-    for x in _parse_json_list(getattr(e, "languages_spoken", None)):
-        if x is None:
-            continue
-        s = str(x).strip()
-        if s:
-            out.append(s)
-
-    for x in _parse_json_list(getattr(e, "languages_proficiency", None)):
-        if isinstance(x, dict):
-            lang = str(x.get("language") or "").strip()
-            if lang:
-                out.append(lang)
-
-    # dedupe while keeping order
-    seen = set()
-    uniq: list[str] = []
-    for s in out:
-        k = s.lower()
-        if k in seen:
-            continue
-        seen.add(k)
-        uniq.append(s)
-    return uniq
-
-
-def _ranges_overlap(a_start: Optional[date], a_end: Optional[date], b_start: Optional[date], b_end: Optional[date]) -> bool:
-    # Treat None as open-ended
-    left_start = a_start or date.min
-    left_end = a_end or date.max
-    right_start = b_start or date.min
-    right_end = b_end or date.max
-    return left_start <= right_end and right_start <= left_end
-
-
 def _get_client(db: Session, client_id: int) -> Client:
     c = db.query(Client).filter(Client.id == client_id).first()
     if not c:
@@ -207,18 +190,88 @@ async def create_client(payload: ClientCreate, db: Session = Depends(get_db)) ->
     return c
 
 
+_CLIENT_DETAIL_SECTIONS = {
+    "contacts": ClientContact,
+    "addresses": ClientAddress,
+    "sites": ClientSite,
+    "contracts": ClientContract,
+    "rate_cards": ClientRateCard,
+    "invoices": ClientInvoice,
+    "documents": ClientDocument,
+}
+
+
+def _parse_include(include: Optional[str]) -> List[str]:
+    if include is None or not include.strip():
+        return list(_CLIENT_DETAIL_SECTIONS.keys())
+    wanted = [p.strip().lower() for p in include.split(",") if p.strip()]
+    unknown = [p for p in wanted if p not in _CLIENT_DETAIL_SECTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include section(s): {', '.join(unknown)}. Use: {', '.join(_CLIENT_DETAIL_SECTIONS)}",
+        )
+    return [k for k in _CLIENT_DETAIL_SECTIONS if k in wanted]
+
+
+def _client_detail_etag(db: Session, client_id: int, sections: List[str]) -> Optional[str]:
+    # One UNION ALL round-trip: latest change + row count per table (counts catch deletes).
+    parts = [
+        select(
+            literal("client"),
+            func.max(func.coalesce(Client.updated_at, Client.created_at)),
+            func.count(Client.id),
+        ).where(Client.id == client_id)
+    ]
+    for name in sections:
+        model = _CLIENT_DETAIL_SECTIONS[name]
+        parts.append(
+            select(
+                literal(name),
+                func.max(func.coalesce(model.updated_at, model.created_at)),
+                func.count(model.id),
+            ).where(model.client_id == client_id)
+        )
+    rows = db.execute(union_all(*parts)).all()
+    if not any(r[0] == "client" and int(r[2] or 0) > 0 for r in rows):
+        return None
+    sig = "|".join(f"{r[0]}:{r[1]}:{r[2]}" for r in sorted(rows, key=lambda r: str(r[0])))
+    # updated_at has one-second resolution on SQLite; the in-process write versions
+    # catch edits that land within the same second.
+    tables = ["clients"] + [_CLIENT_DETAIL_SECTIONS[n].__tablename__ for n in sections]
+    sig += "|" + ",".join(str(table_version(t)) for t in tables)
+    return '"' + hashlib.sha1(f"{client_id}|{sig}".encode("utf-8")).hexdigest() + '"'
+
+
 @router.get("/clients/{client_id}", response_model=ClientDetailOut)
-async def get_client(client_id: int, db: Session = Depends(get_db)) -> ClientDetailOut:
-    c = _get_client(db, client_id)
+async def get_client(
+    client_id: int,
+    request: Request,
+    response: Response,
+    include: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Client with its child sections, loaded with one selectin query per requested section.
 
-    contacts = db.query(ClientContact).filter(ClientContact.client_id == client_id).order_by(ClientContact.id.desc()).all()
-    addresses = db.query(ClientAddress).filter(ClientAddress.client_id == client_id).order_by(ClientAddress.id.desc()).all()
-    sites = db.query(ClientSite).filter(ClientSite.client_id == client_id).order_by(ClientSite.id.desc()).all()
-    contracts = db.query(ClientContract).filter(ClientContract.client_id == client_id).order_by(ClientContract.id.desc()).all()
-    rate_cards = db.query(ClientRateCard).filter(ClientRateCard.client_id == client_id).order_by(ClientRateCard.id.desc()).all()
-    invoices = db.query(ClientInvoice).filter(ClientInvoice.client_id == client_id).order_by(ClientInvoice.id.desc()).all()
-    documents = db.query(ClientDocument).filter(ClientDocument.client_id == client_id).order_by(ClientDocument.id.desc()).all()
+    include: comma-separated subset of contacts,addresses,sites,contracts,rate_cards,invoices,documents
+    (default: all). Responses carry an ETag; a matching If-None-Match returns 304.
+    """
+    sections = _parse_include(include)
+
+    etag = _client_detail_etag(db, client_id, sections)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Client not found")
+    if etag in [t.strip() for t in (request.headers.get("if-none-match") or "").split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    q = db.query(Client).filter(Client.id == client_id)
+    for name in sections:
+        q = q.options(selectinload(getattr(Client, name)))
+    c = q.first()
+    if not c:
+        raise HTTPException(status_code=404, detail="Client not found")
 
+    response.headers["ETag"] = etag
     return ClientDetailOut(
         id=c.id,
         client_code=c.client_code,
@@ -236,13 +289,8 @@ async def get_client(client_id: int, db: Session = Depends(get_db)) -> ClientDet
         notes=c.notes,
         created_at=c.created_at,
         updated_at=c.updated_at,
-        contacts=contacts,
-        addresses=addresses,
-        sites=sites,
-        contracts=contracts,
-        rate_cards=rate_cards,
-        invoices=invoices,
-        documents=documents,
+        included=sections,
+        **{name: getattr(c, name) for name in sections},
     )
 
 
@@ -491,18 +539,19 @@ async def update_contract(
     # If contract is ended, release all allocated guards
     new_status = upd.get("status", prev_status)
     if prev_status != "Ended" and new_status == "Ended":
-        allocations = (
-            db.query(ClientSiteGuardAllocation)
-            .filter(ClientSiteGuardAllocation.contract_id == contract_id)
-            .filter(ClientSiteGuardAllocation.status == "Active")
-            .all()
+        active = (
+            select(ClientSiteGuardAllocation.employee_db_id)
+            .where(ClientSiteGuardAllocation.contract_id == contract_id)
+            .where(ClientSiteGuardAllocation.status == "Active")
         )
-        for alloc in allocations:
-            alloc.status = "Released"
-            # Update employee status to Free
-            emp = db.query(Employee2).filter(Employee2.id == alloc.employee_db_id).first()
-            if emp:
-                emp.allocation_status = "Free"
+        # Update employee status to Free, unless still allocated on another contract
+        db.query(Employee2).filter(
+            Employee2.id.in_(active),
+            ~keeps_allocation(Employee2.id, CONTRACT_STATUSES, exclude_contract_id=contract_id),
+        ).update({Employee2.allocation_status: "Free"}, synchronize_session=False)
+        db.query(ClientSiteGuardAllocation).filter(ClientSiteGuardAllocation.contract_id == contract_id).filter(
+            ClientSiteGuardAllocation.status == "Active"
+        ).update({ClientSiteGuardAllocation.status: "Released"}, synchronize_session=False)
     
     db.commit()
     db.refresh(row)
@@ -519,16 +568,14 @@ async def delete_contract(client_id: int, contract_id: int, db: Session = Depend
         raise HTTPException(status_code=404, detail="Contract not found")
     
     # Release all allocated guards before deleting
-    allocations = (
-        db.query(ClientSiteGuardAllocation)
-        .filter(ClientSiteGuardAllocation.contract_id == contract_id)
-        .all()
+    allocated = select(ClientSiteGuardAllocation.employee_db_id).where(ClientSiteGuardAllocation.contract_id == contract_id)
+    db.query(Employee2).filter(
+        Employee2.id.in_(allocated),
+        ~keeps_allocation(Employee2.id, CONTRACT_STATUSES, exclude_contract_id=contract_id),
+    ).update({Employee2.allocation_status: "Free"}, synchronize_session=False)
+    db.query(ClientSiteGuardAllocation).filter(ClientSiteGuardAllocation.contract_id == contract_id).delete(
+        synchronize_session=False
     )
-    for alloc in allocations:
-        emp = db.query(Employee2).filter(Employee2.id == alloc.employee_db_id).first()
-        if emp:
-            emp.allocation_status = "Free"
-        db.delete(alloc)
     
     db.delete(row)
     db.commit()
@@ -582,50 +629,79 @@ async def list_invoices(client_id: int, db: Session = Depends(get_db)) -> List[C
     return db.query(ClientInvoice).filter(ClientInvoice.client_id == client_id).order_by(ClientInvoice.id.desc()).all()
 
 
-@router.get("/invoices/cleared-summary")
-async def cleared_payments_summary(
-    month: str,
-    months: int = 6,
-    db: Session = Depends(get_db),
-) -> dict:
-    m0 = _parse_ym(month)
-    m = max(1, min(int(months or 6), 24))
+# Month an invoice is reported under: its invoice_date, else when it was created.
+_INVOICE_DAY = func.coalesce(ClientInvoice.invoice_date, ClientInvoice.created_at)
+
+
+def _invoice_period_filter(start: date, end: date):
+    """Invoices reported in [start, end); the invoice_date branch can use (payment_status, invoice_date)."""
+    return or_(
+        and_(ClientInvoice.invoice_date >= start, ClientInvoice.invoice_date < end),
+        and_(
+            ClientInvoice.invoice_date.is_(None),
+            ClientInvoice.created_at >= datetime(start.year, start.month, 1),
+            ClientInvoice.created_at < datetime(end.year, end.month, 1),
+        ),
+    )
+
+
+def _overdue_condition(cutoff: date):
+    return or_(
+        ClientInvoice.payment_status == "Overdue",
+        and_(ClientInvoice.payment_status != "Paid", _INVOICE_DAY < cutoff),
+    )
 
-    start = _add_months(m0, -(m - 1))
+
+def _invoice_month_sums(db: Session, m0: date, months: int, *, overdue_cutoff: date) -> dict[str, dict[str, float]]:
+    """net_payable per month for cleared / pending / overdue invoices in one grouped query."""
+    start = _add_months(m0, -(months - 1))
     end = _add_months(m0, 1)
 
+    paid = case((ClientInvoice.payment_status == "Paid", 1), else_=0)
+    overdue = case((_overdue_condition(overdue_cutoff), 1), else_=0)
+    year = func.extract("year", _INVOICE_DAY)
+    month = func.extract("month", _INVOICE_DAY)
     rows = (
-        db.query(ClientInvoice)
-        .filter(ClientInvoice.payment_status == "Paid")
-        .filter(ClientInvoice.created_at >= datetime(start.year, start.month, 1))
-        .filter(ClientInvoice.created_at < datetime(end.year, end.month, 1))
+        db.query(paid, overdue, year, month, func.coalesce(func.sum(ClientInvoice.net_payable), 0.0))
+        .filter(_invoice_period_filter(start, end))
+        .group_by(paid, overdue, year, month)
         .all()
     )
 
-    def _row_month_key(inv: ClientInvoice) -> str:
-        d = inv.invoice_date or (inv.created_at.date() if inv.created_at else None)
-        if not d:
-            return ""
-        return f"{d.year:04d}-{d.month:02d}"
-
-    sums: dict[str, float] = {}
-    for inv in rows:
-        key = _row_month_key(inv)
-        if not key:
+    sums: dict[str, dict[str, float]] = {"cleared": {}, "pending": {}, "overdue": {}}
+    for is_paid, is_overdue, y, mth, total in rows:
+        if y is None or mth is None:
             continue
-        amt = float(getattr(inv, "net_payable", 0.0) or 0.0)
-        sums[key] = float(sums.get(key, 0.0) + amt)
+        key = f"{int(y):04d}-{int(mth):02d}"
+        buckets = ["cleared"] if is_paid else (["pending", "overdue"] if is_overdue else ["pending"])
+        for b in buckets:
+            sums[b][key] = float(sums[b].get(key, 0.0) + float(total or 0.0))
+    return sums
 
+
+def _trend(sums: dict[str, float], m0: date, months: int) -> list[dict]:
     trend: list[dict] = []
-    for i in range(m - 1, -1, -1):
+    for i in range(months - 1, -1, -1):
         mm = _add_months(m0, -i)
         key = f"{mm.year:04d}-{mm.month:02d}"
         trend.append({"month": key, "value": float(sums.get(key, 0.0))})
+    return trend
+
+
+@router.get("/invoices/cleared-summary")
+async def cleared_payments_summary(
+    month: str,
+    months: int = 6,
+    db: Session = Depends(get_db),
+) -> dict:
+    m0 = _parse_ym(month)
+    m = max(1, min(int(months or 6), 24))
+    sums = _invoice_month_sums(db, m0, m, overdue_cutoff=date.today())["cleared"]
 
     return {
         "month": f"{m0.year:04d}-{m0.month:02d}",
         "total_cleared": float(sums.get(f"{m0.year:04d}-{m0.month:02d}", 0.0)),
-        "trend": trend,
+        "trend": _trend(sums, m0, m),
     }
 
 
@@ -637,45 +713,142 @@ async def pending_invoices_summary(
 ) -> dict:
     m0 = _parse_ym(month)
     m = max(1, min(int(months or 6), 24))
+    sums = _invoice_month_sums(db, m0, m, overdue_cutoff=date.today())["pending"]
 
-    start = _add_months(m0, -(m - 1))
-    end = _add_months(m0, 1)
+    return {
+        "month": f"{m0.year:04d}-{m0.month:02d}",
+        "total_pending": float(sums.get(f"{m0.year:04d}-{m0.month:02d}", 0.0)),
+        "trend": _trend(sums, m0, m),
+    }
+
+
+_AGING_BUCKETS = (("0_30", 0, 30), ("31_60", 31, 60), ("61_90", 61, 90))
+
+
+@router.get("/invoices/summary")
+async def invoices_summary(
+    month: str,
+    months: int = 6,
+    overdue_days: int = Query(30, ge=0, le=365),
+    top: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+) -> dict:
+    """Dashboard summary: cleared/pending/overdue trends, per-client aging of unpaid invoices and top debtors.
+
+    An unpaid invoice counts as overdue when marked Overdue or older than ``overdue_days``.
+    """
+    m0 = _parse_ym(month)
+    m = max(1, min(int(months or 6), 24))
+    today = date.today()
+    cutoff = today - timedelta(days=overdue_days)
+
+    sums = _invoice_month_sums(db, m0, m, overdue_cutoff=cutoff)
+    key = f"{m0.year:04d}-{m0.month:02d}"
+
+    # Aging: conditional sums per client over all unpaid invoices
+    # Age in days = today - invoice day; bounds are half-open so timestamps fall in exactly one bucket.
+    bucket_cols = []
+    for _, lo, hi in _AGING_BUCKETS:
+        cond = _INVOICE_DAY >= today - timedelta(days=hi)
+        if lo > 0:
+            cond = and_(cond, _INVOICE_DAY < today - timedelta(days=lo - 1))
+        bucket_cols.append(func.sum(case((cond, ClientInvoice.net_payable), else_=0.0)))
+    over_90 = today - timedelta(days=_AGING_BUCKETS[-1][2])
+    bucket_cols.append(func.sum(case((_INVOICE_DAY < over_90, ClientInvoice.net_payable), else_=0.0)))
+    outstanding = func.coalesce(func.sum(ClientInvoice.net_payable), 0.0)
 
     rows = (
-        db.query(ClientInvoice)
+        db.query(
+            ClientInvoice.client_id,
+            Client.client_name,
+            Client.client_code,
+            outstanding,
+            func.count(ClientInvoice.id),
+            *bucket_cols,
+        )
+        .join(Client, Client.id == ClientInvoice.client_id)
         .filter(ClientInvoice.payment_status != "Paid")
-        .filter(ClientInvoice.created_at >= datetime(start.year, start.month, 1))
-        .filter(ClientInvoice.created_at < datetime(end.year, end.month, 1))
+        .group_by(ClientInvoice.client_id, Client.client_name, Client.client_code)
+        .order_by(outstanding.desc())
         .all()
     )
 
-    def _row_month_key(inv: ClientInvoice) -> str:
-        d = inv.invoice_date or (inv.created_at.date() if inv.created_at else None)
-        if not d:
-            return ""
-        return f"{d.year:04d}-{d.month:02d}"
-
-    sums: dict[str, float] = {}
-    for inv in rows:
-        key = _row_month_key(inv)
-        if not key:
-            continue
-        amt = float(getattr(inv, "net_payable", 0.0) or 0.0)
-        sums[key] = float(sums.get(key, 0.0) + amt)
-
-    trend: list[dict] = []
-    for i in range(m - 1, -1, -1):
-        mm = _add_months(m0, -i)
-        key = f"{mm.year:04d}-{mm.month:02d}"
-        trend.append({"month": key, "value": float(sums.get(key, 0.0))})
+    labels = [b[0] for b in _AGING_BUCKETS] + ["90_plus"]
+    aging: list[dict] = []
+    totals = {label: 0.0 for label in labels}
+    for client_id, name, code, total, count, *buckets in rows:
+        entry = {
+            "client_id": int(client_id),
+            "client_name": name,
+            "client_code": code,
+            "outstanding": float(total or 0.0),
+            "invoices": int(count or 0),
+        }
+        for label, v in zip(labels, buckets):
+            entry[label] = float(v or 0.0)
+            totals[label] += float(v or 0.0)
+        aging.append(entry)
 
     return {
-        "month": f"{m0.year:04d}-{m0.month:02d}",
-        "total_pending": float(sums.get(f"{m0.year:04d}-{m0.month:02d}", 0.0)),
-        "trend": trend,
+        "month": key,
+        "total_cleared": float(sums["cleared"].get(key, 0.0)),
+        "total_pending": float(sums["pending"].get(key, 0.0)),
+        "total_overdue": float(sums["overdue"].get(key, 0.0)),
+        "cleared_trend": _trend(sums["cleared"], m0, m),
+        "pending_trend": _trend(sums["pending"], m0, m),
+        "overdue_trend": _trend(sums["overdue"], m0, m),
+        "aging_totals": totals,
+        "aging": aging,
+        "top_debtors": aging[:top],
     }
 
 
+@router.post("/invoices/run")
+async def run_contract_invoicing(
+    month: str,
+    dry_run: bool = True,
+    use_attendance: bool = False,
+    contract_ids: Optional[List[int]] = Query(None),
+    invoice_date: Optional[date] = None,
+    include_lines: bool = True,
+    db: Session = Depends(get_db),
+) -> dict:
+    """Bill every active contract for ``month`` (YYYY-MM) from its guard allocations and rate cards.
+
+    Defaults to a dry run; pass ``dry_run=false`` to create the invoices (one transaction).
+    Invoices are dated ``invoice_date``, by default the last day of ``month``.
+    """
+    result = run_monthly_invoicing(
+        db,
+        _parse_ym(month),
+        dry_run=dry_run,
+        use_attendance=use_attendance,
+        contract_ids=contract_ids,
+        invoice_date=invoice_date,
+    )
+    if not include_lines:
+        for inv in result["invoices"]:
+            inv.pop("lines", None)
+    return result
+
+
+@router.get("/profitability")
+async def contract_profitability(month: str, db: Session = Depends(get_db)) -> dict:
+    """Revenue vs guard payroll cost for ``month`` (YYYY-MM) per contract, client and industry.
+
+    Each guard's payroll ``gross_pay`` is split across the contracts they were
+    allocated to by allocated days; cached per month until an input table changes.
+    """
+    month_start = _parse_ym(month)
+
+    def _load() -> dict:
+        payroll = build_payroll_report(db, month_start.isoformat()[:7])
+        cost = {int(r.employee_db_id): float(r.gross_pay or 0.0) for r in payroll.rows}
+        return compute_profitability(db, month_start, cost)
+
+    return cached("clients:profitability", tables=PROFITABILITY_TABLES, key={"month": month_start}, loader=_load)
+
+
 @router.post("/clients/{client_id}/invoices", response_model=ClientInvoiceOut)
 async def create_invoice(client_id: int, payload: ClientInvoiceCreate, db: Session = Depends(get_db)) -> ClientInvoiceOut:
     _get_client(db, client_id)
@@ -927,6 +1100,35 @@ async def download_invoice_pdf(client_id: int, invoice_id: int, db: Session = De
     )
 
 
+@router.get("/coverage")
+async def guard_coverage_report(
+    start_date: date,
+    end_date: date,
+    client_id: Optional[int] = None,
+    site_ids: Optional[List[int]] = Query(None),
+    only_gaps: bool = False,
+    include_matrix: bool = True,
+    db: Session = Depends(get_db),
+) -> dict:
+    """Per site and day: guards required vs allocated vs present, with gap summaries per client and site.
+
+    ``matrix`` holds one value per entry of ``days`` for each series.
+    """
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must be on or after start_date")
+    if (end_date - start_date).days > 92:
+        raise HTTPException(status_code=400, detail="Date range cannot exceed 93 days")
+    return compute_coverage(
+        db,
+        start_date,
+        end_date,
+        client_id=client_id,
+        site_ids=site_ids,
+        only_gaps=only_gaps,
+        include_matrix=include_matrix,
+    )
+
+
 @router.get("/sites/{site_id}/requirements", response_model=List[ClientGuardRequirementOut])
 async def list_requirements(site_id: int, db: Session = Depends(get_db)) -> List[ClientGuardRequirementOut]:
     site = db.query(ClientSite).filter(ClientSite.id == site_id).first()
@@ -1015,15 +1217,8 @@ async def allocate_guard(site_id: int, payload: ClientSiteGuardAllocationCreate,
         raise HTTPException(status_code=404, detail="Employee not found")
 
     # Prevent overlapping active allocations for the same employee
-    existing = (
-        db.query(ClientSiteGuardAllocation)
-        .filter(ClientSiteGuardAllocation.employee_db_id == payload.employee_db_id)
-        .filter(ClientSiteGuardAllocation.status == "Allocated")
-        .all()
-    )
-    for a in existing:
-        if _ranges_overlap(a.start_date, a.end_date, payload.start_date, payload.end_date):
-            raise HTTPException(status_code=400, detail="Employee already allocated in the selected date range")
+    if find_conflict(db, payload.employee_db_id, payload.start_date, payload.end_date, SITE_STATUSES) is not None:
+        raise HTTPException(status_code=400, detail="Employee already allocated in the selected date range")
 
     row = ClientSiteGuardAllocation(
         site_id=site_id,
@@ -1034,7 +1229,12 @@ async def allocate_guard(site_id: int, payload: ClientSiteGuardAllocationCreate,
         status="Allocated",
     )
     db.add(row)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Lost a race against a concurrent allocation (PostgreSQL exclusion constraint)
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Employee already allocated in the selected date range")
     db.refresh(row)
     return row
 
@@ -1058,11 +1258,26 @@ async def release_guard(site_id: int, allocation_id: int, db: Session = Depends(
     return row
 
 
+_LANGUAGE_LEVEL_RANK = {"native": 4, "fluent": 3, "advanced": 3, "intermediate": 2, "basic": 1, "beginner": 1}
+
+
 @router.get(
     "/sites/{site_id}/requirements/{requirement_id}/suggested-employees",
     response_model=List[SuggestedEmployeeOut],
 )
-async def suggested_employees(site_id: int, requirement_id: int, db: Session = Depends(get_db)) -> List[SuggestedEmployeeOut]:
+async def suggested_employees(
+    site_id: int,
+    requirement_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+) -> List[SuggestedEmployeeOut]:
+    """Free guards for a requirement, best first.
+
+    Ranked by preferred-language proficiency, then proximity of the guard's
+    last site (same site, same client, same city), then longest idle.
+    """
+
     site = db.query(ClientSite).filter(ClientSite.id == site_id).first()
     if not site:
         raise HTTPException(status_code=404, detail="Site not found")
@@ -1078,40 +1293,88 @@ async def suggested_employees(site_id: int, requirement_id: int, db: Session = D
 
     preferred = (req.preferred_language or "").strip().lower()
 
-    # Pull employees and filter in python (languages stored as JSON text)
-    employees = db.query(Employee).order_by(Employee.id.desc()).all()
+    history = (
+        db.query(
+            ClientSiteGuardAllocation.employee_db_id.label("employee_db_id"),
+            func.max(ClientSiteGuardAllocation.end_date).label("last_end"),
+            func.max(ClientSiteGuardAllocation.id).label("last_allocation_id"),
+        )
+        .filter(ClientSiteGuardAllocation.site_id.isnot(None))
+        .group_by(ClientSiteGuardAllocation.employee_db_id)
+        .subquery()
+    )
+    last_alloc = aliased(ClientSiteGuardAllocation)
+    last_site = aliased(ClientSite)
+
+    site_city = func.lower(func.trim(site.city or ""))
+    proximity = case(
+        (last_site.id == site.id, 3),
+        (last_site.client_id == site.client_id, 2),
+        (and_(site_city != "", func.lower(func.trim(func.coalesce(last_site.city, Employee.city))) == site_city), 1),
+        else_=0,
+    )
 
-    # Exclude allocated employees for overlapping range
-    allocations = (
-        db.query(ClientSiteGuardAllocation)
-        .filter(ClientSiteGuardAllocation.status == "Allocated")
+    level_col = literal(None)
+    level_rank = literal(0)
+    q = db.query(Employee.id)
+    if preferred:
+        level_col = EmployeeLanguage.level
+        level_rank = case(
+            *[(func.lower(EmployeeLanguage.level) == k, v) for k, v in _LANGUAGE_LEVEL_RANK.items()],
+            else_=0,
+        )
+        q = q.join(
+            EmployeeLanguage,
+            and_(EmployeeLanguage.employee_db_id == Employee.id, EmployeeLanguage.language == preferred),
+        )
+
+    rows = (
+        q.add_columns(level_col.label("level"), proximity.label("proximity"), last_site.id, history.c.last_end)
+        .outerjoin(history, history.c.employee_db_id == Employee.id)
+        .outerjoin(last_alloc, last_alloc.id == history.c.last_allocation_id)
+        .outerjoin(last_site, last_site.id == last_alloc.site_id)
+        .filter(or_(Employee.employment_status.is_(None), Employee.employment_status != "Left"))
+        .filter(~busy_clause(Employee.id, req.start_date, req.end_date, SITE_STATUSES))
+        .order_by(
+            level_rank.desc(),
+            proximity.desc(),
+            history.c.last_end.isnot(None),
+            history.c.last_end.asc(),
+            Employee.id.desc(),
+        )
+        .offset(skip)
+        .limit(limit)
         .all()
     )
-    allocated_by_employee: dict[int, list[ClientSiteGuardAllocation]] = {}
-    for a in allocations:
-        allocated_by_employee.setdefault(int(a.employee_db_id), []).append(a)
+    if not rows:
+        return []
 
-    out: list[SuggestedEmployeeOut] = []
-    for e in employees:
-        langs = _employee_languages(e)
-        if preferred and not any(preferred == l.lower() for l in langs):
-            continue
-        # availability check
-        blocked = False
-        for a in allocated_by_employee.get(int(e.id), []):
-            if _ranges_overlap(a.start_date, a.end_date, req.start_date, req.end_date):
-                blocked = True
-                break
-        if blocked:
-            continue
+    ids = [int(r[0]) for r in rows]
+    employees = {e.id: e for e in db.query(Employee).filter(Employee.id.in_(ids)).all()}
+    langs: dict[int, list[str]] = {}
+    for emp_id, name in (
+        db.query(EmployeeLanguage.employee_db_id, EmployeeLanguage.display_name)
+        .filter(EmployeeLanguage.employee_db_id.in_(ids))
+        .order_by(EmployeeLanguage.id)
+        .all()
+    ):
+        langs.setdefault(int(emp_id), []).append(name)
 
+    today = date.today()
+    out: list[SuggestedEmployeeOut] = []
+    for emp_id, level, prox, last_site_id, last_end in rows:
+        e = employees[emp_id]
         out.append(
             SuggestedEmployeeOut(
                 id=int(e.id),
                 employee_id=str(e.employee_id),
                 first_name=str(e.first_name),
                 last_name=str(e.last_name),
-                languages=langs,
+                languages=langs.get(int(e.id), []),
+                language_level=level,
+                proximity=int(prox or 0),
+                last_site_id=last_site_id,
+                idle_days=max((today - last_end).days, 0) if last_end else None,
             )
         )
 
@@ -1134,7 +1397,7 @@ async def complete_requirement(site_id: int, requirement_id: int, db: Session =
         raise HTTPException(status_code=404, detail="Requirement not found")
 
     # Create a paid invoice for this site requirement (monthly amount)
-    invoice_number = f"INV-{site.client_id}-{site_id}-{requirement_id}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+    invoice_number = _next_invoice_number(db, client_id=site.client_id, site_id=site_id, requirement_id=requirement_id)
     billing_period = None
     if req.start_date and req.end_date:
         billing_period = f"{req.start_date.isoformat()} to {req.end_date.isoformat()}"
@@ -1217,24 +1480,22 @@ async def create_contract_allocation(
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
     
-    # Check if already allocated
-    existing = (
-        db.query(ClientSiteGuardAllocation)
-        .filter(ClientSiteGuardAllocation.employee_db_id == employee_db_id)
-        .filter(ClientSiteGuardAllocation.status == "Active")
-        .first()
-    )
-    if existing:
-        raise HTTPException(status_code=400, detail="Guard already allocated to another contract")
-    
     start_date = None
     if payload.get("start_date"):
         start_date = date.fromisoformat(payload["start_date"])
+    end_date = None
+    if payload.get("end_date"):
+        end_date = date.fromisoformat(payload["end_date"])
+
+    # Check if already allocated in the requested period
+    if find_conflict(db, employee_db_id, start_date, end_date, CONTRACT_STATUSES) is not None:
+        raise HTTPException(status_code=400, detail="Guard already allocated to another contract")
     
     alloc = ClientSiteGuardAllocation(
         contract_id=contract_id,
         employee_db_id=employee_db_id,
         start_date=start_date,
+        end_date=end_date,
         status="Active",
     )
     db.add(alloc)
@@ -1242,7 +1503,11 @@ async def create_contract_allocation(
     # Update employee status to allocated
     emp.allocation_status = "Allocated"
     
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Guard already allocated to another contract")
     db.refresh(alloc)
     
     return {"id": alloc.id, "message": "Guard allocated"}
@@ -1264,9 +1529,9 @@ async def delete_contract_allocation(
     if not alloc:
         raise HTTPException(status_code=404, detail="Allocation not found")
     
-    # Update employee status to free
+    # Update employee status to free, unless still allocated on another contract
     emp = db.query(Employee2).filter(Employee2.id == alloc.employee_db_id).first()
-    if emp:
+    if emp and not db.query(keeps_allocation(emp.id, CONTRACT_STATUSES, exclude_id=alloc.id)).scalar():
         emp.allocation_status = "Free"
     
     db.delete(alloc)
@@ -1275,68 +1540,184 @@ async def delete_contract_allocation(
     return {"message": "Guard removed and marked as free"}
 
 
+def _allocation_kind(kind: str):
+    if kind == "site":
+        return Employee, SITE_STATUSES
+    if kind == "contract":
+        return Employee2, CONTRACT_STATUSES
+    raise HTTPException(status_code=400, detail="kind must be 'site' or 'contract'")
+
+
+@router.get("/allocations/availability")
+async def guard_availability(
+    employee_db_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    kind: str = "site",
+    db: Session = Depends(get_db),
+) -> dict:
+    """Is this guard free from start_date to end_date (open-ended when omitted)?"""
+    _, statuses = _allocation_kind(kind)
+    clash = find_conflict(db, employee_db_id, start_date, end_date, statuses)
+    return {
+        "employee_db_id": employee_db_id,
+        "free": clash is None,
+        "conflict": None
+        if clash is None
+        else {
+            "allocation_id": clash.id,
+            "site_id": clash.site_id,
+            "contract_id": clash.contract_id,
+            "start_date": clash.start_date.isoformat() if clash.start_date else None,
+            "end_date": clash.end_date.isoformat() if clash.end_date else None,
+            "status": clash.status,
+        },
+    }
+
+
+@router.get("/allocations/free-guards")
+async def list_free_guards(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    kind: str = "contract",
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+) -> List[dict]:
+    """Guards with no allocation overlapping the period."""
+    model, statuses = _allocation_kind(kind)
+    rows = free_guards(db, model, start_date, end_date, statuses).order_by(model.id.asc()).offset(skip).limit(limit).all()
+    if model is Employee:
+        return [
+            {"id": e.id, "employee_id": e.employee_id, "name": f"{e.first_name} {e.last_name}".strip()}
+            for e in rows
+        ]
+    return [{"id": e.id, "employee_id": e.serial_no or "", "fss_no": e.fss_no, "name": e.name} for e in rows]
+
+
+@router.post("/allocations/validate", response_model=List[AllocationConflictOut])
+async def validate_allocation_batch(payload: AllocationBatchCheck, db: Session = Depends(get_db)) -> List[AllocationConflictOut]:
+    """Check a batch of proposed allocations against the roster and each other; returns the conflicts."""
+    _, statuses = _allocation_kind(payload.kind)
+    conflicts = check_batch(db, [it.dict() for it in payload.items], statuses)
+    return [AllocationConflictOut(**c.to_dict()) for c in conflicts]
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Contract Invoice/Receipt PDF
 # ─────────────────────────────────────────────────────────────────────────────
 
-@router.get("/contracts/{contract_id}/invoice-pdf")
-async def download_contract_invoice_pdf(contract_id: int, db: Session = Depends(get_db)):
-    """Generate invoice PDF for a contract"""
-    contract = db.query(ClientContract).filter(ClientContract.id == contract_id).first()
-    if not contract:
-        raise HTTPException(status_code=404, detail="Contract not found")
-    
-    client = db.query(Client).filter(Client.id == contract.client_id).first()
-    
-    # Get allocated guards
-    allocations = (
-        db.query(ClientSiteGuardAllocation)
-        .filter(ClientSiteGuardAllocation.contract_id == contract_id)
-        .all()
-    )
-    
-    guards = []
+def _contract_pdf_payloads(
+    db: Session,
+    contracts: List[ClientContract],
+    *,
+    period: Optional[tuple[date, date]] = None,
+) -> dict[int, dict]:
+    """Plain-data inputs for the contract invoice/receipt PDFs, loaded with one query per table.
+
+    With ``period`` only allocations overlapping it are listed and rate cards
+    effective at its end are shown; otherwise all allocations and today's rates.
+    """
+    if not contracts:
+        return {}
+    contract_ids = [c.id for c in contracts]
+    client_ids = {c.client_id for c in contracts}
+    clients = {c.id: c for c in db.query(Client).filter(Client.id.in_(client_ids)).all()}
+
+    q = db.query(ClientSiteGuardAllocation).filter(ClientSiteGuardAllocation.contract_id.in_(contract_ids))
+    if period is not None:
+        q = q.filter(
+            or_(ClientSiteGuardAllocation.start_date.is_(None), ClientSiteGuardAllocation.start_date <= period[1]),
+            or_(ClientSiteGuardAllocation.end_date.is_(None), ClientSiteGuardAllocation.end_date >= period[0]),
+        )
+    allocations = q.order_by(ClientSiteGuardAllocation.id.asc()).all()
+    emp_ids = {a.employee_db_id for a in allocations}
+    guards = {e.id: e for e in db.query(Employee2).filter(Employee2.id.in_(emp_ids)).all()} if emp_ids else {}
+
+    on = period[1] if period is not None else date.today()
+    rates: dict[int, list] = {}
+    for r in (
+        db.query(ClientRateCard)
+        .filter(ClientRateCard.client_id.in_(client_ids))
+        .filter(or_(ClientRateCard.effective_from.is_(None), ClientRateCard.effective_from <= on))
+        .filter(or_(ClientRateCard.effective_to.is_(None), ClientRateCard.effective_to >= on))
+        .order_by(ClientRateCard.guard_type.asc())
+    ):
+        rates.setdefault(r.client_id, []).append(
+            {"guard_type": r.guard_type, "rate": float(r.rate_per_shift_day_month or 0.0)}
+        )
+
+    guards_by_contract: dict[int, list] = {}
     for a in allocations:
-        emp = db.query(Employee2).filter(Employee2.id == a.employee_db_id).first()
+        emp = guards.get(a.employee_db_id)
         if emp:
-            guards.append({
+            guards_by_contract.setdefault(a.contract_id, []).append({
                 "name": emp.name,
                 "id": emp.serial_no or str(emp.id),
                 "designation": emp.designation or "Guard",
             })
-    
+
+    out: dict[int, dict] = {}
+    for c in contracts:
+        client = clients.get(c.client_id)
+        out[c.id] = {
+            "period": f"{period[0].isoformat()} to {period[1].isoformat()}" if period is not None else None,
+            "client_name": client.client_name if client else "N/A",
+            "client_code": client.client_code if client else "N/A",
+            "client_location": (getattr(client, "location", "") or "N/A") if client else "N/A",
+            "contract_number": c.contract_number,
+            "contract_type": c.contract_type or "N/A",
+            "start_date": str(c.start_date or "N/A"),
+            "end_date": str(c.end_date or "N/A"),
+            "status": c.status,
+            "monthly_cost": float(c.monthly_cost or 0),
+            "guards": guards_by_contract.get(c.id, []),
+            "rates": rates.get(c.client_id, []),
+        }
+    return out
+
+
+def _pdf_bytes(pdf: FPDF) -> bytes:
+    out = pdf.output(dest="S")
+    return out if isinstance(out, (bytes, bytearray)) else out.encode("latin-1")
+
+
+def _render_contract_invoice_pdf(data: dict) -> bytes:
     pdf = FPDF()
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
-    
+
     # Header
     pdf.set_font("Helvetica", "B", 16)
     pdf.cell(0, 10, "INVOICE", ln=True, align="C")
     pdf.set_font("Helvetica", "", 10)
     pdf.cell(0, 6, f"Invoice Date: {datetime.now().strftime('%Y-%m-%d')}", ln=True, align="C")
+    if data.get("period"):
+        pdf.cell(0, 6, f"Billing Period: {data['period']}", ln=True, align="C")
     pdf.ln(10)
-    
+
     # Client Info
     pdf.set_font("Helvetica", "B", 12)
     pdf.cell(0, 8, "Client Information", ln=True)
     pdf.set_font("Helvetica", "", 10)
-    pdf.cell(0, 6, f"Client: {client.client_name if client else 'N/A'}", ln=True)
-    pdf.cell(0, 6, f"Code: {client.client_code if client else 'N/A'}", ln=True)
-    pdf.cell(0, 6, f"Location: {getattr(client, 'location', '') or 'N/A'}", ln=True)
+    pdf.cell(0, 6, f"Client: {data['client_name']}", ln=True)
+    pdf.cell(0, 6, f"Code: {data['client_code']}", ln=True)
+    pdf.cell(0, 6, f"Location: {data['client_location']}", ln=True)
     pdf.ln(8)
-    
+
     # Contract Info
     pdf.set_font("Helvetica", "B", 12)
     pdf.cell(0, 8, "Contract Details", ln=True)
     pdf.set_font("Helvetica", "", 10)
-    pdf.cell(0, 6, f"Contract #: {contract.contract_number}", ln=True)
-    pdf.cell(0, 6, f"Type: {contract.contract_type or 'N/A'}", ln=True)
-    pdf.cell(0, 6, f"Start Date: {contract.start_date or 'N/A'}", ln=True)
-    pdf.cell(0, 6, f"End Date: {contract.end_date or 'N/A'}", ln=True)
-    pdf.cell(0, 6, f"Status: {contract.status}", ln=True)
+    pdf.cell(0, 6, f"Contract #: {data['contract_number']}", ln=True)
+    pdf.cell(0, 6, f"Type: {data['contract_type']}", ln=True)
+    pdf.cell(0, 6, f"Start Date: {data['start_date']}", ln=True)
+    pdf.cell(0, 6, f"End Date: {data['end_date']}", ln=True)
+    pdf.cell(0, 6, f"Status: {data['status']}", ln=True)
     pdf.ln(8)
-    
+
     # Guards
+    guards = data["guards"]
     pdf.set_font("Helvetica", "B", 12)
     pdf.cell(0, 8, f"Allocated Guards ({len(guards)})", ln=True)
     pdf.set_font("Helvetica", "B", 9)
@@ -1351,213 +1732,395 @@ async def download_contract_invoice_pdf(contract_id: int, db: Session = Depends(
         pdf.cell(50, 6, g["designation"], border=1)
         pdf.ln()
     pdf.ln(8)
-    
+
     # Cost
-    monthly_cost = float(contract.monthly_cost or 0)
     pdf.set_font("Helvetica", "B", 12)
     pdf.cell(0, 8, "Billing", ln=True)
     pdf.set_font("Helvetica", "", 10)
+    for r in data["rates"]:
+        pdf.cell(100, 6, f"Rate ({r['guard_type']}):", border=0)
+        pdf.cell(0, 6, f"Rs {r['rate']:,.0f}", ln=True)
     pdf.cell(100, 6, "Monthly Cost:", border=0)
-    pdf.cell(0, 6, f"Rs {monthly_cost:,.0f}", ln=True)
+    pdf.cell(0, 6, f"Rs {data['monthly_cost']:,.0f}", ln=True)
     pdf.ln(10)
-    
+
     # Footer
     pdf.set_font("Helvetica", "I", 8)
     pdf.cell(0, 6, f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M')}", ln=True, align="C")
-    
-    pdf_bytes = pdf.output()
-    
-    return StreamingResponse(
-        iter([bytes(pdf_bytes)]),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=invoice_{contract.contract_number}.pdf"}
-    )
 
+    return _pdf_bytes(pdf)
 
-@router.get("/contracts/{contract_id}/receipt-pdf")
-async def download_contract_receipt_pdf(contract_id: int, db: Session = Depends(get_db)):
-    """Generate receipt PDF for a contract"""
-    contract = db.query(ClientContract).filter(ClientContract.id == contract_id).first()
-    if not contract:
-        raise HTTPException(status_code=404, detail="Contract not found")
-    
-    client = db.query(Client).filter(Client.id == contract.client_id).first()
-    
+
+def _render_contract_receipt_pdf(data: dict) -> bytes:
     pdf = FPDF()
     pdf.add_page()
-    
+
     pdf.set_font("Helvetica", "B", 16)
     pdf.cell(0, 10, "PAYMENT RECEIPT", ln=True, align="C")
     pdf.set_font("Helvetica", "", 10)
     pdf.cell(0, 6, f"Date: {datetime.now().strftime('%Y-%m-%d')}", ln=True, align="C")
     pdf.ln(10)
-    
+
     pdf.set_font("Helvetica", "", 10)
-    pdf.cell(0, 6, f"Received from: {client.client_name if client else 'N/A'}", ln=True)
-    pdf.cell(0, 6, f"Contract #: {contract.contract_number}", ln=True)
+    pdf.cell(0, 6, f"Received from: {data['client_name']}", ln=True)
+    pdf.cell(0, 6, f"Contract #: {data['contract_number']}", ln=True)
+    if data.get("period"):
+        pdf.cell(0, 6, f"Period: {data['period']}", ln=True)
     pdf.ln(5)
-    
-    monthly_cost = float(contract.monthly_cost or 0)
+
     pdf.set_font("Helvetica", "B", 12)
-    pdf.cell(0, 8, f"Amount: Rs {monthly_cost:,.0f}", ln=True)
+    pdf.cell(0, 8, f"Amount: Rs {data['monthly_cost']:,.0f}", ln=True)
     pdf.ln(10)
-    
+
     pdf.set_font("Helvetica", "", 10)
     pdf.cell(0, 6, "Payment Status: Received", ln=True)
     pdf.ln(20)
-    
+
     pdf.cell(0, 6, "_________________________", ln=True)
     pdf.cell(0, 6, "Authorized Signature", ln=True)
-    
-    pdf_bytes = pdf.output()
-    
+
+    return _pdf_bytes(pdf)
+
+
+_CONTRACT_PDF_RENDERERS = {
+    "invoice": _render_contract_invoice_pdf,
+    "receipt": _render_contract_receipt_pdf,
+}
+
+
+def _render_contract_pdf_job(job: tuple[str, dict]) -> bytes:
+    kind, data = job
+    return _CONTRACT_PDF_RENDERERS[kind](data)
+
+
+def _render_contract_pdfs(jobs: List[tuple[str, str, dict]], workers: int) -> Iterator[tuple[str, bytes]]:
+    """Yield (filename, pdf bytes) in order, rendering in a process pool with a bounded window."""
+    if workers <= 1 or len(jobs) < 4:
+        for name, kind, data in jobs:
+            yield name, _render_contract_pdf_job((kind, data))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = iter(jobs)
+        window: deque = deque()
+        for name, kind, data in islice(pending, workers * 2):
+            window.append((name, pool.submit(_render_contract_pdf_job, (kind, data))))
+        while window:
+            name, fut = window.popleft()
+            yield name, fut.result()
+            nxt = next(pending, None)
+            if nxt is not None:
+                window.append((nxt[0], pool.submit(_render_contract_pdf_job, (nxt[1], nxt[2]))))
+
+
+class _ZipChunkSink:
+    """Write-only, non-seekable file object: ZipFile streams entries into it and we drain the bytes."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+def _stream_contract_pdf_zip(jobs: List[tuple[str, str, dict]], workers: int) -> Iterator[bytes]:
+    sink = _ZipChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in _render_contract_pdfs(jobs, workers):
+            zf.writestr(name, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    tail = sink.drain()
+    if tail:
+        yield tail
+
+
+@router.get("/contracts/{contract_id}/invoice-pdf")
+async def download_contract_invoice_pdf(contract_id: int, db: Session = Depends(get_db)):
+    """Generate invoice PDF for a contract"""
+    contract = db.query(ClientContract).filter(ClientContract.id == contract_id).first()
+    if not contract:
+        raise HTTPException(status_code=404, detail="Contract not found")
+
+    data = _contract_pdf_payloads(db, [contract])[contract.id]
     return StreamingResponse(
-        iter([bytes(pdf_bytes)]),
+        iter([_render_contract_invoice_pdf(data)]),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename=invoice_{contract.contract_number}.pdf"}
+    )
+
+
+@router.get("/contracts/{contract_id}/receipt-pdf")
+async def download_contract_receipt_pdf(contract_id: int, db: Session = Depends(get_db)):
+    """Generate receipt PDF for a contract"""
+    contract = db.query(ClientContract).filter(ClientContract.id == contract_id).first()
+    if not contract:
+        raise HTTPException(status_code=404, detail="Contract not found")
+
+    data = _contract_pdf_payloads(db, [contract])[contract.id]
+    return StreamingResponse(
+        iter([_render_contract_receipt_pdf(data)]),
         media_type="application/pdf",
         headers={"Content-Disposition": f"attachment; filename=receipt_{contract.contract_number}.pdf"}
     )
 
 
-@bulk_router.post("/import-bulk")
-async def import_clients_bulk(data: List[dict], db: Session = Depends(get_db)):
-    """Import clients from JSON data (no auth required for testing)."""
-    results = {
-        "imported": 0,
-        "skipped": 0,
-        "errors": []
+@router.get("/contracts/pdf-batch")
+async def download_contract_pdfs_zip(
+    month: Optional[str] = None,
+    contract_ids: Optional[List[int]] = Query(None),
+    kind: str = Query("both", pattern="^(invoice|receipt|both)$"),
+    workers: int = Query(0, ge=0, le=16),
+    db: Session = Depends(get_db),
+):
+    """Invoice and/or receipt PDFs for many contracts as one streamed ZIP.
+
+    Select contracts by ``month`` (YYYY-MM: Active contracts overlapping it) and/or
+    explicit ``contract_ids``. PDFs are rendered in a process pool
+    (``workers=0`` picks one per CPU, up to 8) and the archive is streamed
+    entry by entry.
+    """
+    if not month and not contract_ids:
+        raise HTTPException(status_code=400, detail="Provide month or contract_ids")
+
+    q = db.query(ClientContract)
+    period = None
+    if month:
+        m0 = _parse_ym(month)
+        period = (m0, _add_months(m0, 1) - timedelta(days=1))
+        q = (
+            q.filter(ClientContract.status == "Active")
+            .filter(or_(ClientContract.start_date.is_(None), ClientContract.start_date <= period[1]))
+            .filter(or_(ClientContract.end_date.is_(None), ClientContract.end_date >= period[0]))
+        )
+    if contract_ids:
+        q = q.filter(ClientContract.id.in_(contract_ids))
+    contracts = q.order_by(ClientContract.contract_number.asc()).all()
+    if not contracts:
+        raise HTTPException(status_code=404, detail="No contracts found")
+
+    payloads = _contract_pdf_payloads(db, contracts, period=period)
+    kinds = ["invoice", "receipt"] if kind == "both" else [kind]
+    jobs = [
+        (f"{k}s/{k}_{c.contract_number}.pdf", k, payloads[c.id])
+        for c in contracts
+        for k in kinds
+    ]
+    n_workers = workers or min(8, os.cpu_count() or 1)
+
+    filename = f"contracts_{month or 'selection'}.zip"
+    return StreamingResponse(
+        _stream_contract_pdf_zip(jobs, n_workers),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+def _client_from_import_row(item: dict) -> Optional[dict]:
+    """Map one client-sheet JSON row to Client column values, or None for blank/header rows."""
+    if not item.get("#") or not item.get("Client Name"):
+        return None
+
+    # Extract data from JSON structure
+    sr_no = str(item.get("#", "")).strip()
+    client_name = str(item.get("Client Name", "")).strip()
+
+    # Skip header row or empty client name
+    if sr_no == "#" or client_name.lower() == "client name" or not client_name:
+        return None
+
+    # Generate unique client code from name and SR number
+    client_code_base = client_name.replace(" ", "_").replace(",", "").replace(".", "").upper()[:20]
+    client_code = f"{client_code_base}_{sr_no}"
+
+    # Determine client type and industry based on name
+    lname = client_name.lower()
+    client_type = "Corporate"
+    industry_type = "Bank" if "bank" in lname else "Commercial"
+
+    if "embassy" in lname:
+        client_type = "Government"
+        industry_type = "Government"
+    elif "school" in lname or "university" in lname:
+        industry_type = "Educational"
+    elif "hospital" in lname or "medical" in lname:
+        industry_type = "Hospital"
+    elif "office" in lname:
+        industry_type = "Commercial"
+
+    # Extract location from client name
+    location = "Islamabad"
+    if "rawalpindi" in lname:
+        location = "Rawalpindi"
+    elif "lahore" in lname:
+        location = "Lahore"
+    elif "peshawar" in lname:
+        location = "Peshawar"
+    elif "karachi" in lname:
+        location = "Karachi"
+    elif "multan" in lname:
+        location = "Multan"
+    elif "kpk" in lname or "khyber" in lname:
+        location = "KPK"
+    elif "sindh" in lname:
+        location = "Sindh"
+    elif "ajk" in lname or "azad" in lname:
+        location = "Azad Kashmir"
+
+    return {
+        "client_code": client_code,
+        "client_name": client_name,
+        "client_type": client_type,
+        "industry_type": industry_type,
+        "status": "Active",
+        "location": location,
+        "address": client_name,  # Use full name as address for now
+        "notes": f"Imported from client list - SR No: {sr_no}",
     }
-    
-    for item in data:
+
+
+def import_client_rows(db: Session, data: List[dict], chunk_size: int = 500) -> dict:
+    """Import client-sheet rows in chunked bulk inserts.
+
+    Existing names and codes are prefetched in one query; each chunk is one
+    transaction. If a chunk fails it is retried row by row so only the
+    offending rows are reported as errors.
+    """
+    results: dict = {"imported": 0, "skipped": 0, "errors": [], "rows": []}
+
+    mapped: list[tuple[int, Optional[dict]]] = []
+    for idx, item in enumerate(data):
         try:
-            # Skip empty rows
-            if not item.get("#") or not item.get("Client Name"):
-                results["skipped"] += 1
-                continue
-            
-            # Extract data from JSON structure
-            sr_no = str(item.get("#", "")).strip()
-            client_name = str(item.get("Client Name", "")).strip()
-            
-            # Skip header row or empty client name
-            if sr_no == "#" or client_name.lower() == "client name" or not client_name:
-                results["skipped"] += 1
-                continue
-            
-            # Check if client already exists
-            existing_client = db.query(Client).filter(Client.client_name == client_name).first()
-            if existing_client:
-                results["skipped"] += 1
-                continue
-            
-            # Generate unique client code from name and SR number
-            client_code_base = client_name.replace(" ", "_").replace(",", "").replace(".", "").upper()[:20]
-            client_code = f"{client_code_base}_{sr_no}"
-            
-            # Determine client type and industry based on name
-            client_type = "Corporate"
-            industry_type = "Bank" if "bank" in client_name.lower() else "Commercial"
-            
-            if "embassy" in client_name.lower():
-                client_type = "Government"
-                industry_type = "Government"
-            elif "school" in client_name.lower() or "university" in client_name.lower():
-                industry_type = "Educational"
-            elif "hospital" in client_name.lower() or "medical" in client_name.lower():
-                industry_type = "Hospital"
-            elif "office" in client_name.lower():
-                industry_type = "Commercial"
-            
-            # Extract location from client name
-            location = "Islamabad"
-            if "rawalpindi" in client_name.lower():
-                location = "Rawalpindi"
-            elif "lahore" in client_name.lower():
-                location = "Lahore"
-            elif "peshawar" in client_name.lower():
-                location = "Peshawar"
-            elif "karachi" in client_name.lower():
-                location = "Karachi"
-            elif "multan" in client_name.lower():
-                location = "Multan"
-            elif "kpk" in client_name.lower() or "khyber" in client_name.lower():
-                location = "KPK"
-            elif "sindh" in client_name.lower():
-                location = "Sindh"
-            elif "ajk" in client_name.lower() or "azad" in client_name.lower():
-                location = "Azad Kashmir"
-            
-            # Create client with default values
-            client = Client(
-                client_code=client_code,
-                client_name=client_name,
-                client_type=client_type,
-                industry_type=industry_type,
-                status="Active",
-                location=location,
-                address=client_name,  # Use full name as address for now
-                notes=f"Imported from client list - SR No: {sr_no}"
-            )
-            
-            db.add(client)
-            db.commit()
-            results["imported"] += 1
-            
+            mapped.append((idx, _client_from_import_row(item)))
         except Exception as e:
             results["errors"].append(f"Error importing {item.get('Client Name', 'unknown')}: {str(e)}")
+            results["rows"].append({"row": idx, "status": "error", "detail": str(e)})
+
+    names = {m["client_name"] for _, m in mapped if m}
+    codes = {m["client_code"] for _, m in mapped if m}
+    existing_names: set = set()
+    existing_codes: set = set()
+    if names:
+        for name, code in db.query(Client.client_name, Client.client_code).filter(
+            or_(Client.client_name.in_(names), Client.client_code.in_(codes))
+        ):
+            existing_names.add(name)
+            existing_codes.add(code)
+
+    pending: list[tuple[int, dict]] = []
+    for idx, m in mapped:
+        if m is None:
+            results["skipped"] += 1
+            results["rows"].append({"row": idx, "status": "skipped", "detail": "blank or header row"})
+            continue
+        if m["client_name"] in existing_names:
+            results["skipped"] += 1
+            results["rows"].append({"row": idx, "status": "skipped", "client_name": m["client_name"], "detail": "client already exists"})
+            continue
+        if m["client_code"] in existing_codes:
+            detail = f"client_code {m['client_code']} already exists"
+            results["errors"].append(f"Error importing {m['client_name']}: {detail}")
+            results["rows"].append({"row": idx, "status": "error", "client_name": m["client_name"], "detail": detail})
+            continue
+        existing_names.add(m["client_name"])
+        existing_codes.add(m["client_code"])
+        pending.append((idx, m))
+
+    def _record_imported(batch: list[tuple[int, dict]]) -> None:
+        results["imported"] += len(batch)
+        for idx, m in batch:
+            results["rows"].append(
+                {"row": idx, "status": "imported", "client_name": m["client_name"], "client_code": m["client_code"]}
+            )
+
+    step = max(1, int(chunk_size))
+    for i in range(0, len(pending), step):
+        chunk = pending[i : i + step]
+        try:
+            db.bulk_insert_mappings(Client, [m for _, m in chunk])
+            mark_tables_changed(db, Client.__tablename__)
+            db.commit()
+            _record_imported(chunk)
+            continue
+        except Exception:
             db.rollback()
-    
+
+        for idx, m in chunk:
+            try:
+                db.add(Client(**m))
+                db.commit()
+                _record_imported([(idx, m)])
+            except Exception as e:
+                db.rollback()
+                results["errors"].append(f"Error importing {m['client_name']}: {str(e)}")
+                results["rows"].append({"row": idx, "status": "error", "client_name": m["client_name"], "detail": str(e)})
+
+    results["rows"].sort(key=lambda r: r["row"])
     return results
 
 
+@bulk_router.post("/import-bulk")
+async def import_clients_bulk(data: List[dict], chunk_size: int = 500, db: Session = Depends(get_db)):
+    """Import clients from JSON data (no auth required for testing)."""
+    return import_client_rows(db, data, chunk_size=chunk_size)
+
+
+_CLIENT_STAT_DIMENSIONS = {
+    "by_status": (Client.status, ("active", "inactive")),
+    "by_type": (Client.client_type, ("corporate", "government", "individual")),
+    "by_location": (Client.location, ("islamabad", "rawalpindi", "lahore", "karachi", "peshawar")),
+    "by_industry": (Client.industry_type, ("bank", "commercial", "educational", "hospital")),
+}
+
+
+def _client_stat_rows(db: Session) -> list[tuple[str, Optional[str], int]]:
+    """(dimension, value, count) for every distinct value of each statistics dimension, in one statement."""
+    dims = list(_CLIENT_STAT_DIMENSIONS.items())
+    if db.bind.dialect.name == "postgresql":
+        cols = [col for _, (col, _) in dims]
+        stmt = select(*[func.grouping(c) for c in cols], *cols, func.count(Client.id)).group_by(func.grouping_sets(*cols))
+        out = []
+        for row in db.execute(stmt).all():
+            flags, values, count = row[: len(cols)], row[len(cols) : 2 * len(cols)], row[-1]
+            i = list(flags).index(0)
+            out.append((dims[i][0], values[i], int(count or 0)))
+        return out
+
+    parts = [
+        select(literal(name).label("dim"), col.label("value"), func.count(Client.id).label("n")).group_by(col)
+        for name, (col, _) in dims
+    ]
+    return [(r[0], r[1], int(r[2] or 0)) for r in db.execute(union_all(*parts)).all()]
+
+
+def _client_statistics(db: Session) -> dict:
+    result: dict = {name: {k: 0 for k in defaults} for name, (_, defaults) in _CLIENT_STAT_DIMENSIONS.items()}
+    total = 0
+    for dim, value, count in _client_stat_rows(db):
+        if dim == "by_status":
+            total += count
+        if value is None or not str(value).strip():
+            continue
+        key = str(value).strip().lower()
+        result[dim][key] = result[dim].get(key, 0) + count
+    return {"total_clients": total, **result}
+
+
 @bulk_router.get("/statistics")
 async def get_client_statistics(db: Session = Depends(get_db)):
-    """Get client statistics for KPI dashboard (no auth required for testing)."""
-    total_clients = db.query(Client).count()
-    
-    # Count by status
-    active_clients = db.query(Client).filter(Client.status == "Active").count()
-    inactive_clients = db.query(Client).filter(Client.status == "Inactive").count()
-    
-    # Count by type
-    corporate_clients = db.query(Client).filter(Client.client_type == "Corporate").count()
-    government_clients = db.query(Client).filter(Client.client_type == "Government").count()
-    individual_clients = db.query(Client).filter(Client.client_type == "Individual").count()
-    
-    # Count by location
-    islamabad_clients = db.query(Client).filter(Client.location == "Islamabad").count()
-    rawalpindi_clients = db.query(Client).filter(Client.location == "Rawalpindi").count()
-    lahore_clients = db.query(Client).filter(Client.location == "Lahore").count()
-    karachi_clients = db.query(Client).filter(Client.location == "Karachi").count()
-    peshawar_clients = db.query(Client).filter(Client.location == "Peshawar").count()
-    
-    # Count by industry
-    bank_clients = db.query(Client).filter(Client.industry_type == "Bank").count()
-    commercial_clients = db.query(Client).filter(Client.industry_type == "Commercial").count()
-    educational_clients = db.query(Client).filter(Client.industry_type == "Educational").count()
-    hospital_clients = db.query(Client).filter(Client.industry_type == "Hospital").count()
-    
-    return {
-        "total_clients": total_clients,
-        "by_status": {
-            "active": active_clients,
-            "inactive": inactive_clients,
-        },
-        "by_type": {
-            "corporate": corporate_clients,
-            "government": government_clients,
-            "individual": individual_clients,
-        },
-        "by_location": {
-            "islamabad": islamabad_clients,
-            "rawalpindi": rawalpindi_clients,
-            "lahore": lahore_clients,
-            "karachi": karachi_clients,
-            "peshawar": peshawar_clients,
-        },
-        "by_industry": {
-            "bank": bank_clients,
-            "commercial": commercial_clients,
-            "educational": educational_clients,
-            "hospital": hospital_clients,
-        }
-    }
+    """Get client statistics for KPI dashboard (no auth required for testing).
+
+    Counts cover every distinct status/type/location/industry value; the
+    historical keys are always present (0 when unused).
+    """
+    return cached("clients:statistics", tables=("clients",), loader=lambda: _client_statistics(db))
@@ -3,6 +3,7 @@ import uuid
 from typing import List
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
@@ -72,6 +73,10 @@ async def create_employee_warning(
         supervisor_signature_date=(payload.supervisor_signature_date or None),
     )
     db.add(w)
+    db.query(Employee).filter(Employee.id == employee_db_id).update(
+        {Employee.warning_count: func.coalesce(Employee.warning_count, 0) + 1},
+        synchronize_session=False,
+    )
     db.commit()
     db.refresh(w)
     return w
@@ -98,6 +103,10 @@ async def delete_employee_warning(employee_db_id: int, warning_id: int, db: Sess
         db.delete(d)
 
     db.delete(w)
+    db.query(Employee).filter(Employee.id == employee_db_id, Employee.warning_count > 0).update(
+        {Employee.warning_count: Employee.warning_count - 1},
+        synchronize_session=False,
+    )
     db.commit()
     return {"message": "Warning deleted"}
 
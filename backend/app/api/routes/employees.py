@@ -9,17 +9,21 @@ from calendar import monthrange
 from datetime import date, datetime
 from typing import Optional, Any, List
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 from fastapi.responses import Response
 from fpdf import FPDF
 from sqlalchemy import distinct, func, or_
 from sqlalchemy.orm import Session
 
+from app.core.allocations import SITE_STATUSES, overlapping
+from app.core.cache import cached
 from app.core.database import get_db
+from app.core.sequences import max_numeric_suffix, next_value
 from app.api.dependencies import require_permission
+from app.api.routes.bulk_operations import delete_employees_bulk, remove_employee_files
 from app.models.attendance import AttendanceRecord
 from app.models.employee import Employee
-from app.models.employee_warning import EmployeeWarning
+from app.models.employee_language import EmployeeLanguage
 from app.models.client_site_guard_allocation import ClientSiteGuardAllocation
 from app.models.payroll_payment_status import PayrollPaymentStatus
 from app.schemas.employee import (
@@ -322,6 +326,8 @@ async def import_employees_from_google_sheet(
             employee_id = _generate_employee_id(db)
             db_employee = Employee(employee_id=employee_id, **payload)
             db.add(db_employee)
+            db.flush()
+            sync_employee_languages(db, db_employee)
             db.commit()
             db.refresh(db_employee)
             created += 1
@@ -346,6 +352,7 @@ def _apply_employee_filters(
     employment_status: str | None,
     created_from: str | None,
     created_to: str | None,
+    min_warnings: int | None = None,
 ):
     if search:
         search_term = f"%{search}%"
@@ -381,6 +388,9 @@ def _apply_employee_filters(
             raise HTTPException(status_code=400, detail="created_to must be YYYY-MM-DD") from e
         query = query.filter(Employee.created_at <= end_dt)
 
+    if min_warnings is not None and min_warnings > 0:
+        query = query.filter(Employee.warning_count >= int(min_warnings))
+
     return query
 
 
@@ -471,24 +481,56 @@ def _pdf_table(pdf: FPDF, headers: list[str], rows: list[list[str]], col_widths:
 
 
 def _generate_employee_id(db: Session) -> str:
-    """Generate a simple sequential employee_id like SEC-0001.
+    """Generate a sequential employee_id like SEC-0001.
 
-    This looks at the last created employee and increments the numeric suffix.
+    Numbers come from the ``employee_id`` sequence counter, seeded once from
+    the highest existing SEC-NNNN id.
     """
 
-    last_employee = db.query(Employee).order_by(Employee.id.desc()).first()
-    if not last_employee or not last_employee.employee_id:
-        next_number = 1
-    else:
-        # Try to parse trailing number from existing employee_id (e.g. SEC-0007)
-        parts = str(last_employee.employee_id).split("-")
-        try:
-            last_number = int(parts[-1])
-            next_number = last_number + 1
-        except (ValueError, TypeError):
-            next_number = (last_employee.id or 0) + 1
+    n = next_value(db, "employee_id", seed=lambda: max_numeric_suffix(db, Employee.employee_id, "SEC-"))
+    return f"SEC-{n:04d}"
+
+
+def _json_list(v: Any) -> list:
+    if isinstance(v, list):
+        return v
+    if not v:
+        return []
+    try:
+        parsed = json.loads(v)
+        return parsed if isinstance(parsed, list) else []
+    except Exception:
+        return []
+
+
+def employee_language_rows(spoken: Any, proficiency: Any) -> list[dict[str, Any]]:
+    """Normalise ``languages_spoken`` / ``languages_proficiency`` into employee_languages rows."""
+
+    rows: dict[str, dict[str, Any]] = {}
+    for x in _json_list(spoken):
+        name = str(x or "").strip()[:80]
+        if name:
+            rows.setdefault(name.lower(), {"language": name.lower(), "display_name": name, "level": None})
+    for x in _json_list(proficiency):
+        if not isinstance(x, dict):
+            continue
+        name = str(x.get("language") or "").strip()[:80]
+        if not name:
+            continue
+        row = rows.setdefault(name.lower(), {"language": name.lower(), "display_name": name, "level": None})
+        level = str(x.get("level") or "").strip()[:40]
+        if level:
+            row["level"] = level
+    return list(rows.values())
+
 
-    return f"SEC-{next_number:04d}"
+def sync_employee_languages(db: Session, employee: Employee) -> None:
+    """Rewrite the employee_languages rows for one employee (caller commits)."""
+
+    db.query(EmployeeLanguage).filter(EmployeeLanguage.employee_db_id == employee.id).delete(synchronize_session=False)
+    rows = employee_language_rows(employee.languages_spoken, employee.languages_proficiency)
+    if rows:
+        db.bulk_insert_mappings(EmployeeLanguage, [{"employee_db_id": employee.id, **r} for r in rows])
 
 
 @router.post("/", response_model=EmployeeSchema)
@@ -521,6 +563,8 @@ async def create_employee(
         **payload,
     )
     db.add(db_employee)
+    db.flush()
+    sync_employee_languages(db, db_employee)
     db.commit()
     db.refresh(db_employee)
 
@@ -537,10 +581,15 @@ async def list_employees(
     employment_status: str = None,
     created_from: str | None = None,
     created_to: str | None = None,
+    min_warnings: int | None = None,
     with_total: bool = True,
     db: Session = Depends(get_db),
 ):
-    """Return a paginated list of employees with optional search and filters."""
+    """Return a paginated list of employees with optional search and filters.
+
+    warning_count is read from the denormalised column (UI highlights >= 3);
+    min_warnings filters on it, e.g. min_warnings=3.
+    """
     
     try:
         query = db.query(Employee)
@@ -552,26 +601,10 @@ async def list_employees(
             employment_status=employment_status,
             created_from=created_from,
             created_to=created_to,
+            min_warnings=min_warnings,
         )
         
         employees = query.offset(skip).limit(limit).all()
-
-        # Attach warning_count for UI highlighting (warnings >= 3)
-        employee_db_ids = [e.id for e in employees if e and e.id is not None]
-        warning_counts: dict[int, int] = {}
-        if employee_db_ids:
-            rows = (
-                db.query(EmployeeWarning.employee_db_id, func.count(EmployeeWarning.id))
-                .filter(EmployeeWarning.employee_db_id.in_(employee_db_ids))
-                .group_by(EmployeeWarning.employee_db_id)
-                .all()
-            )
-            warning_counts = {int(r[0]): int(r[1]) for r in rows if r and r[0] is not None}
-            for e in employees:
-                try:
-                    setattr(e, "warning_count", warning_counts.get(int(e.id), 0))
-                except Exception:
-                    pass
         total = query.count() if with_total else 0
 
         return EmployeeList(employees=employees, total=total)
@@ -582,6 +615,9 @@ async def list_employees(
         raise HTTPException(status_code=500, detail=str(ex))
 
 
+_KPI_TABLES = ("employees", "employee_warnings", "client_site_guard_allocations")
+
+
 @router.get("/kpis")
 async def employees_kpis(
     search: str = None,
@@ -590,7 +626,36 @@ async def employees_kpis(
     employment_status: str = None,
     created_from: str | None = None,
     created_to: str | None = None,
+    min_warnings: int | None = None,
     db: Session = Depends(get_db),
+) -> dict:
+    filters = {
+        "search": search,
+        "department": department,
+        "designation": designation,
+        "employment_status": employment_status,
+        "created_from": created_from,
+        "created_to": created_to,
+        "min_warnings": min_warnings,
+    }
+    return cached(
+        "employees:kpis",
+        key={**filters, "today": date.today().isoformat()},
+        tables=_KPI_TABLES,
+        loader=lambda: _employees_kpis(db, **filters),
+    )
+
+
+def _employees_kpis(
+    db: Session,
+    *,
+    search: str | None,
+    department: str | None,
+    designation: str | None,
+    employment_status: str | None,
+    created_from: str | None,
+    created_to: str | None,
+    min_warnings: int | None,
 ) -> dict:
     q_emp = db.query(Employee)
     q_emp = _apply_employee_filters(
@@ -601,6 +666,7 @@ async def employees_kpis(
         employment_status=employment_status,
         created_from=created_from,
         created_to=created_to,
+        min_warnings=min_warnings,
     )
 
     total = int(q_emp.count())
@@ -612,35 +678,28 @@ async def employees_kpis(
     allocated_count = (
         db.query(func.count(distinct(ClientSiteGuardAllocation.employee_db_id)))
         .join(Employee, Employee.id == ClientSiteGuardAllocation.employee_db_id)
-        .filter(ClientSiteGuardAllocation.status == "Allocated")
-        .filter(or_(ClientSiteGuardAllocation.start_date.is_(None), ClientSiteGuardAllocation.start_date <= today))
-        .filter(or_(ClientSiteGuardAllocation.end_date.is_(None), ClientSiteGuardAllocation.end_date >= today))
+        .filter(*overlapping(today, today, SITE_STATUSES))
         .filter(Employee.id.in_(q_emp.with_entities(Employee.id)))
         .scalar()
         or 0
     )
 
-    # Top 3 employees by warnings within the filtered employees
+    # Top 3 employees by warnings within the filtered employees (indexed warning_count)
     top_rows = (
-        db.query(EmployeeWarning.employee_db_id, func.count(EmployeeWarning.id).label("cnt"))
-        .join(Employee, Employee.id == EmployeeWarning.employee_db_id)
-        .filter(Employee.id.in_(q_emp.with_entities(Employee.id)))
-        .group_by(EmployeeWarning.employee_db_id)
-        .order_by(func.count(EmployeeWarning.id).desc())
+        q_emp.with_entities(Employee.id, Employee.employee_id, Employee.first_name, Employee.last_name, Employee.warning_count)
+        .filter(Employee.warning_count > 0)
+        .order_by(Employee.warning_count.desc(), Employee.id.asc())
         .limit(3)
         .all()
     )
 
     top_out: list[dict] = []
-    for emp_db_id, cnt in top_rows:
-        emp = db.query(Employee).filter(Employee.id == emp_db_id).first()
-        if not emp:
-            continue
-        nm = " ".join([p for p in [emp.first_name, emp.last_name] if p])
+    for emp_db_id, emp_id, first_name, last_name, cnt in top_rows:
+        nm = " ".join([p for p in [first_name, last_name] if p])
         top_out.append(
             {
-                "employee_db_id": int(emp.id),
-                "employee_id": str(emp.employee_id or ""),
+                "employee_db_id": int(emp_db_id),
+                "employee_id": str(emp_id or ""),
                 "name": nm,
                 "warnings": int(cnt or 0),
             }
@@ -664,9 +723,7 @@ async def list_active_allocated_employee_db_ids(
     target = day or date.today()
     rows = (
         db.query(ClientSiteGuardAllocation.employee_db_id)
-        .filter(ClientSiteGuardAllocation.status == "Allocated")
-        .filter(or_(ClientSiteGuardAllocation.start_date.is_(None), ClientSiteGuardAllocation.start_date <= target))
-        .filter(or_(ClientSiteGuardAllocation.end_date.is_(None), ClientSiteGuardAllocation.end_date >= target))
+        .filter(*overlapping(target, target, SITE_STATUSES))
         .distinct()
         .all()
     )
@@ -693,6 +750,27 @@ async def get_employee_by_db_id(employee_db_id: int, db: Session = Depends(get_d
     return employee
 
 
+@router.put("/bulk-delete")
+async def bulk_delete_employees(
+    employee_ids: List[str],
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    _user=Depends(require_permission("employees:delete")),
+):
+    """Delete multiple employees by employee_ids.
+
+    Declared before PUT /{employee_id} so "bulk-delete" is not captured as an id.
+    """
+    
+    if not employee_ids:
+        raise HTTPException(status_code=400, detail="No employee IDs provided")
+
+    result, paths, db_ids = delete_employees_bulk(db, employee_ids)
+    background_tasks.add_task(remove_employee_files, paths, db_ids)
+    result["files_scheduled_for_removal"] = len(paths)
+    return result
+
+
 @router.put("/{employee_id}", response_model=EmployeeSchema)
 async def update_employee(
     employee_id: str,
@@ -717,6 +795,8 @@ async def update_employee(
         update_data["bank_accounts"] = json.dumps(update_data["bank_accounts"], ensure_ascii=False)
     for field, value in update_data.items():
         setattr(employee, field, value)
+    if "languages_spoken" in update_data or "languages_proficiency" in update_data:
+        sync_employee_languages(db, employee)
 
     db.commit()
     db.refresh(employee)
@@ -873,44 +953,6 @@ async def bulk_delete_test():
     return {"message": "Bulk delete test endpoint works"}
 
 
-@router.put("/bulk-delete")
-async def bulk_delete_employees(
-    employee_ids: List[str],
-    db: Session = Depends(get_db),
-    _user=Depends(require_permission("employees:delete")),
-):
-    """Delete multiple employees by employee_ids."""
-    
-    if not employee_ids:
-        raise HTTPException(status_code=400, detail="No employee IDs provided")
-    
-    # Find all employees to delete
-    employees = db.query(Employee).filter(Employee.employee_id.in_(employee_ids)).all()
-    
-    if not employees:
-        raise HTTPException(status_code=404, detail="No employees found with provided IDs")
-    
-    found_ids = {emp.employee_id for emp in employees}
-    missing_ids = set(employee_ids) - found_ids
-    
-    # Delete found employees
-    for employee in employees:
-        db.delete(employee)
-    
-    db.commit()
-    
-    result = {
-        "message": f"Successfully deleted {len(employees)} employee(s)",
-        "deleted_count": len(employees),
-        "deleted_ids": list(found_ids)
-    }
-    
-    if missing_ids:
-        result["warning"] = f"Could not find {len(missing_ids)} employee(s): {', '.join(missing_ids)}"
-    
-    return result
-
-
 @router.delete("/{employee_id}")
 async def delete_employee(
     employee_id: str,
@@ -923,32 +965,33 @@ async def delete_employee(
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
 
+    db.query(EmployeeLanguage).filter(EmployeeLanguage.employee_db_id == employee.id).delete(synchronize_session=False)
     db.delete(employee)
     db.commit()
 
     return {"message": "Employee deleted successfully"}
 
 
+def distinct_employee_values(db: Session, column) -> list[str]:
+    """Cached distinct non-empty values of an Employee column (dropdown lookups)."""
+
+    def _load() -> list[str]:
+        rows = db.query(column).filter(column.isnot(None), column != "").distinct().all()
+        return [r[0] for r in rows if r[0]]
+
+    return cached(f"employees:distinct:{column.key}", tables=("employees",), loader=_load)
+
+
 @router.get("/departments/list")
 async def get_departments(db: Session = Depends(get_db)):
     """Get all unique departments from employees."""
-    
-    departments = db.query(Employee.department).filter(
-        Employee.department.isnot(None),
-        Employee.department != ""
-    ).distinct().all()
-    
-    return {"departments": [dept[0] for dept in departments if dept[0]]}
+
+    return {"departments": distinct_employee_values(db, Employee.department)}
 
 
 @router.get("/designations/list")
 async def get_designations(db: Session = Depends(get_db)):
     """Get all unique designations from employees."""
-    
-    designations = db.query(Employee.designation).filter(
-        Employee.designation.isnot(None),
-        Employee.designation != ""
-    ).distinct().all()
-    
-    return {"designations": [desig[0] for desig in designations if desig[0]]}
+
+    return {"designations": distinct_employee_values(db, Employee.designation)}
 
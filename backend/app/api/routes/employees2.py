@@ -15,6 +15,7 @@ from sqlalchemy.orm import Session
 from fpdf import FPDF
 from pypdf import PdfReader, PdfWriter
 
+from app.core.cache import cached
 from app.core.database import get_db
 from app.api.dependencies import require_permission
 from app.models.employee2 import Employee2
@@ -70,18 +71,26 @@ async def list_employees2(
     return Employee2List(employees=employees, total=total)
 
 
+def distinct_employee2_values(db: Session, column) -> list[str]:
+    """Cached distinct non-blank values of an Employee2 column."""
+
+    def _load() -> list[str]:
+        rows = db.query(column).distinct().filter(column.isnot(None)).all()
+        return [r[0] for r in rows if r[0] and str(r[0]).strip()]
+
+    return cached(f"employees2:distinct:{column.key}", tables=("employees2",), loader=_load)
+
+
 @router.get("/categories")
 async def list_categories(db: Session = Depends(get_db)):
     """Get distinct categories."""
-    rows = db.query(Employee2.category).distinct().filter(Employee2.category.isnot(None)).all()
-    return [r[0] for r in rows if r[0] and str(r[0]).strip()]
+    return distinct_employee2_values(db, Employee2.category)
 
 
 @router.get("/statuses")
 async def list_statuses(db: Session = Depends(get_db)):
     """Get distinct statuses."""
-    rows = db.query(Employee2.status).distinct().filter(Employee2.status.isnot(None)).all()
-    return [r[0] for r in rows if r[0] and str(r[0]).strip()]
+    return distinct_employee2_values(db, Employee2.status)
 
 
 @router.post("/", response_model=Employee2Schema)
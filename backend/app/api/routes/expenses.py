@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 
 from app.models.user import User
 from app.core.database import get_db
+from app.core.sequences import max_numeric_suffix, next_value
 from app.models.expense import Expense
 from app.models.finance_account import FinanceAccount
 from app.models.finance_journal_entry import FinanceJournalEntry
@@ -30,22 +31,12 @@ def _next_expense_entry_no(db: Session, expense_date: date) -> str:
     ym = expense_date.strftime("%Y%m")
     prefix = f"EXP-{ym}-"
 
-    last = (
-        db.query(FinanceJournalEntry)
-        .filter(FinanceJournalEntry.entry_no.like(f"{prefix}%"))
-        .order_by(FinanceJournalEntry.id.desc())
-        .first()
+    n = next_value(
+        db,
+        f"expense_entry:{ym}",
+        seed=lambda: max_numeric_suffix(db, FinanceJournalEntry.entry_no, prefix),
     )
-
-    if not last:
-        return f"{prefix}0001"
-
-    tail = last.entry_no.replace(prefix, "")
-    try:
-        n = int(tail)
-    except ValueError:
-        n = 0
-    return f"{prefix}{n + 1:04d}"
+    return f"{prefix}{n:04d}"
 
 
 def _create_expense_journal_entry(db: Session, expense: Expense) -> FinanceJournalEntry:
@@ -5,6 +5,7 @@ from datetime import date, datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import Response
 from fpdf import FPDF
 from sqlalchemy.orm import Session
@@ -236,14 +237,89 @@ async def export_accounts_monthly_pdf(
     return Response(content=pdf_bytes, media_type="application/pdf", headers={"Content-Disposition": f'attachment; filename="accounts_export_{month}.pdf"'})
 
 
-@router.get("/inventory/employees/pdf")
-async def export_employee_inventory_pdf(
-    include_zero: bool = True,
-    search: Optional[str] = None,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    db: Session = Depends(get_db),
-) -> Response:
+def _legacy_employee_ids(db: Session) -> dict[str, str]:
+    """Lower-cased "first last" name -> old ``employees.employee_id``, for the name-based fallback."""
+    out: dict[str, str] = {}
+    rows = db.query(Employee.first_name, Employee.last_name, Employee.employee_id).order_by(Employee.id.asc()).all()
+    for first, last, employee_id in rows:
+        key = f"{first or ''} {last or ''}".strip().lower()
+        if key and employee_id and key not in out:
+            out[key] = str(employee_id).strip()
+    return out
+
+
+def _inventory_by_employee(db: Session, employee_ids: Optional[set[str]] = None) -> dict[str, tuple[list, list, list]]:
+    """Issued inventory keyed by employee id: (serial rows, restricted qty rows, general qty rows).
+
+    One query per dataset for all employees (or only ``employee_ids``).
+    """
+    out: dict[str, tuple[list, list, list]] = {}
+
+    def _rows(emp: Optional[str]) -> tuple[list, list, list]:
+        return out.setdefault(str(emp or "").strip(), ([], [], []))
+
+    serials = db.query(RestrictedItemSerialUnit, RestrictedItem).join(
+        RestrictedItem, RestrictedItem.item_code == RestrictedItemSerialUnit.item_code
+    )
+    restricted_qty = db.query(RestrictedItemEmployeeBalance, RestrictedItem).join(
+        RestrictedItem, RestrictedItem.item_code == RestrictedItemEmployeeBalance.item_code
+    ).filter(RestrictedItemEmployeeBalance.quantity_issued > 0)
+    general_qty = db.query(GeneralItemEmployeeBalance, GeneralItem).join(
+        GeneralItem, GeneralItem.item_code == GeneralItemEmployeeBalance.item_code
+    ).filter(GeneralItemEmployeeBalance.quantity_issued > 0)
+    if employee_ids is None:
+        serials = serials.filter(RestrictedItemSerialUnit.issued_to_employee_id.isnot(None))
+    else:
+        ids = list(employee_ids)
+        serials = serials.filter(RestrictedItemSerialUnit.issued_to_employee_id.in_(ids))
+        restricted_qty = restricted_qty.filter(RestrictedItemEmployeeBalance.employee_id.in_(ids))
+        general_qty = general_qty.filter(GeneralItemEmployeeBalance.employee_id.in_(ids))
+
+    for su, it in serials.order_by(RestrictedItemSerialUnit.id.asc()).all():
+        _rows(su.issued_to_employee_id)[0].append(
+            [it.item_code, it.name, su.serial_number, str(su.status).title(), (su.updated_at.strftime("%Y-%m-%d") if su.updated_at else "-")]
+        )
+    for bal, it in restricted_qty.order_by(RestrictedItemEmployeeBalance.id.asc()).all():
+        _rows(bal.employee_id)[1].append([it.item_code, it.name, it.unit_name, _fmt_money(bal.quantity_issued)])
+    for bal, it in general_qty.order_by(GeneralItemEmployeeBalance.id.asc()).all():
+        _rows(bal.employee_id)[2].append([it.item_code, it.name, it.unit_name, _fmt_money(bal.quantity_issued)])
+    return out
+
+
+def _employee_inventory(
+    inventory: dict[str, tuple[list, list, list]], emp_id: str, legacy_id: Optional[str]
+) -> tuple[list, list, list]:
+    r_serial_data: list = []
+    r_qty_data: list = []
+    g_qty_data: list = []
+    for key in dict.fromkeys(k for k in (emp_id, legacy_id) if k):
+        serial_rows, restricted_rows, general_rows = inventory.get(key, ([], [], []))
+        r_serial_data += serial_rows
+        r_qty_data += restricted_rows
+        g_qty_data += general_rows
+    return r_serial_data, r_qty_data, g_qty_data
+
+
+def _pdf_employee_inventory(pdf: FPDF, r_serial_data: list, r_qty_data: list, g_qty_data: list) -> None:
+    if r_serial_data:
+        _pdf_section_title(pdf, "WEAPONS & SERIALIZED EQUIPMENT")
+        _pdf_table(pdf, ["Code", "Item Name", "Serial #", "Status", "Date"], r_serial_data, [25, 65, 40, 26, 30])
+
+    if r_qty_data:
+        _pdf_section_title(pdf, "AMMUNITION & RESTRICTED CONSUMABLES")
+        _pdf_table(pdf, ["Code", "Item Name", "Unit", "Quantity"], r_qty_data, [30, 100, 26, 30])
+
+    if g_qty_data:
+        _pdf_section_title(pdf, "GENERAL STORE & UTILITY ITEMS")
+        _pdf_table(pdf, ["Code", "Item Name", "Unit", "Quantity"], g_qty_data, [30, 100, 26, 30])
+
+
+def _pdf_bytes(pdf: FPDF) -> bytes:
+    out = pdf.output(dest="S")
+    return bytes(out) if isinstance(out, (bytes, bytearray)) else str(out).encode("latin-1")
+
+
+def _build_employee_inventory_pdf(db: Session, include_zero: bool, search: Optional[str]) -> bytes:
     query = db.query(Employee2)
     if search:
         s = f"%{search}%"
@@ -255,35 +331,18 @@ async def export_employee_inventory_pdf(
         )
     
     employees = query.order_by(Employee2.serial_no.asc()).all()
+    # Inventory and the legacy-ID name fallback for every employee, loaded up front.
+    legacy_ids = _legacy_employee_ids(db)
+    inventory = _inventory_by_employee(db)
+
     pdf = _pdf_new_portrait()
     first_employee = True
 
     for emp in employees:
         emp_id = str(emp.fss_no or emp.serial_no or emp.id).strip()
         name = str(emp.name or "Unknown")
-        
-        # Fetch inventory - with name-based fallback for legacy IDs
-        # 1. Get legacy IDs if any (matching by name)
-        legacy_ids = {emp_id}
-        old_emp = db.query(Employee).filter(
-            (func.concat(Employee.first_name, " ", Employee.last_name).ilike(name))
-        ).first()
-        if old_emp:
-            legacy_ids.add(str(old_emp.employee_id).strip())
-
-        restricted_serials = (
-            db.query(RestrictedItemSerialUnit, RestrictedItem)
-            .join(RestrictedItem, RestrictedItem.item_code == RestrictedItemSerialUnit.item_code)
-            .filter(RestrictedItemSerialUnit.issued_to_employee_id.in_(list(legacy_ids)))
-            .all()
-        )
-        r_serial_data = [[it.item_code, it.name, su.serial_number, str(su.status).title(), (su.updated_at.strftime("%Y-%m-%d") if su.updated_at else "-")] for su, it in restricted_serials]
-
-        restricted_qty = db.query(RestrictedItemEmployeeBalance, RestrictedItem).join(RestrictedItem, RestrictedItem.item_code == RestrictedItemEmployeeBalance.item_code).filter(RestrictedItemEmployeeBalance.employee_id.in_(list(legacy_ids)), RestrictedItemEmployeeBalance.quantity_issued > 0).all()
-        r_qty_data = [[it.item_code, it.name, it.unit_name, _fmt_money(bal.quantity_issued)] for bal, it in restricted_qty]
 
-        general_qty = db.query(GeneralItemEmployeeBalance, GeneralItem).join(GeneralItem, GeneralItem.item_code == GeneralItemEmployeeBalance.item_code).filter(GeneralItemEmployeeBalance.employee_id.in_(list(legacy_ids)), GeneralItemEmployeeBalance.quantity_issued > 0).all()
-        g_qty_data = [[it.item_code, it.name, it.unit_name, _fmt_money(bal.quantity_issued)] for bal, it in general_qty]
+        r_serial_data, r_qty_data, g_qty_data = _employee_inventory(inventory, emp_id, legacy_ids.get(name.strip().lower()))
 
         total = len(r_serial_data) + len(r_qty_data) + len(g_qty_data)
         if not include_zero and total == 0:
@@ -294,25 +353,27 @@ async def export_employee_inventory_pdf(
         _pdf_header(pdf, title="Employee Inventory Report", subtitle=f"Staff: {name} ({emp_id})")
         first_employee = False
 
-        if r_serial_data:
-            _pdf_section_title(pdf, "WEAPONS & SERIALIZED EQUIPMENT")
-            _pdf_table(pdf, ["Code", "Item Name", "Serial #", "Status", "Date"], r_serial_data, [25, 65, 40, 26, 30])
-        
-        if r_qty_data:
-            _pdf_section_title(pdf, "AMMUNITION & RESTRICTED CONSUMABLES")
-            _pdf_table(pdf, ["Code", "Item Name", "Unit", "Quantity"], r_qty_data, [30, 100, 26, 30])
-
-        if g_qty_data:
-            _pdf_section_title(pdf, "GENERAL STORE & UTILITY ITEMS")
-            _pdf_table(pdf, ["Code", "Item Name", "Unit", "Quantity"], g_qty_data, [30, 100, 26, 30])
+        _pdf_employee_inventory(pdf, r_serial_data, r_qty_data, g_qty_data)
         
         if total == 0:
             pdf.ln(5)
             pdf.set_font("Helvetica", "I", 9)
             pdf.cell(0, 10, "No inventory items recorded for this employee.", ln=1)
 
-    out = pdf.output(dest="S")
-    pdf_bytes = bytes(out) if isinstance(out, (bytes, bytearray)) else str(out).encode("latin-1")
+    return _pdf_bytes(pdf)
+
+
+@router.get("/inventory/employees/pdf")
+async def export_employee_inventory_pdf(
+    include_zero: bool = True,
+    search: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    db: Session = Depends(get_db),
+) -> Response:
+    """One page per employee; ``include_zero=false`` keeps only employees holding any items."""
+    # Loading and rendering thousands of pages is blocking work; keep it off the event loop.
+    pdf_bytes = await run_in_threadpool(_build_employee_inventory_pdf, db, include_zero, search)
     return Response(content=pdf_bytes, media_type="application/pdf", headers={"Content-Disposition": f'attachment; filename="all_inventory_{datetime.now().strftime("%Y%m%d")}.pdf"'})
 
 
@@ -339,37 +400,17 @@ async def export_single_employee_inventory_pdf(
     if old_emp:
         legacy_ids.add(str(old_emp.employee_id).strip())
 
-    restricted_serials = (
-        db.query(RestrictedItemSerialUnit, RestrictedItem)
-        .join(RestrictedItem, RestrictedItem.item_code == RestrictedItemSerialUnit.item_code)
-        .filter(RestrictedItemSerialUnit.issued_to_employee_id.in_(list(legacy_ids)))
-        .all()
+    inventory = _inventory_by_employee(db, legacy_ids)
+    r_serial_data, r_qty_data, g_qty_data = _employee_inventory(
+        inventory, emp_id, str(old_emp.employee_id).strip() if old_emp else None
     )
-    r_serial_data = [[it.item_code, it.name, su.serial_number, str(su.status).title(), (su.updated_at.strftime("%Y-%m-%d") if su.updated_at else "-")] for su, it in restricted_serials]
-
-    restricted_qty = db.query(RestrictedItemEmployeeBalance, RestrictedItem).join(RestrictedItem, RestrictedItem.item_code == RestrictedItemEmployeeBalance.item_code).filter(RestrictedItemEmployeeBalance.employee_id.in_(list(legacy_ids)), RestrictedItemEmployeeBalance.quantity_issued > 0).all()
-    r_qty_data = [[it.item_code, it.name, it.unit_name, _fmt_money(bal.quantity_issued)] for bal, it in restricted_qty]
-
-    general_qty = db.query(GeneralItemEmployeeBalance, GeneralItem).join(GeneralItem, GeneralItem.item_code == GeneralItemEmployeeBalance.item_code).filter(GeneralItemEmployeeBalance.employee_id.in_(list(legacy_ids)), GeneralItemEmployeeBalance.quantity_issued > 0).all()
-    g_qty_data = [[it.item_code, it.name, it.unit_name, _fmt_money(bal.quantity_issued)] for bal, it in general_qty]
-
-    if r_serial_data:
-        _pdf_section_title(pdf, "WEAPONS & SERIALIZED EQUIPMENT")
-        _pdf_table(pdf, ["Code", "Item Name", "Serial #", "Status", "Date"], r_serial_data, [25, 65, 40, 26, 30])
-    
-    if r_qty_data:
-        _pdf_section_title(pdf, "AMMUNITION & RESTRICTED CONSUMABLES")
-        _pdf_table(pdf, ["Code", "Item Name", "Unit", "Quantity"], r_qty_data, [30, 100, 26, 30])
 
-    if g_qty_data:
-        _pdf_section_title(pdf, "GENERAL STORE & UTILITY ITEMS")
-        _pdf_table(pdf, ["Code", "Item Name", "Unit", "Quantity"], g_qty_data, [30, 100, 26, 30])
+    _pdf_employee_inventory(pdf, r_serial_data, r_qty_data, g_qty_data)
 
     if not (r_serial_data or r_qty_data or g_qty_data):
         pdf.ln(5)
         pdf.set_font("Helvetica", "I", 10)
         pdf.cell(0, 10, "No inventory items found.", ln=1)
 
-    out = pdf.output(dest="S")
-    pdf_bytes = bytes(out) if isinstance(out, (bytes, bytearray)) else str(out).encode("latin-1")
+    pdf_bytes = _pdf_bytes(pdf)
     return Response(content=pdf_bytes, media_type="application/pdf", headers={"Content-Disposition": f'attachment; filename="inventory_{emp_id}.pdf"'})
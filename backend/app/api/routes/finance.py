@@ -1,25 +1,31 @@
 from __future__ import annotations
 
 from datetime import date
+from typing import Optional
 from decimal import Decimal
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.sql import func
 
 from app.models.user import User
 from app.core.database import get_db
+from app.core.finance_balances import account_ledger, record_posting, trial_balance
+from app.core.sequences import max_numeric_suffix, next_value
 from app.api.dependencies import require_permission
 from app.models.finance_account import FinanceAccount
 from app.models.finance_journal_entry import FinanceJournalEntry
 from app.models.finance_journal_line import FinanceJournalLine
 from app.schemas.finance import (
+    AccountLedger,
     FinanceAccount as FinanceAccountSchema,
     FinanceAccountCreate,
     FinanceAccountUpdate,
     FinanceJournalEntry as FinanceJournalEntrySchema,
     FinanceJournalEntryCreate,
+    FinanceJournalEntryListItem,
     FinanceJournalEntryUpdate,
+    TrialBalance,
 )
 
 router = APIRouter(dependencies=[Depends(require_permission("accounts:full"))])
@@ -69,22 +75,12 @@ def _next_entry_no(db: Session, entry_date: date) -> str:
     ym = entry_date.strftime("%Y%m")
     prefix = f"JE-{ym}-"
 
-    last = (
-        db.query(FinanceJournalEntry)
-        .filter(FinanceJournalEntry.entry_no.like(f"{prefix}%"))
-        .order_by(FinanceJournalEntry.id.desc())
-        .first()
+    n = next_value(
+        db,
+        f"journal_entry:{ym}",
+        seed=lambda: max_numeric_suffix(db, FinanceJournalEntry.entry_no, prefix),
     )
-
-    if not last:
-        return f"{prefix}0001"
-
-    tail = last.entry_no.replace(prefix, "")
-    try:
-        n = int(tail)
-    except ValueError:
-        n = 0
-    return f"{prefix}{n + 1:04d}"
+    return f"{prefix}{n:04d}"
 
 
 @router.get("/accounts", response_model=list[FinanceAccountSchema])
@@ -142,6 +138,42 @@ def get_account(
     return acc
 
 
+@router.get("/accounts/{account_id}/ledger", response_model=AccountLedger)
+def get_account_ledger(
+    account_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    include_children: bool = False,
+    db: Session = Depends(get_db),
+    _user: User = Depends(require_permission("accounts:full")),
+):
+    """POSTED lines of the account with a running balance (debit - credit).
+
+    Defaults to the month of ``date_to`` (today if not given). With
+    ``include_children`` the ledger covers every account below this one.
+    """
+    acc = db.query(FinanceAccount).filter(FinanceAccount.id == account_id).first()
+    if not acc:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    date_to = date_to or date.today()
+    date_from = date_from or date_to.replace(day=1)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must be on or before date_to")
+
+    return account_ledger(db, acc, date_from, date_to, include_children=include_children)
+
+
+@router.get("/trial-balance", response_model=TrialBalance)
+def get_trial_balance(
+    as_of: Optional[date] = None,
+    db: Session = Depends(get_db),
+    _user: User = Depends(require_permission("accounts:full")),
+):
+    """Balances of every account at the end of ``as_of`` (default today), with parent roll-ups."""
+    return trial_balance(db, as_of or date.today())
+
+
 @router.put("/accounts/{account_id}", response_model=FinanceAccountSchema)
 def update_account(
     account_id: int,
@@ -206,12 +238,79 @@ def delete_account(
     return {"ok": True}
 
 
-@router.get("/journals", response_model=list[FinanceJournalEntrySchema])
+@router.get("/journals", response_model=list[FinanceJournalEntryListItem])
 def list_journals(
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    status: Optional[str] = None,
+    source_type: Optional[str] = None,
+    account_id: Optional[int] = None,
+    cursor: Optional[int] = None,
+    limit: int = 100,
+    summary: bool = False,
     db: Session = Depends(get_db),
     _user: User = Depends(require_permission("accounts:full")),
 ):
-    return db.query(FinanceJournalEntry).order_by(FinanceJournalEntry.id.desc()).all()
+    """Newest first. When more rows exist the ``X-Next-Cursor`` header holds the ``cursor`` for the next page.
+
+    ``summary`` leaves out the lines (``lines`` is null); line count and total
+    debit are returned either way.
+    """
+    q = db.query(FinanceJournalEntry)
+    if date_from:
+        q = q.filter(FinanceJournalEntry.entry_date >= date_from)
+    if date_to:
+        q = q.filter(FinanceJournalEntry.entry_date <= date_to)
+    if status:
+        q = q.filter(FinanceJournalEntry.status == status.strip().upper())
+    if source_type:
+        q = q.filter(FinanceJournalEntry.source_type == source_type)
+    if account_id is not None:
+        q = q.filter(
+            FinanceJournalEntry.id.in_(
+                db.query(FinanceJournalLine.entry_id).filter(FinanceJournalLine.account_id == account_id)
+            )
+        )
+    if cursor is not None:
+        q = q.filter(FinanceJournalEntry.id < cursor)
+    if not summary:
+        q = q.options(selectinload(FinanceJournalEntry.lines))
+
+    limit = min(max(limit, 1), 500)
+    entries = q.order_by(FinanceJournalEntry.id.desc()).limit(limit + 1).all()
+    if len(entries) > limit:
+        entries = entries[:limit]
+        response.headers["X-Next-Cursor"] = str(entries[-1].id)
+
+    totals = {}
+    if entries:
+        totals = {
+            entry_id: (count, debit)
+            for entry_id, count, debit in db.query(
+                FinanceJournalLine.entry_id, func.count(FinanceJournalLine.id), func.sum(FinanceJournalLine.debit)
+            )
+            .filter(FinanceJournalLine.entry_id.in_([e.id for e in entries]))
+            .group_by(FinanceJournalLine.entry_id)
+        }
+
+    return [
+        FinanceJournalEntryListItem(
+            id=e.id,
+            entry_no=e.entry_no,
+            entry_date=e.entry_date,
+            memo=e.memo,
+            source_type=e.source_type,
+            source_id=e.source_id,
+            status=e.status,
+            created_at=e.created_at,
+            posted_at=e.posted_at,
+            line_count=totals.get(e.id, (0, 0))[0],
+            total_debit=Decimal(str(totals.get(e.id, (0, 0))[1] or 0)),
+            lines=None if summary else e.lines,
+        )
+        for e in entries
+    ]
 
 
 @router.post("/journals", response_model=FinanceJournalEntrySchema)
@@ -370,6 +469,7 @@ def post_journal(
     entry.posted_at = func.now()
 
     try:
+        record_posting(db, entry)
         db.commit()
     except ValueError as e:
         db.rollback()
@@ -438,6 +538,7 @@ def reverse_journal(
     reversal.posted_at = func.now()
 
     try:
+        record_posting(db, reversal)
         db.commit()
     except ValueError as e:
         db.rollback()
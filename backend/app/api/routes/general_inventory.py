@@ -1,19 +1,28 @@
 import os
 import uuid
+from datetime import date, datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy import distinct
 from sqlalchemy.orm import Session
 
+from app.core.cache import mark_tables_changed
 from app.core.database import get_db
+from app.core.inventory_history import history_query, page, stream_csv
+from app.core.stock import add_balance, add_balances, describe_errors, put_stock, set_stock, take_balance, take_stock
+from app.core.stock_ledger import stock_as_of, take_snapshot
 from app.api.dependencies import require_permission
 from app.models.employee import Employee
 from app.models.general_item import GeneralItem
 from app.models.general_item_employee_balance import GeneralItemEmployeeBalance
 from app.models.general_item_transaction import GeneralItemTransaction
+from app.models.inventory_stock_snapshot import InventoryStockSnapshot
 from app.schemas.general_inventory import (
     AdjustRequest,
+    BatchIssueRequest,
+    BatchIssueResult,
     EmployeeGeneralIssuedInventory,
     EmployeeGeneralIssuedQuantity,
     GeneralItemCreate,
@@ -23,6 +32,7 @@ from app.schemas.general_inventory import (
     IssueRequest,
     ReturnRequest,
 )
+from app.schemas.inventory_ledger import StockAsOfOut, StockSnapshotOut
 
 
 router = APIRouter(dependencies=[Depends(require_permission("inventory:view"))])
@@ -47,22 +57,6 @@ def _ensure_employee(db: Session, employee_id: str) -> None:
         raise HTTPException(status_code=404, detail="Employee not found")
 
 
-def _get_or_create_balance(db: Session, *, employee_id: str, item_code: str) -> GeneralItemEmployeeBalance:
-    bal = (
-        db.query(GeneralItemEmployeeBalance)
-        .filter(GeneralItemEmployeeBalance.employee_id == employee_id)
-        .filter(GeneralItemEmployeeBalance.item_code == item_code)
-        .first()
-    )
-    if bal:
-        return bal
-
-    bal = GeneralItemEmployeeBalance(employee_id=employee_id, item_code=item_code, quantity_issued=0.0)
-    db.add(bal)
-    db.flush()
-    return bal
-
-
 def _log_tx(
     db: Session,
     *,
@@ -108,6 +102,9 @@ async def create_item(payload: GeneralItemCreate, db: Session = Depends(get_db))
 
     item = GeneralItem(**payload.dict())
     db.add(item)
+    if item.quantity_on_hand:
+        # Opening stock goes through the ledger like any later adjustment.
+        _log_tx(db, item_code=item.item_code, action="ADJUST", quantity=float(item.quantity_on_hand), notes="Opening stock")
     db.commit()
     db.refresh(item)
     return item
@@ -159,6 +156,9 @@ async def update_item(item_code: str, payload: GeneralItemUpdate, db: Session =
         raise HTTPException(status_code=404, detail="Item not found")
 
     upd = payload.dict(exclude_unset=True)
+    qty = upd.get("quantity_on_hand")
+    if qty is not None and float(qty) != float(item.quantity_on_hand or 0.0):
+        _log_tx(db, item_code=item_code, action="ADJUST", quantity=float(qty), notes="Stock edited")
     for k, v in upd.items():
         setattr(item, k, v)
 
@@ -213,17 +213,103 @@ async def list_all_issued(db: Session = Depends(get_db)) -> List[EmployeeGeneral
 
 @router.get("/transactions", response_model=List[GeneralTransactionOut])
 async def list_transactions(
+    response: Response,
     item_code: Optional[str] = None,
     employee_id: Optional[str] = None,
+    action: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[int] = None,
     limit: int = 200,
     db: Session = Depends(get_db),
 ) -> List[GeneralTransactionOut]:
-    q = db.query(GeneralItemTransaction)
-    if item_code:
-        q = q.filter(GeneralItemTransaction.item_code == item_code)
-    if employee_id:
-        q = q.filter(GeneralItemTransaction.employee_id == employee_id)
-    return q.order_by(GeneralItemTransaction.id.desc()).limit(min(max(limit, 1), 500)).all()
+    """Newest first. When more rows exist the ``X-Next-Cursor`` header holds the ``cursor`` for the next page."""
+    q = history_query(
+        db,
+        GeneralItemTransaction,
+        item_code=item_code,
+        employee_id=employee_id,
+        action=action,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    rows, next_cursor = page(q, GeneralItemTransaction, cursor, min(max(limit, 1), 500))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return rows
+
+
+@router.get("/transactions/export")
+async def export_transactions(
+    item_code: Optional[str] = None,
+    employee_id: Optional[str] = None,
+    action: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> StreamingResponse:
+    """Full filtered history as CSV, streamed newest first."""
+    filters = {
+        "item_code": item_code,
+        "employee_id": employee_id,
+        "action": action,
+        "date_from": date_from,
+        "date_to": date_to,
+    }
+
+    def _lookup(db: Session, rows: list) -> dict:
+        codes = {r.item_code for r in rows}
+        return dict(db.query(GeneralItem.item_code, GeneralItem.name).filter(GeneralItem.item_code.in_(codes)).all())
+
+    def _row(tx: GeneralItemTransaction, names: dict) -> list:
+        return [
+            tx.id,
+            tx.created_at.isoformat() if tx.created_at else "",
+            tx.item_code,
+            names.get(tx.item_code, ""),
+            tx.employee_id or "",
+            tx.action,
+            "" if tx.quantity is None else f"{tx.quantity:g}",
+            tx.condition_note or "",
+            tx.notes or "",
+        ]
+
+    header = ["id", "created_at", "item_code", "item_name", "employee_id", "action", "quantity", "condition_note", "notes"]
+    return StreamingResponse(
+        stream_csv(GeneralItemTransaction, header, _row, filters, extra=_lookup),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="general-inventory-transactions.csv"'},
+    )
+
+
+@router.get("/snapshots", response_model=List[StockSnapshotOut])
+async def list_snapshots(limit: int = 100, db: Session = Depends(get_db)) -> List[StockSnapshotOut]:
+    return (
+        db.query(InventoryStockSnapshot)
+        .filter(InventoryStockSnapshot.kind == "general")
+        .order_by(InventoryStockSnapshot.taken_at.desc(), InventoryStockSnapshot.id.desc())
+        .limit(min(max(limit, 1), 500))
+        .all()
+    )
+
+
+@router.post("/snapshots", response_model=StockSnapshotOut)
+async def create_snapshot(label: Optional[str] = None, db: Session = Depends(get_db)) -> StockSnapshotOut:
+    """Record current stock and balances, e.g. at month close, so as-of queries replay less history."""
+    return take_snapshot(db, "general", label=label)
+
+
+@router.get("/stock/as-of", response_model=StockAsOfOut)
+async def get_stock_as_of(
+    at: datetime,
+    item_code: Optional[str] = None,
+    employee_id: Optional[str] = None,
+    db: Session = Depends(get_db),
+) -> StockAsOfOut:
+    """Stock on hand and employee balances at ``at``: nearest snapshot plus the transactions after it."""
+    result = stock_as_of(db, "general", at, item_code=item_code, employee_id=employee_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No stock snapshot before this time")
+    return result
 
 
 @router.post("/items/{item_code}/issue", response_model=List[GeneralTransactionOut])
@@ -240,12 +326,9 @@ async def issue_item(item_code: str, payload: IssueRequest, db: Session = Depend
     qty = float(payload.quantity or 0.0)
     if qty <= 0:
         raise HTTPException(status_code=400, detail="quantity must be > 0")
-    if float(item.quantity_on_hand or 0.0) < qty:
+    if not take_stock(db, GeneralItem, item_code, qty):
         raise HTTPException(status_code=400, detail="Not enough stock")
-
-    item.quantity_on_hand = float(item.quantity_on_hand or 0.0) - qty
-    bal = _get_or_create_balance(db, employee_id=employee_id, item_code=item_code)
-    bal.quantity_issued = float(bal.quantity_issued or 0.0) + qty
+    add_balance(db, GeneralItemEmployeeBalance, employee_id, item_code, qty)
 
     _log_tx(db, item_code=item_code, action="ISSUE", employee_id=employee_id, quantity=qty, notes=payload.notes)
     db.commit()
@@ -260,6 +343,72 @@ async def issue_item(item_code: str, payload: IssueRequest, db: Session = Depend
     return list(reversed(txs))
 
 
+@router.post("/issue-batch", response_model=BatchIssueResult)
+async def issue_batch(payload: BatchIssueRequest, db: Session = Depends(get_db)) -> BatchIssueResult:
+    """Issue kit to many employees at once.
+
+    Employees, items and stock are validated for the whole batch in one pass;
+    stock, balances and transactions are then written in a single transaction.
+    """
+    if not payload.lines:
+        raise HTTPException(status_code=400, detail="lines are required")
+
+    errors: List[str] = []
+    lines: List[tuple] = []
+    for i, ln in enumerate(payload.lines, start=1):
+        employee_id = (ln.employee_id or "").strip()
+        item_code = (ln.item_code or "").strip()
+        qty = float(ln.quantity or 0.0)
+        if not employee_id or not item_code:
+            errors.append(f"line {i}: employee_id and item_code are required")
+        elif qty <= 0:
+            errors.append(f"line {i}: quantity must be > 0")
+        else:
+            lines.append((employee_id, item_code, qty, ln.notes or payload.notes))
+
+    employee_ids = {ln[0] for ln in lines}
+    item_codes = {ln[1] for ln in lines}
+    known = {r[0] for r in db.query(Employee.employee_id).filter(Employee.employee_id.in_(employee_ids))}
+    on_hand = {
+        code: float(qty or 0.0)
+        for code, qty in db.query(GeneralItem.item_code, GeneralItem.quantity_on_hand).filter(
+            GeneralItem.item_code.in_(item_codes)
+        )
+    }
+    errors += [f"Employee not found: {e}" for e in sorted(employee_ids - known)]
+    errors += [f"Item not found: {c}" for c in sorted(item_codes - set(on_hand))]
+
+    requested: dict[str, float] = {}
+    amounts: dict[tuple[str, str], float] = {}
+    for employee_id, item_code, qty, _ in lines:
+        requested[item_code] = requested.get(item_code, 0.0) + qty
+        amounts[(employee_id, item_code)] = amounts.get((employee_id, item_code), 0.0) + qty
+    errors += [
+        f"Not enough stock for {code}: requested {qty:g}, on hand {on_hand[code]:g}"
+        for code, qty in sorted(requested.items())
+        if code in on_hand and qty > on_hand[code]
+    ]
+    if errors:
+        raise HTTPException(status_code=400, detail=describe_errors(errors))
+
+    for code, qty in requested.items():
+        if not take_stock(db, GeneralItem, code, qty):
+            db.rollback()
+            raise HTTPException(status_code=400, detail=f"Not enough stock for {code}")
+    add_balances(db, GeneralItemEmployeeBalance, amounts)
+    db.bulk_insert_mappings(
+        GeneralItemTransaction,
+        [
+            {"item_code": code, "employee_id": emp, "action": "ISSUE", "quantity": qty, "notes": notes}
+            for emp, code, qty, notes in lines
+        ],
+    )
+    mark_tables_changed(db, GeneralItemEmployeeBalance.__tablename__, GeneralItemTransaction.__tablename__)
+    db.commit()
+
+    return BatchIssueResult(lines=len(lines), employees=len(employee_ids), transactions=len(lines), quantities=requested)
+
+
 @router.post("/items/{item_code}/return", response_model=List[GeneralTransactionOut])
 async def return_item(item_code: str, payload: ReturnRequest, db: Session = Depends(get_db)) -> List[GeneralTransactionOut]:
     item = db.query(GeneralItem).filter(GeneralItem.item_code == item_code).first()
@@ -279,28 +428,13 @@ async def return_item(item_code: str, payload: ReturnRequest, db: Session = Depe
 
     # If the item record is missing (e.g. deleted manually), still allow unlinking
     # from the employee by updating the balance. Stock is only adjusted if the item exists.
-    bal = (
-        db.query(GeneralItemEmployeeBalance)
-        .filter(GeneralItemEmployeeBalance.employee_id == employee_id)
-        .filter(GeneralItemEmployeeBalance.item_code == item_code)
-        .first()
-    )
-
-    if not bal:
-        # Fall back to creating balance only if the item exists.
-        if item:
-            bal = _get_or_create_balance(db, employee_id=employee_id, item_code=item_code)
-        else:
-            raise HTTPException(status_code=404, detail="Allocation not found for this employee/item")
-
-    if float(bal.quantity_issued or 0.0) < qty:
-        # If there's a mismatch (balance table is behind), just reset to 0
-        bal.quantity_issued = 0.0
-    else:
-        bal.quantity_issued = float(bal.quantity_issued or 0.0) - qty
+    # If there's a mismatch (balance table is behind), the balance floors at 0.
+    has_balance = take_balance(db, GeneralItemEmployeeBalance, employee_id, item_code, qty, clamp=True)
+    if not has_balance and not item:
+        raise HTTPException(status_code=404, detail="Allocation not found for this employee/item")
 
     if item:
-        item.quantity_on_hand = float(item.quantity_on_hand or 0.0) + qty
+        put_stock(db, GeneralItem, item_code, qty)
 
     # Transactions table has FK constraints; if the item or employee record is missing,
     # writing a transaction row could fail. The allocation/balance update above is the
@@ -343,12 +477,9 @@ async def lost_item(item_code: str, payload: ReturnRequest, db: Session = Depend
     if qty <= 0:
         raise HTTPException(status_code=400, detail="quantity must be > 0")
 
-    bal = _get_or_create_balance(db, employee_id=employee_id, item_code=item_code)
-    if float(bal.quantity_issued or 0.0) < qty:
+    if not take_balance(db, GeneralItemEmployeeBalance, employee_id, item_code, qty):
         raise HTTPException(status_code=400, detail="Employee does not have enough issued quantity")
 
-    bal.quantity_issued = float(bal.quantity_issued or 0.0) - qty
-
     _log_tx(db, item_code=item_code, action="LOST", employee_id=employee_id, quantity=qty, notes=payload.notes)
     db.commit()
 
@@ -377,12 +508,9 @@ async def damaged_item(item_code: str, payload: ReturnRequest, db: Session = Dep
     if qty <= 0:
         raise HTTPException(status_code=400, detail="quantity must be > 0")
 
-    bal = _get_or_create_balance(db, employee_id=employee_id, item_code=item_code)
-    if float(bal.quantity_issued or 0.0) < qty:
+    if not take_balance(db, GeneralItemEmployeeBalance, employee_id, item_code, qty):
         raise HTTPException(status_code=400, detail="Employee does not have enough issued quantity")
 
-    bal.quantity_issued = float(bal.quantity_issued or 0.0) - qty
-
     _log_tx(
         db,
         item_code=item_code,
@@ -411,7 +539,7 @@ async def adjust_item(item_code: str, payload: AdjustRequest, db: Session = Depe
         raise HTTPException(status_code=404, detail="Item not found")
 
     qty = float(payload.quantity or 0.0)
-    item.quantity_on_hand = qty
+    set_stock(db, GeneralItem, item_code, qty)
 
     _log_tx(db, item_code=item_code, action="ADJUST", quantity=qty, notes=payload.notes)
     db.commit()
@@ -0,0 +1,114 @@
+"""Bulk import API routes (CSV / TSV / JSON) backed by app.importers."""
+
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from sqlalchemy.orm import Session
+
+from app.api.dependencies import get_current_active_user, get_current_permissions
+from app.core.database import get_db
+from app.importers import ENTITIES, detect_format, run_import
+from app.importers.checkpoint import load_checkpoint
+from app.models.user import User
+
+
+router = APIRouter(dependencies=[Depends(get_current_active_user)])
+
+
+_ENTITY_PERMISSIONS = {
+    "employees": "employees:create",
+    "employees2": "employees:create",
+    "clients": "clients:view",
+    "vehicles": "fleet:view",
+}
+
+
+def _check_entity_permission(entity: str, user: User, permissions: set[str]) -> None:
+    if entity not in ENTITIES:
+        raise HTTPException(status_code=404, detail=f"Unknown import entity: {entity}")
+    if user.is_superuser:
+        return
+    if _ENTITY_PERMISSIONS.get(entity) not in permissions:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+
+@router.get("/entities")
+def list_import_entities():
+    return [
+        {"entity": name, "keys": spec.keys, "columns": sorted(spec.mapping.keys())}
+        for name, spec in sorted(ENTITIES.items())
+    ]
+
+
+@router.get("/jobs/{job_id}")
+def get_import_job(job_id: str):
+    try:
+        state = load_checkpoint(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not state:
+        raise HTTPException(status_code=404, detail="No pending checkpoint for this job")
+    return state
+
+
+@router.post("/{entity}")
+def import_entity(
+    entity: str,
+    file: UploadFile = File(...),
+    format: Optional[str] = Form(None),
+    mode: str = Form("preview"),
+    mapping: Optional[str] = Form(None),
+    job_id: Optional[str] = Form(None),
+    chunk_size: int = Form(500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+    permissions: set[str] = Depends(get_current_permissions),
+):
+    """Import a CSV/TSV/JSON file into employees, employees2, clients or vehicles.
+
+    mode:
+      - preview: validate and report created/skipped counts (no DB writes)
+      - insert: create rows whose natural key does not exist yet
+      - upsert: create missing rows and update existing ones
+
+    mapping is an optional JSON object of ``{"target_field": "Sheet Header"}``
+    overrides. Pass job_id to checkpoint progress; re-posting the same file
+    with the same job_id resumes after the last committed chunk.
+    """
+
+    entity = (entity or "").strip().lower()
+    _check_entity_permission(entity, current_user, permissions)
+
+    overrides = None
+    if mapping:
+        try:
+            overrides = json.loads(mapping)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid mapping JSON: {e}")
+        if not isinstance(overrides, dict):
+            raise HTTPException(status_code=400, detail="mapping must be a JSON object")
+
+    raw = file.file.read()
+    try:
+        text = raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        text = raw.decode("latin-1", errors="ignore")
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="Empty file")
+
+    try:
+        result = run_import(
+            db,
+            entity=entity,
+            text=text,
+            fmt=format or detect_format(file.filename, text),
+            mode=mode,
+            mapping=overrides,
+            chunk_size=chunk_size,
+            job_id=job_id,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return result.to_dict()
@@ -1,42 +1,230 @@
 """API routes for lightweight inventory assignment persistence.
 
-This mirrors the frontend's inventoryAssignments map in the database as a
-single JSON blob, without introducing full inventory modelling yet.
+This mirrors the frontend's inventoryAssignments map in the database, one
+row per (employee, item) pair, without introducing full inventory modelling
+yet. Every write bumps the map's version; clients send per-key PATCH deltas
+based on the version they hold and fetch ``?since_version=`` to download
+only what changed since.
 """
 
 import json
+from typing import Dict, List, Optional, Tuple, Union
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.api.dependencies import require_permission
 from app.models.inventory_assignment import InventoryAssignmentState
-from app.schemas.inventory_assignment import InventoryAssignmentsState
+from app.models.inventory_assignment_item import InventoryAssignmentItem
+from app.schemas.inventory_assignment import (
+    InventoryAssignmentEntry,
+    InventoryAssignmentOp,
+    InventoryAssignmentsDelta,
+    InventoryAssignmentsPatch,
+    InventoryAssignmentsState,
+)
 
 
 router = APIRouter(dependencies=[Depends(require_permission("inventory:view"))])
 
+# (employee_id, item_id) -> new quantity, or None to remove the pair
+Changes = Dict[Tuple[str, str], Optional[int]]
 
-@router.get("/", response_model=InventoryAssignmentsState)
+
+def _escape(part: str) -> str:
+    return part.replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(part: str) -> str:
+    return part.replace("~1", "/").replace("~0", "~")
+
+
+def _parse_path(path: str) -> Tuple[str, Optional[str]]:
+    parts = (path or "").split("/")
+    if len(parts) not in (2, 3) or parts[0] != "" or not parts[1] or (len(parts) == 3 and not parts[2]):
+        raise HTTPException(status_code=400, detail=f"Invalid path: {path}")
+    employee_id = _unescape(parts[1])
+    item_id = _unescape(parts[2]) if len(parts) == 3 else None
+    return employee_id, item_id
+
+
+def _get_state(db: Session) -> InventoryAssignmentState:
+    state = db.query(InventoryAssignmentState).first()
+    if state:
+        return state
+    try:
+        with db.begin_nested():
+            db.add(InventoryAssignmentState(id=1, data="{}", version=0))
+    except IntegrityError:
+        # Created by a concurrent request.
+        pass
+    return db.query(InventoryAssignmentState).first()
+
+
+def _bump_version(db: Session, expected: Optional[int] = None) -> int:
+    """Next version of the map; with ``expected``, 409 unless the map is still at it."""
+
+    state = _get_state(db)
+    stmt = update(InventoryAssignmentState).where(InventoryAssignmentState.id == state.id)
+    if expected is not None:
+        stmt = stmt.where(InventoryAssignmentState.version == expected)
+    stmt = stmt.values(version=InventoryAssignmentState.version + 1)
+    if db.execute(stmt.execution_options(synchronize_session=False)).rowcount != 1:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Inventory assignments changed since version {expected}; fetch the changes and retry",
+        )
+    db.refresh(state)
+    return int(state.version)
+
+
+def _live_rows(db: Session, employee_id: Optional[str] = None) -> List[InventoryAssignmentItem]:
+    q = db.query(InventoryAssignmentItem).filter(InventoryAssignmentItem.deleted.is_(False))
+    if employee_id is not None:
+        q = q.filter(InventoryAssignmentItem.employee_id == employee_id)
+    return q.order_by(InventoryAssignmentItem.id.asc()).all()
+
+
+def _apply(db: Session, changes: Changes, version: int) -> None:
+    if not changes:
+        return
+    existing = {
+        (r.employee_id, r.item_id): r
+        for r in db.query(InventoryAssignmentItem).filter(
+            tuple_(InventoryAssignmentItem.employee_id, InventoryAssignmentItem.item_id).in_(list(changes))
+        )
+    }
+    for (employee_id, item_id), qty in changes.items():
+        row = existing.get((employee_id, item_id))
+        if row is None:
+            if qty is None:
+                continue
+            db.add(InventoryAssignmentItem(employee_id=employee_id, item_id=item_id, quantity=qty, version=version))
+            continue
+        if qty is None:
+            if row.deleted:
+                continue
+            row.deleted = True
+            row.quantity = 0
+        else:
+            row.deleted = False
+            row.quantity = qty
+        row.version = version
+
+
+def _map_from_rows(rows: List[InventoryAssignmentItem]) -> Dict[str, List[InventoryAssignmentEntry]]:
+    data: Dict[str, List[InventoryAssignmentEntry]] = {}
+    for r in rows:
+        data.setdefault(r.employee_id, []).append(InventoryAssignmentEntry(itemId=r.item_id, quantity=r.quantity))
+    return data
+
+
+def _changes_from_map(data: Dict[str, List[InventoryAssignmentEntry]]) -> Dict[Tuple[str, str], int]:
+    wanted: Dict[Tuple[str, str], int] = {}
+    for employee_id, entries in (data or {}).items():
+        for e in entries or []:
+            key = (employee_id, e.itemId)
+            wanted[key] = wanted.get(key, 0) + int(e.quantity)
+    return wanted
+
+
+def normalise_legacy_state(db: Session) -> None:
+    """Move a map stored in the old JSON blob into ``inventory_assignment_items`` (once)."""
+
+    state = db.query(InventoryAssignmentState).first()
+    if not state or state.version:
+        return
+    try:
+        raw = json.loads(state.data or "{}")
+    except json.JSONDecodeError:
+        raw = {}
+    data = InventoryAssignmentsState(data=raw if isinstance(raw, dict) else {}).data
+    version = _bump_version(db, expected=0)
+    _apply(db, _changes_from_map(data), version)
+    state.data = "{}"
+    db.commit()
+
+
+@router.get("/", response_model=Union[InventoryAssignmentsState, InventoryAssignmentsDelta])
 async def get_inventory_assignments(
+    since_version: Optional[int] = None,
     db: Session = Depends(get_db),
-) -> InventoryAssignmentsState:
-    """Return the current inventory assignments map.
+) -> Union[InventoryAssignmentsState, InventoryAssignmentsDelta]:
+    """Return the current inventory assignments map and its version.
 
-    If no row exists yet, an empty map is returned.
+    With ``since_version`` only the pairs changed after that version are
+    returned, as ``add`` / ``remove`` ops to apply to the client's copy.
     """
 
     state = db.query(InventoryAssignmentState).first()
-    if not state:
-        return InventoryAssignmentsState(data={})
+    version = int(state.version or 0) if state else 0
+
+    if since_version is None:
+        return InventoryAssignmentsState(data=_map_from_rows(_live_rows(db)), version=version)
+
+    rows = (
+        db.query(InventoryAssignmentItem)
+        .filter(InventoryAssignmentItem.version > since_version)
+        .order_by(InventoryAssignmentItem.version.asc(), InventoryAssignmentItem.id.asc())
+        .all()
+    )
+    ops = [
+        InventoryAssignmentOp(
+            op="remove" if r.deleted else "add",
+            path=f"/{_escape(r.employee_id)}/{_escape(r.item_id)}",
+            value=None if r.deleted else r.quantity,
+        )
+        for r in rows
+    ]
+    return InventoryAssignmentsDelta(since_version=since_version, version=version, ops=ops)
+
+
+@router.patch("/", response_model=InventoryAssignmentsDelta)
+async def patch_inventory_assignments(
+    payload: InventoryAssignmentsPatch,
+    db: Session = Depends(get_db),
+) -> InventoryAssignmentsDelta:
+    """Apply per-key changes made on top of ``payload.version``.
 
-    try:
-        data = json.loads(state.data or "{}")
-    except json.JSONDecodeError:
-        data = {}
+    Rejected with 409 when another write landed since that version; the
+    client then fetches ``?since_version=`` and retries.
+    """
+
+    changes: Changes = {}
+    for op in payload.ops:
+        employee_id, item_id = _parse_path(op.path)
+        if op.op == "remove":
+            if item_id is not None:
+                changes[(employee_id, item_id)] = None
+                continue
+            for r in _live_rows(db, employee_id):
+                changes[(employee_id, r.item_id)] = None
+            for key in changes:
+                if key[0] == employee_id:
+                    changes[key] = None
+            continue
+        if item_id is None:
+            raise HTTPException(status_code=400, detail=f"{op.op} needs an item path: {op.path}")
+        if op.value is None:
+            raise HTTPException(status_code=400, detail=f"{op.op} needs a value: {op.path}")
+        changes[(employee_id, item_id)] = int(op.value)
+
+    version = _bump_version(db, expected=payload.version)
+    _apply(db, changes, version)
+    db.commit()
 
-    return InventoryAssignmentsState(data=data)
+    applied = [
+        InventoryAssignmentOp(
+            op="remove" if qty is None else "add",
+            path=f"/{_escape(employee_id)}/{_escape(item_id)}",
+            value=qty,
+        )
+        for (employee_id, item_id), qty in changes.items()
+    ]
+    return InventoryAssignmentsDelta(since_version=payload.version, version=version, ops=applied)
 
 
 @router.put("/", response_model=InventoryAssignmentsState)
@@ -44,17 +232,22 @@ async def upsert_inventory_assignments(
     payload: InventoryAssignmentsState,
     db: Session = Depends(get_db),
 ) -> InventoryAssignmentsState:
-    """Replace the stored assignments map with the provided payload."""
+    """Replace the stored assignments map with the provided payload.
 
-    state = db.query(InventoryAssignmentState).first()
+    Only pairs that actually differ are written, so ``since_version``
+    readers still receive a minimal delta.
+    """
 
-    if not state:
-        state = InventoryAssignmentState(data=json.dumps(payload.data or {}))
-        db.add(state)
-    else:
-        state.data = json.dumps(payload.data or {})
+    wanted = _changes_from_map(payload.data)
+    current = {(r.employee_id, r.item_id): r.quantity for r in _live_rows(db)}
+    changes: Changes = {key: qty for key, qty in wanted.items() if current.get(key) != qty}
+    changes.update({key: None for key in current if key not in wanted})
+    if not changes:
+        state = db.query(InventoryAssignmentState).first()
+        return InventoryAssignmentsState(data=payload.data or {}, version=int(state.version or 0) if state else 0)
 
+    version = _bump_version(db)
+    _apply(db, changes, version)
     db.commit()
-    db.refresh(state)
 
-    return InventoryAssignmentsState(data=payload.data or {})
+    return InventoryAssignmentsState(data=_map_from_rows(_live_rows(db)), version=version)
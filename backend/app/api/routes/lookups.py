@@ -0,0 +1,67 @@
+"""Dropdown lookup API routes."""
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.api.dependencies import get_current_active_user
+from app.api.routes.employees import distinct_employee_values
+from app.api.routes.employees2 import distinct_employee2_values
+from app.core.cache import cached
+from app.core.database import get_db
+from app.models.employee import Employee
+from app.models.employee2 import Employee2
+from app.models.general_item import GeneralItem
+from app.models.rbac import Role
+from app.models.restricted_item import RestrictedItem
+from app.models.vehicle import Vehicle
+
+
+router = APIRouter(dependencies=[Depends(get_current_active_user)])
+
+
+_BOOTSTRAP_TABLES = ("employees", "employees2", "vehicles", "general_items", "restricted_items", "roles")
+
+
+def _bootstrap(db: Session) -> dict:
+    vehicles = (
+        db.query(Vehicle.id, Vehicle.vehicle_id, Vehicle.license_plate, Vehicle.status)
+        .order_by(Vehicle.vehicle_id.asc())
+        .all()
+    )
+    general_items = (
+        db.query(GeneralItem.item_code, GeneralItem.name, GeneralItem.unit_name)
+        .order_by(GeneralItem.item_code.asc())
+        .all()
+    )
+    restricted_items = (
+        db.query(RestrictedItem.item_code, RestrictedItem.name, RestrictedItem.is_serial_tracked)
+        .order_by(RestrictedItem.item_code.asc())
+        .all()
+    )
+    roles = db.query(Role.id, Role.name).order_by(Role.name.asc()).all()
+
+    return {
+        "departments": distinct_employee_values(db, Employee.department),
+        "designations": distinct_employee_values(db, Employee.designation),
+        "categories": distinct_employee2_values(db, Employee2.category),
+        "statuses": distinct_employee2_values(db, Employee2.status),
+        "vehicles": [
+            {"id": int(v.id), "vehicle_id": v.vehicle_id, "license_plate": v.license_plate, "status": v.status}
+            for v in vehicles
+        ],
+        "general_item_codes": [
+            {"item_code": i.item_code, "name": i.name, "unit_name": i.unit_name} for i in general_items
+        ],
+        "restricted_item_codes": [
+            {"item_code": i.item_code, "name": i.name, "is_serial_tracked": bool(i.is_serial_tracked)}
+            for i in restricted_items
+        ],
+        "roles": [{"id": int(r.id), "name": r.name} for r in roles],
+    }
+
+
+@router.get("/bootstrap")
+def lookups_bootstrap(db: Session = Depends(get_db)) -> dict:
+    """All dropdown sets in one response, cached until any of the source tables change."""
+
+    return cached("lookups:bootstrap", tables=_BOOTSTRAP_TABLES, loader=lambda: _bootstrap(db))
@@ -384,6 +384,11 @@ async def payroll_report(
     month: str,
     db: Session = Depends(get_db),
 ) -> PayrollReportResponse:
+    return build_payroll_report(db, month)
+
+
+def build_payroll_report(db: Session, month: str) -> PayrollReportResponse:
+    """Per-employee payroll rows for ``month`` (YYYY-MM); shared by the report, exports and profitability."""
     start, end = _parse_month(month)
     cutoff = datetime.combine(end, time.max)
 
@@ -1,14 +1,21 @@
 import os
 import uuid
+from datetime import date, datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy import case, func, select, tuple_, update
 from sqlalchemy.orm import Session
 
+from app.core.cache import mark_tables_changed
 from app.core.database import get_db
+from app.core.inventory_history import history_query, page, stream_csv
+from app.core.stock import add_balance, add_balances, describe_errors, put_stock, set_stock, take_balance, take_stock
+from app.core.stock_ledger import stock_as_of, take_snapshot
 from app.api.dependencies import require_permission
 from app.models.employee import Employee
+from app.models.inventory_stock_snapshot import InventoryStockSnapshot
 from app.models.restricted_item import RestrictedItem
 from app.models.restricted_item_employee_balance import RestrictedItemEmployeeBalance
 from app.models.restricted_item_image import RestrictedItemImage
@@ -21,8 +28,12 @@ from app.schemas.employee_inventory import (
     QuantityActionRequest,
     SerialActionRequest,
 )
+from app.schemas.inventory_ledger import StockAsOfOut, StockSnapshotOut
 from app.schemas.restricted_inventory import (
+    BatchIssueRequest,
+    BatchIssueResult,
     IssueRequest,
+    ItemActionResult,
     LostRequest,
     RestrictedItemCreate,
     RestrictedItemImageOut,
@@ -44,22 +55,6 @@ def _ensure_employee(db: Session, employee_id: str) -> None:
         raise HTTPException(status_code=404, detail="Employee not found")
 
 
-def _get_or_create_balance(db: Session, *, employee_id: str, item_code: str) -> RestrictedItemEmployeeBalance:
-    bal = (
-        db.query(RestrictedItemEmployeeBalance)
-        .filter(RestrictedItemEmployeeBalance.employee_id == employee_id)
-        .filter(RestrictedItemEmployeeBalance.item_code == item_code)
-        .first()
-    )
-    if bal:
-        return bal
-
-    bal = RestrictedItemEmployeeBalance(employee_id=employee_id, item_code=item_code, quantity_issued=0.0)
-    db.add(bal)
-    db.flush()
-    return bal
-
-
 def _upload_dir() -> str:
     base = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
     d = os.path.join(base, "uploads", "restricted-inventory", "images")
@@ -72,51 +67,59 @@ def _public_url(path: str) -> str:
     return f"/uploads/restricted-inventory/images/{fn}"
 
 
+def _serial_counts():
+    """Per item_code: total serial units and units in stock, in one grouped aggregate."""
+    return (
+        select(
+            RestrictedItemSerialUnit.item_code.label("item_code"),
+            func.count(RestrictedItemSerialUnit.id).label("serial_total"),
+            func.sum(case((RestrictedItemSerialUnit.status == "in_stock", 1), else_=0)).label("serial_in_stock"),
+        )
+        .group_by(RestrictedItemSerialUnit.item_code)
+        .subquery()
+    )
+
+
+def _items_with_serial_counts(db: Session):
+    counts = _serial_counts()
+    return db.query(RestrictedItem, counts.c.serial_total, counts.c.serial_in_stock).outerjoin(
+        counts, counts.c.item_code == RestrictedItem.item_code
+    )
+
+
+def _item_out(it: RestrictedItem, serial_total: Optional[int], serial_in_stock: Optional[int]) -> RestrictedItemOut:
+    if it.is_serial_tracked:
+        serial_total = int(serial_total or 0)
+        serial_in_stock = int(serial_in_stock or 0)
+    else:
+        serial_total = serial_in_stock = None
+    return RestrictedItemOut(
+        id=it.id,
+        item_code=it.item_code,
+        category=it.category,
+        name=it.name,
+        description=it.description,
+        is_serial_tracked=it.is_serial_tracked,
+        unit_name=it.unit_name,
+        quantity_on_hand=float(it.quantity_on_hand or 0.0),
+        min_quantity=float(it.min_quantity) if it.min_quantity is not None else None,
+        make_model=it.make_model,
+        caliber=it.caliber,
+        storage_location=it.storage_location,
+        requires_maintenance=bool(it.requires_maintenance),
+        requires_cleaning=bool(it.requires_cleaning),
+        status=it.status,
+        serial_total=serial_total,
+        serial_in_stock=serial_in_stock,
+        created_at=it.created_at,
+        updated_at=it.updated_at,
+    )
+
+
 @router.get("/items", response_model=List[RestrictedItemOut])
 async def list_items(db: Session = Depends(get_db)) -> List[RestrictedItemOut]:
-    items = db.query(RestrictedItem).order_by(RestrictedItem.id.desc()).all()
-    out: List[RestrictedItemOut] = []
-    for it in items:
-        serial_total: Optional[int] = None
-        serial_in_stock: Optional[int] = None
-        if it.is_serial_tracked:
-            serial_total = (
-                db.query(func.count(RestrictedItemSerialUnit.id))
-                .filter(RestrictedItemSerialUnit.item_code == it.item_code)
-                .scalar()
-                or 0
-            )
-            serial_in_stock = (
-                db.query(func.count(RestrictedItemSerialUnit.id))
-                .filter(RestrictedItemSerialUnit.item_code == it.item_code)
-                .filter(RestrictedItemSerialUnit.status == "in_stock")
-                .scalar()
-                or 0
-            )
-        out.append(
-            RestrictedItemOut(
-                id=it.id,
-                item_code=it.item_code,
-                category=it.category,
-                name=it.name,
-                description=it.description,
-                is_serial_tracked=it.is_serial_tracked,
-                unit_name=it.unit_name,
-                quantity_on_hand=float(it.quantity_on_hand or 0.0),
-                min_quantity=float(it.min_quantity) if it.min_quantity is not None else None,
-                make_model=it.make_model,
-                caliber=it.caliber,
-                storage_location=it.storage_location,
-                requires_maintenance=bool(it.requires_maintenance),
-                requires_cleaning=bool(it.requires_cleaning),
-                status=it.status,
-                serial_total=serial_total,
-                serial_in_stock=serial_in_stock,
-                created_at=it.created_at,
-                updated_at=it.updated_at,
-            )
-        )
-    return out
+    rows = _items_with_serial_counts(db).order_by(RestrictedItem.id.desc()).all()
+    return [_item_out(it, total, in_stock) for it, total, in_stock in rows]
 
 
 @router.post("/items", response_model=RestrictedItemOut)
@@ -127,6 +130,9 @@ async def create_item(payload: RestrictedItemCreate, db: Session = Depends(get_d
 
     item = RestrictedItem(**payload.dict())
     db.add(item)
+    if item.quantity_on_hand:
+        # Opening stock goes through the ledger like any later adjustment.
+        _log_tx(db, item_code=item.item_code, action="ADJUST", quantity=float(item.quantity_on_hand), notes="Opening stock")
     db.commit()
     db.refresh(item)
     return item
@@ -320,33 +326,42 @@ async def employee_quantity_action(
     if qty <= 0:
         raise HTTPException(status_code=400, detail="quantity must be > 0")
 
-    bal = _get_or_create_balance(db, employee_id=employee_id, item_code=item_code)
-
     action_u = (action or "").strip().lower()
     allowed = {"return", "lost", "damaged", "maintenance", "available", "found"}
     if action_u not in allowed:
         raise HTTPException(status_code=400, detail="Invalid action")
 
-    if action_u in {"return", "lost", "damaged", "maintenance"}:
-        if float(bal.quantity_issued or 0.0) < qty:
-            raise HTTPException(status_code=400, detail="Employee does not have enough issued quantity")
+    not_enough = HTTPException(status_code=400, detail="Employee does not have enough issued quantity")
+    if action_u == "maintenance":
+        # Stays with the employee; only check they hold enough.
+        held = (
+            db.query(RestrictedItemEmployeeBalance.quantity_issued)
+            .filter(RestrictedItemEmployeeBalance.employee_id == employee_id)
+            .filter(RestrictedItemEmployeeBalance.item_code == item_code)
+            .scalar()
+        )
+        if float(held or 0.0) < qty:
+            raise not_enough
 
     if action_u == "return":
-        item.quantity_on_hand = float(item.quantity_on_hand or 0.0) + qty
-        bal.quantity_issued = float(bal.quantity_issued or 0.0) - qty
+        if not take_balance(db, RestrictedItemEmployeeBalance, employee_id, item_code, qty):
+            raise not_enough
+        put_stock(db, RestrictedItem, item_code, qty)
         _log_tx(db, item_code=item_code, action="RETURN", employee_id=employee_id, quantity=qty, notes=payload.notes)
     elif action_u == "lost":
-        bal.quantity_issued = float(bal.quantity_issued or 0.0) - qty
+        if not take_balance(db, RestrictedItemEmployeeBalance, employee_id, item_code, qty):
+            raise not_enough
         _log_tx(db, item_code=item_code, action="LOST", employee_id=employee_id, quantity=qty, notes=payload.notes)
     elif action_u == "damaged":
-        bal.quantity_issued = float(bal.quantity_issued or 0.0) - qty
+        if not take_balance(db, RestrictedItemEmployeeBalance, employee_id, item_code, qty):
+            raise not_enough
         _log_tx(db, item_code=item_code, action="DAMAGED", employee_id=employee_id, quantity=qty, notes=payload.notes)
     elif action_u == "maintenance":
         _log_tx(db, item_code=item_code, action="MAINTENANCE", employee_id=employee_id, quantity=qty, notes=payload.notes)
     elif action_u == "available":
         _log_tx(db, item_code=item_code, action="AVAILABLE", employee_id=employee_id, quantity=qty, notes=payload.notes)
     elif action_u == "found":
-        item.quantity_on_hand = float(item.quantity_on_hand or 0.0) + qty
+        put_stock(db, RestrictedItem, item_code, qty)
         _log_tx(db, item_code=item_code, action="FOUND", employee_id=employee_id, quantity=qty, notes=payload.notes)
 
     db.commit()
@@ -355,48 +370,10 @@ async def employee_quantity_action(
 
 @router.get("/items/{item_code}", response_model=RestrictedItemOut)
 async def get_item(item_code: str, db: Session = Depends(get_db)) -> RestrictedItemOut:
-    item = db.query(RestrictedItem).filter(RestrictedItem.item_code == item_code).first()
-    if not item:
+    row = _items_with_serial_counts(db).filter(RestrictedItem.item_code == item_code).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Item not found")
-
-    serial_total: Optional[int] = None
-    serial_in_stock: Optional[int] = None
-    if item.is_serial_tracked:
-        serial_total = (
-            db.query(func.count(RestrictedItemSerialUnit.id))
-            .filter(RestrictedItemSerialUnit.item_code == item.item_code)
-            .scalar()
-            or 0
-        )
-        serial_in_stock = (
-            db.query(func.count(RestrictedItemSerialUnit.id))
-            .filter(RestrictedItemSerialUnit.item_code == item.item_code)
-            .filter(RestrictedItemSerialUnit.status == "in_stock")
-            .scalar()
-            or 0
-        )
-
-    return RestrictedItemOut(
-        id=item.id,
-        item_code=item.item_code,
-        category=item.category,
-        name=item.name,
-        description=item.description,
-        is_serial_tracked=item.is_serial_tracked,
-        unit_name=item.unit_name,
-        quantity_on_hand=float(item.quantity_on_hand or 0.0),
-        min_quantity=float(item.min_quantity) if item.min_quantity is not None else None,
-        make_model=item.make_model,
-        caliber=item.caliber,
-        storage_location=item.storage_location,
-        requires_maintenance=bool(item.requires_maintenance),
-        requires_cleaning=bool(item.requires_cleaning),
-        status=item.status,
-        serial_total=serial_total,
-        serial_in_stock=serial_in_stock,
-        created_at=item.created_at,
-        updated_at=item.updated_at,
-    )
+    return _item_out(*row)
 
 
 @router.put("/items/{item_code}", response_model=RestrictedItemOut)
@@ -406,6 +383,9 @@ async def update_item(item_code: str, payload: RestrictedItemUpdate, db: Session
         raise HTTPException(status_code=404, detail="Item not found")
 
     upd = payload.dict(exclude_unset=True)
+    qty = upd.get("quantity_on_hand")
+    if qty is not None and float(qty) != float(item.quantity_on_hand or 0.0):
+        _log_tx(db, item_code=item_code, action="ADJUST", quantity=float(qty), notes="Stock edited")
     for k, v in upd.items():
         setattr(item, k, v)
 
@@ -595,23 +575,189 @@ def _log_tx(
     db.add(tx)
 
 
+def _request_serials(serial_numbers: Optional[List[str]]) -> List[str]:
+    sns = [s.strip() for s in (serial_numbers or []) if s and s.strip()]
+    if not sns:
+        raise HTTPException(status_code=400, detail="serial_numbers are required for serial-tracked items")
+    counts: dict[str, int] = {}
+    for sn in sns:
+        counts[sn] = counts.get(sn, 0) + 1
+    repeated = [sn for sn, n in counts.items() if n > 1]
+    if repeated:
+        raise HTTPException(status_code=400, detail=f"Serial(s) listed more than once: {', '.join(repeated)}")
+    return sns
+
+
+def _serial_units(
+    db: Session, item_code: str, sns: List[str], status: Optional[str] = None, error: str = ""
+) -> dict[str, int]:
+    """serial_number -> unit id for ``sns`` of ``item_code``; 400 if any is missing or not in ``status``."""
+
+    units = {
+        sn: (unit_id, unit_status)
+        for unit_id, sn, unit_status in db.query(
+            RestrictedItemSerialUnit.id, RestrictedItemSerialUnit.serial_number, RestrictedItemSerialUnit.status
+        )
+        .filter(RestrictedItemSerialUnit.item_code == item_code)
+        .filter(RestrictedItemSerialUnit.serial_number.in_(sns))
+    }
+    missing = [sn for sn in sns if sn not in units]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Serial(s) not found: {', '.join(missing)}")
+    if status is not None:
+        for sn in sns:
+            if units[sn][1] != status:
+                raise HTTPException(status_code=400, detail=error.format(sn=sn))
+    return {sn: units[sn][0] for sn in sns}
+
+
+def _set_serial_status(db: Session, unit_ids: List[int], from_status: Optional[str], **values) -> None:
+    """Move all ``unit_ids`` in one UPDATE; 400 if another request changed any of them first."""
+
+    stmt = update(RestrictedItemSerialUnit).where(RestrictedItemSerialUnit.id.in_(unit_ids))
+    if from_status is not None:
+        stmt = stmt.where(RestrictedItemSerialUnit.status == from_status)
+    changed = db.execute(stmt.values(**values).execution_options(synchronize_session=False)).rowcount
+    if changed != len(unit_ids):
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Some serials were changed by another request; retry")
+
+
+def _log_serial_txs(
+    db: Session,
+    *,
+    item_code: str,
+    action: str,
+    employee_id: Optional[str],
+    unit_ids: List[int],
+    notes: Optional[str],
+) -> None:
+    db.bulk_insert_mappings(
+        RestrictedItemTransaction,
+        [
+            {"item_code": item_code, "action": action, "employee_id": employee_id, "serial_unit_id": unit_id, "notes": notes}
+            for unit_id in unit_ids
+        ],
+    )
+    mark_tables_changed(db, RestrictedItemSerialUnit.__tablename__, RestrictedItemTransaction.__tablename__)
+
+
 @router.get("/transactions", response_model=List[RestrictedTransactionOut])
 async def list_transactions(
+    response: Response,
     item_code: Optional[str] = None,
     employee_id: Optional[str] = None,
+    action: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[int] = None,
     limit: int = 200,
     db: Session = Depends(get_db),
 ) -> List[RestrictedTransactionOut]:
-    q = db.query(RestrictedItemTransaction)
-    if item_code:
-        q = q.filter(RestrictedItemTransaction.item_code == item_code)
-    if employee_id:
-        q = q.filter(RestrictedItemTransaction.employee_id == employee_id)
-    return q.order_by(RestrictedItemTransaction.id.desc()).limit(min(max(limit, 1), 500)).all()
+    """Newest first. When more rows exist the ``X-Next-Cursor`` header holds the ``cursor`` for the next page."""
+    q = history_query(
+        db,
+        RestrictedItemTransaction,
+        item_code=item_code,
+        employee_id=employee_id,
+        action=action,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    rows, next_cursor = page(q, RestrictedItemTransaction, cursor, min(max(limit, 1), 500))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return rows
+
+
+@router.get("/transactions/export")
+async def export_transactions(
+    item_code: Optional[str] = None,
+    employee_id: Optional[str] = None,
+    action: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> StreamingResponse:
+    """Full filtered history as CSV, streamed newest first."""
+    filters = {
+        "item_code": item_code,
+        "employee_id": employee_id,
+        "action": action,
+        "date_from": date_from,
+        "date_to": date_to,
+    }
+
+    def _lookup(db: Session, rows: list) -> tuple[dict, dict]:
+        codes = {r.item_code for r in rows}
+        unit_ids = {r.serial_unit_id for r in rows if r.serial_unit_id}
+        names = dict(db.query(RestrictedItem.item_code, RestrictedItem.name).filter(RestrictedItem.item_code.in_(codes)).all())
+        serials = (
+            dict(
+                db.query(RestrictedItemSerialUnit.id, RestrictedItemSerialUnit.serial_number)
+                .filter(RestrictedItemSerialUnit.id.in_(unit_ids))
+                .all()
+            )
+            if unit_ids
+            else {}
+        )
+        return names, serials
+
+    def _row(tx: RestrictedItemTransaction, lookup: tuple[dict, dict]) -> list:
+        names, serials = lookup
+        return [
+            tx.id,
+            tx.created_at.isoformat() if tx.created_at else "",
+            tx.item_code,
+            names.get(tx.item_code, ""),
+            serials.get(tx.serial_unit_id, "") if tx.serial_unit_id else "",
+            tx.employee_id or "",
+            tx.action,
+            "" if tx.quantity is None else f"{tx.quantity:g}",
+            tx.condition_note or "",
+            tx.notes or "",
+        ]
+
+    header = ["id", "created_at", "item_code", "item_name", "serial_number", "employee_id", "action", "quantity", "condition_note", "notes"]
+    return StreamingResponse(
+        stream_csv(RestrictedItemTransaction, header, _row, filters, extra=_lookup),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="restricted-inventory-transactions.csv"'},
+    )
+
+
+@router.get("/snapshots", response_model=List[StockSnapshotOut])
+async def list_snapshots(limit: int = 100, db: Session = Depends(get_db)) -> List[StockSnapshotOut]:
+    return (
+        db.query(InventoryStockSnapshot)
+        .filter(InventoryStockSnapshot.kind == "restricted")
+        .order_by(InventoryStockSnapshot.taken_at.desc(), InventoryStockSnapshot.id.desc())
+        .limit(min(max(limit, 1), 500))
+        .all()
+    )
+
+
+@router.post("/snapshots", response_model=StockSnapshotOut)
+async def create_snapshot(label: Optional[str] = None, db: Session = Depends(get_db)) -> StockSnapshotOut:
+    """Record current stock and balances, e.g. at month close, so as-of queries replay less history."""
+    return take_snapshot(db, "restricted", label=label)
 
 
-@router.post("/items/{item_code}/issue", response_model=List[RestrictedTransactionOut])
-async def issue_item(item_code: str, payload: IssueRequest, db: Session = Depends(get_db)) -> List[RestrictedTransactionOut]:
+@router.get("/stock/as-of", response_model=StockAsOfOut)
+async def get_stock_as_of(
+    at: datetime,
+    item_code: Optional[str] = None,
+    employee_id: Optional[str] = None,
+    db: Session = Depends(get_db),
+) -> StockAsOfOut:
+    """Stock on hand and employee balances at ``at``: nearest snapshot plus the transactions after it."""
+    result = stock_as_of(db, "restricted", at, item_code=item_code, employee_id=employee_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No stock snapshot before this time")
+    return result
+
+
+@router.post("/items/{item_code}/issue", response_model=ItemActionResult)
+async def issue_item(item_code: str, payload: IssueRequest, db: Session = Depends(get_db)) -> ItemActionResult:
     item = db.query(RestrictedItem).filter(RestrictedItem.item_code == item_code).first()
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
@@ -621,61 +767,152 @@ async def issue_item(item_code: str, payload: IssueRequest, db: Session = Depend
         raise HTTPException(status_code=400, detail="Employee ID is required")
     _ensure_employee(db, employee_id)
 
-    created: List[RestrictedItemTransaction] = []
-
     if item.is_serial_tracked:
-        sns = payload.serial_numbers or []
-        sns = [s.strip() for s in sns if s and s.strip()]
-        if not sns:
-            raise HTTPException(status_code=400, detail="serial_numbers are required for serial-tracked items")
-
-        units = (
-            db.query(RestrictedItemSerialUnit)
-            .filter(RestrictedItemSerialUnit.item_code == item_code)
-            .filter(RestrictedItemSerialUnit.serial_number.in_(sns))
-            .all()
-        )
-        found = {u.serial_number: u for u in units}
-        missing = [sn for sn in sns if sn not in found]
-        if missing:
-            raise HTTPException(status_code=400, detail=f"Serial(s) not found: {', '.join(missing)}")
+        sns = _request_serials(payload.serial_numbers)
+        unit_ids = list(_serial_units(db, item_code, sns, "in_stock", "Serial {sn} is not available").values())
+        _set_serial_status(db, unit_ids, "in_stock", status="issued", issued_to_employee_id=employee_id)
+        _log_serial_txs(db, item_code=item_code, action="ISSUE", employee_id=employee_id, unit_ids=unit_ids, notes=payload.notes)
+        db.commit()
+        return ItemActionResult(item_code=item_code, action="ISSUE", employee_id=employee_id, serials=len(unit_ids), transactions=len(unit_ids))
+
+    qty = payload.quantity
+    if qty is None or qty <= 0:
+        raise HTTPException(status_code=400, detail="quantity must be > 0")
+    if not take_stock(db, RestrictedItem, item_code, float(qty)):
+        raise HTTPException(status_code=400, detail="Not enough stock")
+    if employee_id:
+        add_balance(db, RestrictedItemEmployeeBalance, employee_id, item_code, float(qty))
+    _log_tx(db, item_code=item_code, action="ISSUE", employee_id=employee_id, quantity=float(qty), notes=payload.notes)
+    db.commit()
+    return ItemActionResult(item_code=item_code, action="ISSUE", employee_id=employee_id, quantity=float(qty), transactions=1)
 
-        for sn in sns:
-            u = found[sn]
-            if u.status != "in_stock":
-                raise HTTPException(status_code=400, detail=f"Serial {sn} is not available")
-            u.status = "issued"
-            u.issued_to_employee_id = employee_id
-            _log_tx(db, item_code=item_code, action="ISSUE", employee_id=employee_id, serial_unit_id=u.id, notes=payload.notes)
 
-    else:
-        qty = payload.quantity
-        if qty is None or qty <= 0:
-            raise HTTPException(status_code=400, detail="quantity must be > 0")
-        if item.quantity_on_hand < qty:
-            raise HTTPException(status_code=400, detail="Not enough stock")
-
-        item.quantity_on_hand = float(item.quantity_on_hand) - float(qty)
-        if employee_id:
-            bal = _get_or_create_balance(db, employee_id=employee_id, item_code=item_code)
-            bal.quantity_issued = float(bal.quantity_issued or 0.0) + float(qty)
-        _log_tx(db, item_code=item_code, action="ISSUE", employee_id=employee_id, quantity=float(qty), notes=payload.notes)
+@router.post("/issue-batch", response_model=BatchIssueResult)
+async def issue_batch(payload: BatchIssueRequest, db: Session = Depends(get_db)) -> BatchIssueResult:
+    """Issue kit (serial units and quantity items) to many employees at once.
 
+    The whole batch is validated in one pass (employees, items, serial
+    availability, stock); serial units, stock, balances and transactions are
+    then written in a single transaction.
+    """
+    if not payload.lines:
+        raise HTTPException(status_code=400, detail="lines are required")
+
+    employee_ids = {(ln.employee_id or "").strip() for ln in payload.lines} - {""}
+    item_codes = {(ln.item_code or "").strip() for ln in payload.lines} - {""}
+    known = {r[0] for r in db.query(Employee.employee_id).filter(Employee.employee_id.in_(employee_ids))}
+    items = {
+        code: (bool(serial), float(qty or 0.0))
+        for code, serial, qty in db.query(
+            RestrictedItem.item_code, RestrictedItem.is_serial_tracked, RestrictedItem.quantity_on_hand
+        ).filter(RestrictedItem.item_code.in_(item_codes))
+    }
+    errors: List[str] = [f"Employee not found: {e}" for e in sorted(employee_ids - known)]
+    errors += [f"Item not found: {c}" for c in sorted(item_codes - set(items))]
+
+    serial_lines: List[tuple] = []  # (employee_id, item_code, serial_number, notes)
+    qty_lines: List[tuple] = []  # (employee_id, item_code, qty, notes)
+    for i, ln in enumerate(payload.lines, start=1):
+        employee_id = (ln.employee_id or "").strip()
+        item_code = (ln.item_code or "").strip()
+        notes = ln.notes or payload.notes
+        if not employee_id or not item_code:
+            errors.append(f"line {i}: employee_id and item_code are required")
+            continue
+        if item_code not in items:
+            continue
+        if items[item_code][0]:
+            sns = [sn.strip() for sn in (ln.serial_numbers or []) if sn and sn.strip()]
+            if not sns:
+                errors.append(f"line {i}: serial_numbers are required for serial-tracked items")
+            serial_lines += [(employee_id, item_code, sn, notes) for sn in sns]
+        else:
+            qty = float(ln.quantity or 0.0)
+            if qty <= 0:
+                errors.append(f"line {i}: quantity must be > 0")
+            else:
+                qty_lines.append((employee_id, item_code, qty, notes))
+
+    unit_ids: dict[tuple[str, str], int] = {}
+    if serial_lines:
+        pairs = [(code, sn) for _, code, sn, _ in serial_lines]
+        counts: dict[tuple[str, str], int] = {}
+        for pair in pairs:
+            counts[pair] = counts.get(pair, 0) + 1
+        errors += [f"Serial {sn} appears more than once" for (code, sn), n in counts.items() if n > 1]
+        units = {
+            (code, sn): (unit_id, status)
+            for unit_id, code, sn, status in db.query(
+                RestrictedItemSerialUnit.id,
+                RestrictedItemSerialUnit.item_code,
+                RestrictedItemSerialUnit.serial_number,
+                RestrictedItemSerialUnit.status,
+            ).filter(tuple_(RestrictedItemSerialUnit.item_code, RestrictedItemSerialUnit.serial_number).in_(set(pairs)))
+        }
+        for code, sn in dict.fromkeys(pairs):
+            if (code, sn) not in units:
+                errors.append(f"Serial not found: {code}/{sn}")
+            elif units[(code, sn)][1] != "in_stock":
+                errors.append(f"Serial {sn} is not available")
+            else:
+                unit_ids[(code, sn)] = units[(code, sn)][0]
+
+    requested: dict[str, float] = {}
+    amounts: dict[tuple[str, str], float] = {}
+    for employee_id, item_code, qty, _ in qty_lines:
+        requested[item_code] = requested.get(item_code, 0.0) + qty
+        amounts[(employee_id, item_code)] = amounts.get((employee_id, item_code), 0.0) + qty
+    errors += [
+        f"Not enough stock for {code}: requested {qty:g}, on hand {items[code][1]:g}"
+        for code, qty in sorted(requested.items())
+        if qty > items[code][1]
+    ]
+    if errors:
+        raise HTTPException(status_code=400, detail=describe_errors(errors))
+
+    if serial_lines:
+        assign = {unit_ids[(code, sn)]: employee_id for employee_id, code, sn, _ in serial_lines}
+        claimed = db.execute(
+            update(RestrictedItemSerialUnit)
+            .where(RestrictedItemSerialUnit.id.in_(list(assign)), RestrictedItemSerialUnit.status == "in_stock")
+            .values(status="issued", issued_to_employee_id=case(assign, value=RestrictedItemSerialUnit.id))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed != len(assign):
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Some serials were issued by another request; retry")
+    for code, qty in requested.items():
+        if not take_stock(db, RestrictedItem, code, qty):
+            db.rollback()
+            raise HTTPException(status_code=400, detail=f"Not enough stock for {code}")
+    add_balances(db, RestrictedItemEmployeeBalance, amounts)
+
+    tx_rows = [
+        {"item_code": code, "employee_id": emp, "action": "ISSUE", "serial_unit_id": unit_ids[(code, sn)], "notes": notes}
+        for emp, code, sn, notes in serial_lines
+    ]
+    tx_rows += [
+        {"item_code": code, "employee_id": emp, "action": "ISSUE", "quantity": qty, "notes": notes}
+        for emp, code, qty, notes in qty_lines
+    ]
+    db.bulk_insert_mappings(RestrictedItemTransaction, tx_rows)
+    mark_tables_changed(db, RestrictedItemEmployeeBalance.__tablename__, RestrictedItemTransaction.__tablename__)
     db.commit()
 
-    # return latest transactions for this request
-    txs = (
-        db.query(RestrictedItemTransaction)
-        .filter(RestrictedItemTransaction.item_code == item_code)
-        .order_by(RestrictedItemTransaction.id.desc())
-        .limit(50)
-        .all()
+    serials: dict[str, int] = {}
+    for _, code, _, _ in serial_lines:
+        serials[code] = serials.get(code, 0) + 1
+    return BatchIssueResult(
+        lines=len(payload.lines),
+        employees=len({ln[0] for ln in serial_lines} | {ln[0] for ln in qty_lines}),
+        transactions=len(tx_rows),
+        quantities=requested,
+        serials=serials,
     )
-    return list(reversed(txs))
 
 
-@router.post("/items/{item_code}/return", response_model=List[RestrictedTransactionOut])
-async def return_item(item_code: str, payload: ReturnRequest, db: Session = Depends(get_db)) -> List[RestrictedTransactionOut]:
+@router.post("/items/{item_code}/return", response_model=ItemActionResult)
+async def return_item(item_code: str, payload: ReturnRequest, db: Session = Depends(get_db)) -> ItemActionResult:
     item = db.query(RestrictedItem).filter(RestrictedItem.item_code == item_code).first()
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
@@ -685,152 +922,83 @@ async def return_item(item_code: str, payload: ReturnRequest, db: Session = Depe
         raise HTTPException(status_code=400, detail="Employee ID is required")
     _ensure_employee(db, employee_id)
 
-    created: List[RestrictedItemTransaction] = []
-
     if item.is_serial_tracked:
-        sns = payload.serial_numbers or []
-        sns = [s.strip() for s in sns if s and s.strip()]
-        if not sns:
-            raise HTTPException(status_code=400, detail="serial_numbers are required for serial-tracked items")
-
-        units = (
-            db.query(RestrictedItemSerialUnit)
-            .filter(RestrictedItemSerialUnit.item_code == item_code)
-            .filter(RestrictedItemSerialUnit.serial_number.in_(sns))
-            .all()
-        )
-        found = {u.serial_number: u for u in units}
-        missing = [sn for sn in sns if sn not in found]
-        if missing:
-            raise HTTPException(status_code=400, detail=f"Serial(s) not found: {', '.join(missing)}")
-
-        for sn in sns:
-            u = found[sn]
-            if u.status != "issued":
-                raise HTTPException(status_code=400, detail=f"Serial {sn} is not issued")
-            u.status = "in_stock"
-            u.issued_to_employee_id = None
-            _log_tx(db, item_code=item_code, action="RETURN", employee_id=employee_id, serial_unit_id=u.id, notes=payload.notes)
-
-    else:
-        qty = payload.quantity
-        if qty is None or qty <= 0:
-            raise HTTPException(status_code=400, detail="quantity must be > 0")
-
-        item.quantity_on_hand = float(item.quantity_on_hand) + float(qty)
+        sns = _request_serials(payload.serial_numbers)
+        unit_ids = list(_serial_units(db, item_code, sns, "issued", "Serial {sn} is not issued").values())
+        _set_serial_status(db, unit_ids, "issued", status="in_stock", issued_to_employee_id=None)
+        _log_serial_txs(db, item_code=item_code, action="RETURN", employee_id=employee_id, unit_ids=unit_ids, notes=payload.notes)
+        db.commit()
+        return ItemActionResult(item_code=item_code, action="RETURN", employee_id=employee_id, serials=len(unit_ids), transactions=len(unit_ids))
+
+    qty = payload.quantity
+    if qty is None or qty <= 0:
+        raise HTTPException(status_code=400, detail="quantity must be > 0")
 
-        if employee_id:
-            bal = _get_or_create_balance(db, employee_id=employee_id, item_code=item_code)
-            if float(bal.quantity_issued or 0.0) < float(qty):
-                # If mismatch, reset balance to 0
-                bal.quantity_issued = 0.0
-            else:
-                bal.quantity_issued = float(bal.quantity_issued or 0.0) - float(qty)
+    put_stock(db, RestrictedItem, item_code, float(qty))
 
-        _log_tx(db, item_code=item_code, action="RETURN", employee_id=employee_id, quantity=float(qty), notes=payload.notes)
+    if employee_id:
+        # If mismatch, the balance floors at 0
+        take_balance(db, RestrictedItemEmployeeBalance, employee_id, item_code, float(qty), clamp=True)
 
+    _log_tx(db, item_code=item_code, action="RETURN", employee_id=employee_id, quantity=float(qty), notes=payload.notes)
     db.commit()
+    return ItemActionResult(item_code=item_code, action="RETURN", employee_id=employee_id, quantity=float(qty), transactions=1)
 
-    txs = (
-        db.query(RestrictedItemTransaction)
-        .filter(RestrictedItemTransaction.item_code == item_code)
-        .order_by(RestrictedItemTransaction.id.desc())
-        .limit(50)
-        .all()
-    )
-    return list(reversed(txs))
 
-
-@router.post("/items/{item_code}/maintenance", response_model=List[RestrictedTransactionOut])
-async def mark_maintenance(item_code: str, payload: LostRequest, db: Session = Depends(get_db)) -> List[RestrictedTransactionOut]:
+@router.post("/items/{item_code}/maintenance", response_model=ItemActionResult)
+async def mark_maintenance(item_code: str, payload: LostRequest, db: Session = Depends(get_db)) -> ItemActionResult:
     item = db.query(RestrictedItem).filter(RestrictedItem.item_code == item_code).first()
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
     if item.is_serial_tracked:
-        sns = payload.serial_numbers or []
-        sns = [s.strip() for s in sns if s and s.strip()]
-        if not sns:
-            raise HTTPException(status_code=400, detail="serial_numbers are required for serial-tracked items")
-
-        units = (
-            db.query(RestrictedItemSerialUnit)
-            .filter(RestrictedItemSerialUnit.item_code == item_code)
-            .filter(RestrictedItemSerialUnit.serial_number.in_(sns))
-            .all()
+        sns = _request_serials(payload.serial_numbers)
+        unit_ids = list(_serial_units(db, item_code, sns).values())
+        _set_serial_status(db, unit_ids, None, status="maintenance", issued_to_employee_id=None)
+        _log_serial_txs(
+            db, item_code=item_code, action="MAINTENANCE", employee_id=payload.employee_id, unit_ids=unit_ids, notes=payload.notes
+        )
+        db.commit()
+        return ItemActionResult(
+            item_code=item_code, action="MAINTENANCE", employee_id=payload.employee_id, serials=len(unit_ids), transactions=len(unit_ids)
         )
-        found = {u.serial_number: u for u in units}
-        missing = [sn for sn in sns if sn not in found]
-        if missing:
-            raise HTTPException(status_code=400, detail=f"Serial(s) not found: {', '.join(missing)}")
-
-        for sn in sns:
-            u = found[sn]
-            u.status = "maintenance"
-            u.issued_to_employee_id = None
-            _log_tx(db, item_code=item_code, action="MAINTENANCE", employee_id=payload.employee_id, serial_unit_id=u.id, notes=payload.notes)
-
-    else:
-        qty = payload.quantity
-        if qty is None or qty <= 0:
-            raise HTTPException(status_code=400, detail="quantity must be > 0")
-        _log_tx(db, item_code=item_code, action="MAINTENANCE", employee_id=payload.employee_id, quantity=float(qty), notes=payload.notes)
 
+    qty = payload.quantity
+    if qty is None or qty <= 0:
+        raise HTTPException(status_code=400, detail="quantity must be > 0")
+    _log_tx(db, item_code=item_code, action="MAINTENANCE", employee_id=payload.employee_id, quantity=float(qty), notes=payload.notes)
     db.commit()
-
-    txs = (
-        db.query(RestrictedItemTransaction)
-        .filter(RestrictedItemTransaction.item_code == item_code)
-        .order_by(RestrictedItemTransaction.id.desc())
-        .limit(50)
-        .all()
+    return ItemActionResult(
+        item_code=item_code, action="MAINTENANCE", employee_id=payload.employee_id, quantity=float(qty), transactions=1
     )
-    return list(reversed(txs))
 
 
-@router.post("/items/{item_code}/cleaning", response_model=List[RestrictedTransactionOut])
-async def mark_cleaning(item_code: str, payload: LostRequest, db: Session = Depends(get_db)) -> List[RestrictedTransactionOut]:
+@router.post("/items/{item_code}/cleaning", response_model=ItemActionResult)
+async def mark_cleaning(item_code: str, payload: LostRequest, db: Session = Depends(get_db)) -> ItemActionResult:
     item = db.query(RestrictedItem).filter(RestrictedItem.item_code == item_code).first()
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
     if item.is_serial_tracked:
-        sns = payload.serial_numbers or []
-        sns = [s.strip() for s in sns if s and s.strip()]
-        if not sns:
-            raise HTTPException(status_code=400, detail="serial_numbers are required for serial-tracked items")
-
-        units = (
-            db.query(RestrictedItemSerialUnit)
-            .filter(RestrictedItemSerialUnit.item_code == item_code)
-            .filter(RestrictedItemSerialUnit.serial_number.in_(sns))
-            .all()
+        # Cleaning leaves the units where they are; only the log is written.
+        sns = _request_serials(payload.serial_numbers)
+        unit_ids = list(_serial_units(db, item_code, sns).values())
+        _log_serial_txs(
+            db, item_code=item_code, action="CLEANING", employee_id=payload.employee_id, unit_ids=unit_ids, notes=payload.notes
+        )
+        db.commit()
+        return ItemActionResult(
+            item_code=item_code, action="CLEANING", employee_id=payload.employee_id, serials=len(unit_ids), transactions=len(unit_ids)
         )
-        found = {u.serial_number: u for u in units}
-        missing = [sn for sn in sns if sn not in found]
-        if missing:
-            raise HTTPException(status_code=400, detail=f"Serial(s) not found: {', '.join(missing)}")
-
-        for sn in sns:
-            u = found[sn]
-            _log_tx(db, item_code=item_code, action="CLEANING", employee_id=payload.employee_id, serial_unit_id=u.id, notes=payload.notes)
-
-    else:
-        qty = payload.quantity
-        if qty is None or qty <= 0:
-            raise HTTPException(status_code=400, detail="quantity must be > 0")
-        _log_tx(db, item_code=item_code, action="CLEANING", employee_id=payload.employee_id, quantity=float(qty), notes=payload.notes)
 
+    qty = payload.quantity
+    if qty is None or qty <= 0:
+        raise HTTPException(status_code=400, detail="quantity must be > 0")
+    _log_tx(db, item_code=item_code, action="CLEANING", employee_id=payload.employee_id, quantity=float(qty), notes=payload.notes)
     db.commit()
-
-    txs = (
-        db.query(RestrictedItemTransaction)
-        .filter(RestrictedItemTransaction.item_code == item_code)
-        .order_by(RestrictedItemTransaction.id.desc())
-        .limit(50)
-        .all()
+    return ItemActionResult(
+        item_code=item_code, action="CLEANING", employee_id=payload.employee_id, quantity=float(qty), transactions=1
     )
-    return list(reversed(txs))
 
 
 @router.post("/items/{item_code}/adjust", response_model=RestrictedItemOut)
@@ -844,8 +1012,8 @@ async def adjust_stock(item_code: str, payload: RestrictedItemUpdate, db: Sessio
     if payload.quantity_on_hand is None:
         raise HTTPException(status_code=400, detail="quantity_on_hand is required")
 
-    item.quantity_on_hand = float(payload.quantity_on_hand)
-    _log_tx(db, item_code=item_code, action="ADJUST", quantity=float(item.quantity_on_hand), notes="Stock adjusted")
+    set_stock(db, RestrictedItem, item_code, float(payload.quantity_on_hand))
+    _log_tx(db, item_code=item_code, action="ADJUST", quantity=float(payload.quantity_on_hand), notes="Stock adjusted")
     db.commit()
     db.refresh(item)
     return item
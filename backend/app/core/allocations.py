@@ -0,0 +1,187 @@
+"""Date-range conflict checks for guard allocations.
+
+Every question ("is this guard free from A to B", "which guards are free",
+"does this batch clash with itself or the roster") is answered with a single
+query against ``client_site_guard_allocations``. The composite index
+``(employee_db_id, start_date, end_date)`` makes each check an index range
+scan per employee; on PostgreSQL an exclusion constraint over
+``daterange(start_date, end_date, '[]')`` additionally rejects overlapping
+rows at the database level (see ``app.main``).
+
+``None`` dates are open-ended on that side, matching how allocations are
+stored.
+
+Site allocations (``Allocated``) reference ``employees`` and contract
+allocations (``Active``) reference ``employees2``, so callers pass the
+statuses of the allocation kind they are checking.
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Iterable, List, Optional, Sequence
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.models.client_site_guard_allocation import ClientSiteGuardAllocation
+
+
+SITE_STATUSES = ("Allocated",)
+CONTRACT_STATUSES = ("Active",)
+
+A = ClientSiteGuardAllocation
+
+
+def overlapping(start: Optional[date], end: Optional[date], statuses: Sequence[str] = SITE_STATUSES) -> list:
+    """Filter conditions for allocations in ``statuses`` overlapping [start, end]."""
+
+    conds = [A.status.in_(list(statuses))]
+    if end is not None:
+        conds.append(or_(A.start_date.is_(None), A.start_date <= end))
+    if start is not None:
+        conds.append(or_(A.end_date.is_(None), A.end_date >= start))
+    return conds
+
+
+def busy_clause(
+    employee_db_id: Any,
+    start: Optional[date],
+    end: Optional[date],
+    statuses: Sequence[str] = SITE_STATUSES,
+):
+    """Correlated EXISTS: the guard (a column or a value) has an overlapping allocation."""
+
+    return select(A.id).where(A.employee_db_id == employee_db_id, *overlapping(start, end, statuses)).exists()
+
+
+def keeps_allocation(
+    employee_db_id: Any,
+    statuses: Sequence[str] = SITE_STATUSES,
+    *,
+    exclude_id: Optional[int] = None,
+    exclude_contract_id: Optional[int] = None,
+):
+    """Correlated EXISTS: the guard still holds an allocation in ``statuses`` besides the excluded ones.
+
+    Used before marking a guard ``Free``: with date ranges a guard can hold
+    several allocations at once.
+    """
+
+    conds = [A.employee_db_id == employee_db_id, A.status.in_(list(statuses))]
+    if exclude_id is not None:
+        conds.append(A.id != exclude_id)
+    if exclude_contract_id is not None:
+        conds.append(or_(A.contract_id.is_(None), A.contract_id != exclude_contract_id))
+    return select(A.id).where(*conds).exists()
+
+
+def find_conflict(
+    db: Session,
+    employee_db_id: int,
+    start: Optional[date],
+    end: Optional[date],
+    statuses: Sequence[str] = SITE_STATUSES,
+    exclude_id: Optional[int] = None,
+) -> Optional[ClientSiteGuardAllocation]:
+    """First allocation that clashes with [start, end] for this guard, or ``None``."""
+
+    q = db.query(A).filter(A.employee_db_id == employee_db_id, *overlapping(start, end, statuses))
+    if exclude_id is not None:
+        q = q.filter(A.id != exclude_id)
+    return q.order_by(A.start_date.asc()).first()
+
+
+def is_guard_free(
+    db: Session,
+    employee_db_id: int,
+    start: Optional[date],
+    end: Optional[date],
+    statuses: Sequence[str] = SITE_STATUSES,
+) -> bool:
+    return not db.query(busy_clause(employee_db_id, start, end, statuses)).scalar()
+
+
+def free_guards(
+    db: Session,
+    model: Any,
+    start: Optional[date],
+    end: Optional[date],
+    statuses: Sequence[str] = SITE_STATUSES,
+):
+    """Query of ``model`` rows (employees or employees2) with no overlapping allocation."""
+
+    return db.query(model).filter(~busy_clause(model.id, start, end, statuses))
+
+
+@dataclass
+class BatchConflict:
+    index: int
+    employee_db_id: int
+    reason: str
+    allocation_id: Optional[int] = None
+    batch_index: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "employee_db_id": self.employee_db_id,
+            "reason": self.reason,
+            "allocation_id": self.allocation_id,
+            "batch_index": self.batch_index,
+        }
+
+
+def _overlaps(a_start: Optional[date], a_end: Optional[date], b_start: Optional[date], b_end: Optional[date]) -> bool:
+    return (a_start or date.min) <= (b_end or date.max) and (b_start or date.min) <= (a_end or date.max)
+
+
+def check_batch(
+    db: Session,
+    items: Iterable[dict],
+    statuses: Sequence[str] = SITE_STATUSES,
+) -> List[BatchConflict]:
+    """Validate many proposed allocations at once.
+
+    ``items`` are dicts with ``employee_db_id``, ``start_date`` and
+    ``end_date``. Existing allocations for all guards in the batch are fetched
+    in one query (bounded by the batch's overall date envelope); clashes with
+    the roster and between items of the batch itself are reported.
+    """
+
+    items = list(items)
+    if not items:
+        return []
+
+    emp_ids = {int(it["employee_db_id"]) for it in items}
+    starts = [it.get("start_date") for it in items]
+    ends = [it.get("end_date") for it in items]
+    lo = None if any(s is None for s in starts) else min(starts)
+    hi = None if any(e is None for e in ends) else max(ends)
+
+    existing: dict[int, list] = {}
+    rows = (
+        db.query(A.id, A.employee_db_id, A.start_date, A.end_date)
+        .filter(A.employee_db_id.in_(emp_ids), *overlapping(lo, hi, statuses))
+        .all()
+    )
+    for alloc_id, emp_id, s, e in rows:
+        existing.setdefault(int(emp_id), []).append((alloc_id, s, e))
+
+    conflicts: List[BatchConflict] = []
+    seen: dict[int, list] = {}
+    for idx, it in enumerate(items):
+        emp_id = int(it["employee_db_id"])
+        s, e = it.get("start_date"), it.get("end_date")
+        if s is not None and e is not None and e < s:
+            conflicts.append(BatchConflict(idx, emp_id, "end_date before start_date"))
+            continue
+        clash = next((a for a in existing.get(emp_id, []) if _overlaps(a[1], a[2], s, e)), None)
+        if clash is not None:
+            conflicts.append(BatchConflict(idx, emp_id, "already allocated", allocation_id=int(clash[0])))
+            continue
+        twin = next((j for j, ps, pe in seen.get(emp_id, []) if _overlaps(ps, pe, s, e)), None)
+        if twin is not None:
+            conflicts.append(BatchConflict(idx, emp_id, "overlaps another item in the batch", batch_index=twin))
+            continue
+        seen.setdefault(emp_id, []).append((idx, s, e))
+    return conflicts
@@ -0,0 +1,125 @@
+"""In-process lookup cache invalidated by per-table version counters.
+
+Every committed ORM write bumps the version of the tables it touched
+(tracked with session events). Cache keys embed the current versions of
+the tables a lookup depends on, so a write anywhere makes older entries
+unreachable without explicit deletes. Bulk paths that bypass the ORM unit
+of work (``bulk_insert_mappings`` etc.) call ``mark_tables_changed``.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+
+
+MAX_ENTRIES = 512
+DEFAULT_TTL_SECONDS = 600
+
+_lock = threading.Lock()
+_versions: dict[str, int] = {}
+_store: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+
+def table_version(table: str) -> int:
+    return _versions.get(table, 0)
+
+
+def bump_table_version(*tables: str) -> None:
+    with _lock:
+        for t in tables:
+            if t:
+                _versions[t] = _versions.get(t, 0) + 1
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value if isinstance(value, Hashable) else str(value)
+
+
+def cached(
+    namespace: str,
+    *,
+    tables: Iterable[str],
+    loader: Callable[[], Any],
+    key: Optional[dict[str, Any]] = None,
+    ttl: float = DEFAULT_TTL_SECONDS,
+) -> Any:
+    """Return the cached result for ``namespace`` + ``key`` or compute it with ``loader``.
+
+    ``key`` is the filter signature (query params); ``tables`` are the tables
+    whose writes invalidate the result.
+    """
+
+    tables = tuple(sorted(tables))
+    versions = tuple(table_version(t) for t in tables)
+    cache_key = (namespace, _freeze(key or {}), tables, versions)
+
+    now = time.monotonic()
+    with _lock:
+        hit = _store.get(cache_key)
+        if hit is not None and hit[0] > now:
+            _store.move_to_end(cache_key)
+            return hit[1]
+
+    value = loader()
+
+    with _lock:
+        # Only store if nothing was written while we were loading.
+        if versions == tuple(table_version(t) for t in tables):
+            _store[cache_key] = (now + ttl, value)
+            _store.move_to_end(cache_key)
+            while len(_store) > MAX_ENTRIES:
+                _store.popitem(last=False)
+    return value
+
+
+def clear_cache() -> None:
+    with _lock:
+        _store.clear()
+
+
+def mark_tables_changed(db: Session, *tables: str) -> None:
+    """Bump ``tables`` when ``db`` commits (for writes that skip the ORM flush)."""
+
+    db.info.setdefault("_cache_touched_tables", set()).update(t for t in tables if t)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _track_flushed_tables(session: Session, _flush_context) -> None:
+    touched = session.info.setdefault("_cache_touched_tables", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__table__", None)
+        if table is not None:
+            touched.add(table.name)
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _track_bulk_statements(state) -> None:
+    if not (state.is_update or state.is_delete or state.is_insert):
+        return
+    mapper = state.bind_mapper
+    if mapper is not None and mapper.local_table is not None:
+        mark_tables_changed(state.session, mapper.local_table.name)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _bump_committed_tables(session: Session) -> None:
+    touched = session.info.pop("_cache_touched_tables", None)
+    if touched:
+        bump_table_version(*touched)
+
+
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _discard_rolled_back_tables(session: Session, previous_transaction) -> None:
+    # Savepoint rollbacks keep the outer transaction's pending bumps.
+    if previous_transaction.parent is None:
+        session.info.pop("_cache_touched_tables", None)
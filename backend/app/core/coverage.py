@@ -0,0 +1,174 @@
+"""Guard coverage per site and day: required vs allocated vs present.
+
+A day series (recursive CTE on SQLite, ``generate_series`` on PostgreSQL)
+is joined to the date ranges of ``client_guard_requirements`` and
+``client_site_guard_allocations`` and to ``attendance_records``, and grouped
+by (site, day) in the database. Two grouped queries plus one for site and
+client names cover any number of sites.
+
+Site allocations reference ``employees``; attendance is matched on
+``employees.employee_id``. A guard counts as present when marked present
+or late.
+"""
+
+from datetime import date, timedelta
+from typing import List, Optional
+
+from sqlalchemy import Date, and_, cast, func, literal, or_, select, text
+from sqlalchemy.orm import Session
+
+from app.core.allocations import SITE_STATUSES
+from app.models.attendance import AttendanceRecord
+from app.models.client import Client
+from app.models.client_guard_requirement import ClientGuardRequirement
+from app.models.client_site import ClientSite
+from app.models.client_site_guard_allocation import ClientSiteGuardAllocation
+from app.models.employee import Employee
+
+
+PRESENT_STATUSES = ("present", "late")
+
+
+def _day_series(db: Session, start: date, end: date):
+    if db.bind.dialect.name == "postgresql":
+        series = func.generate_series(start, end, text("interval '1 day'"))
+        return select(cast(series, Date).label("d")).subquery("days")
+    days = select(literal(start, Date).label("d")).cte("days", recursive=True)
+    return days.union_all(select(func.date(days.c.d, "+1 day")).where(days.c.d < end))
+
+
+def _covers(start_col, end_col, day_col):
+    return and_(or_(start_col.is_(None), start_col <= day_col), or_(end_col.is_(None), end_col >= day_col))
+
+
+def compute_coverage(
+    db: Session,
+    start: date,
+    end: date,
+    *,
+    client_id: Optional[int] = None,
+    site_ids: Optional[List[int]] = None,
+    only_gaps: bool = False,
+    include_matrix: bool = True,
+) -> dict:
+    days = _day_series(db, start, end)
+    d = days.c.d
+
+    site_filter = []
+    if client_id is not None:
+        site_filter.append(ClientSite.client_id == client_id)
+    if site_ids:
+        site_filter.append(ClientSite.id.in_(site_ids))
+
+    R = ClientGuardRequirement
+    req_rows = db.execute(
+        select(R.site_id, d, func.sum(R.number_of_guards))
+        .select_from(days)
+        .join(R, _covers(R.start_date, R.end_date, d))
+        .join(ClientSite, ClientSite.id == R.site_id)
+        .where(*site_filter)
+        .group_by(R.site_id, d)
+    ).all()
+
+    A = ClientSiteGuardAllocation
+    att = AttendanceRecord
+    alloc_rows = db.execute(
+        select(A.site_id, d, func.count(func.distinct(A.employee_db_id)), func.count(func.distinct(att.employee_id)))
+        .select_from(days)
+        .join(A, and_(A.status.in_(SITE_STATUSES), A.site_id.isnot(None), _covers(A.start_date, A.end_date, d)))
+        .join(ClientSite, ClientSite.id == A.site_id)
+        .outerjoin(Employee, Employee.id == A.employee_db_id)
+        .outerjoin(
+            att,
+            and_(
+                att.employee_id == Employee.employee_id,
+                att.date == d,
+                func.lower(att.status).in_(PRESENT_STATUSES),
+            ),
+        )
+        .where(*site_filter)
+        .group_by(A.site_id, d)
+    ).all()
+
+    day_list = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    index = {dd: i for i, dd in enumerate(day_list)}
+    n = len(day_list)
+
+    def _day_index(v) -> Optional[int]:
+        if isinstance(v, str):
+            v = date.fromisoformat(v[:10])
+        return index.get(v)
+
+    grid: dict[int, dict[str, list]] = {}
+
+    def _row(site_id: int) -> dict[str, list]:
+        return grid.setdefault(int(site_id), {"required": [0] * n, "allocated": [0] * n, "present": [0] * n})
+
+    for site_id, day, required in req_rows:
+        i = _day_index(day)
+        if i is not None:
+            _row(site_id)["required"][i] = int(required or 0)
+    for site_id, day, allocated, present in alloc_rows:
+        i = _day_index(day)
+        if i is not None:
+            row = _row(site_id)
+            row["allocated"][i] = int(allocated or 0)
+            row["present"][i] = int(present or 0)
+
+    sites = {}
+    if grid:
+        for s_id, s_name, s_city, c_id, c_name, c_code in db.execute(
+            select(ClientSite.id, ClientSite.site_name, ClientSite.city, Client.id, Client.client_name, Client.client_code)
+            .join(Client, Client.id == ClientSite.client_id)
+            .where(ClientSite.id.in_(list(grid)))
+        ):
+            sites[s_id] = (s_name, s_city, c_id, c_name, c_code)
+
+    def _summary(rows: list[dict]) -> dict:
+        return {
+            "required_guard_days": sum(r["required_guard_days"] for r in rows),
+            "allocated_guard_days": sum(r["allocated_guard_days"] for r in rows),
+            "present_guard_days": sum(r["present_guard_days"] for r in rows),
+            "allocation_gap_guard_days": sum(r["allocation_gap_guard_days"] for r in rows),
+            "attendance_gap_guard_days": sum(r["attendance_gap_guard_days"] for r in rows),
+        }
+
+    clients: dict[int, dict] = {}
+    for site_id, row in grid.items():
+        if site_id not in sites:
+            continue
+        s_name, s_city, c_id, c_name, c_code = sites[site_id]
+        req, alloc, pres = row["required"], row["allocated"], row["present"]
+        alloc_gap = [max(r - a, 0) for r, a in zip(req, alloc)]
+        att_gap = [max(r - p, 0) for r, p in zip(req, pres)]
+        entry = {
+            "site_id": site_id,
+            "site_name": s_name,
+            "city": s_city,
+            "required_guard_days": sum(req),
+            "allocated_guard_days": sum(alloc),
+            "present_guard_days": sum(pres),
+            "allocation_gap_guard_days": sum(alloc_gap),
+            "attendance_gap_guard_days": sum(att_gap),
+            "understaffed_days": sum(1 for g in alloc_gap if g),
+            "max_shortfall": max(alloc_gap) if alloc_gap else 0,
+        }
+        if only_gaps and not (entry["allocation_gap_guard_days"] or entry["attendance_gap_guard_days"]):
+            continue
+        if include_matrix:
+            entry["matrix"] = row
+        client = clients.setdefault(c_id, {"client_id": c_id, "client_name": c_name, "client_code": c_code, "sites": []})
+        client["sites"].append(entry)
+
+    out_clients = []
+    for client in sorted(clients.values(), key=lambda c: (c["client_name"] or "").lower()):
+        client["sites"].sort(key=lambda s: (-s["allocation_gap_guard_days"], (s["site_name"] or "").lower()))
+        out_clients.append({**client, **_summary(client["sites"])})
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "days": [dd.isoformat() for dd in day_list] if include_matrix else None,
+        "totals": _summary([s for c in out_clients for s in c["sites"]]),
+        "clients": out_clients,
+    }
@@ -0,0 +1,283 @@
+"""Account balances from cached per-month totals of POSTED journal lines.
+
+``finance_account_period_balances`` holds, per account and month, the
+debit and credit totals of every POSTED journal line dated in that month.
+Posting an entry (including the automatic posting of a reversal) adds its
+lines to those totals in the same transaction, so balances never scan the
+journal history:
+
+* a balance as of a date is the sum of the cached totals of the months
+  before that date's month, plus the raw lines of the part of its own month
+  up to the date (at most one month of lines);
+* a parent account's roll-up adds the balances of all accounts below it in
+  the ``parent_id`` hierarchy.
+
+Balances are signed debit minus credit; the trial balance also splits them
+into debit and credit columns.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.finance_account import FinanceAccount
+from app.models.finance_account_period_balance import FinanceAccountPeriodBalance
+from app.models.finance_journal_entry import FinanceJournalEntry
+from app.models.finance_journal_line import FinanceJournalLine
+
+
+CENT = Decimal("0.01")
+ZERO = Decimal("0.00")
+
+
+def _dec(v) -> Decimal:
+    return Decimal(str(v or 0)).quantize(CENT)
+
+
+def period_of(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def _add_totals(db: Session, account_id: int, period: date, debit: Decimal, credit: Decimal) -> None:
+    P = FinanceAccountPeriodBalance
+    increment = (
+        update(P)
+        .where(P.account_id == account_id, P.period == period)
+        .values(debit=P.debit + debit, credit=P.credit + credit)
+        .execution_options(synchronize_session=False)
+    )
+    if db.execute(increment).rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(P).values(account_id=account_id, period=period, debit=debit, credit=credit))
+    except IntegrityError:
+        # Another posting created the row first.
+        db.execute(increment)
+
+
+def record_posting(db: Session, entry: FinanceJournalEntry) -> None:
+    """Add a just-posted entry's lines to the period totals (caller commits)."""
+
+    per_account: dict[int, list[Decimal]] = {}
+    for ln in entry.lines:
+        t = per_account.setdefault(int(ln.account_id), [ZERO, ZERO])
+        t[0] += _dec(ln.debit)
+        t[1] += _dec(ln.credit)
+    period = period_of(entry.entry_date)
+    for account_id, (debit, credit) in sorted(per_account.items()):
+        _add_totals(db, account_id, period, debit, credit)
+
+
+def rebuild_period_balances(db: Session) -> None:
+    """Recompute all period totals from the POSTED journal lines; commits."""
+
+    L, E = FinanceJournalLine, FinanceJournalEntry
+    rows = (
+        db.query(L.account_id, E.entry_date, func.sum(L.debit), func.sum(L.credit))
+        .join(E, E.id == L.entry_id)
+        .filter(E.status == "POSTED")
+        .group_by(L.account_id, E.entry_date)
+        .all()
+    )
+    totals: dict[tuple[int, date], list[Decimal]] = {}
+    for account_id, entry_date, debit, credit in rows:
+        t = totals.setdefault((int(account_id), period_of(entry_date)), [ZERO, ZERO])
+        t[0] += _dec(debit)
+        t[1] += _dec(credit)
+
+    db.query(FinanceAccountPeriodBalance).delete(synchronize_session=False)
+    if totals:
+        db.bulk_insert_mappings(
+            FinanceAccountPeriodBalance,
+            [
+                {"account_id": account_id, "period": period, "debit": debit, "credit": credit}
+                for (account_id, period), (debit, credit) in totals.items()
+            ],
+        )
+    db.commit()
+
+
+def totals_before(
+    db: Session, cutoff: date, account_ids: Optional[Iterable[int]] = None
+) -> dict[int, tuple[Decimal, Decimal]]:
+    """account_id -> (debit, credit) of POSTED lines dated before ``cutoff``."""
+
+    ids = list(account_ids) if account_ids is not None else None
+    period = period_of(cutoff)
+    out: dict[int, list[Decimal]] = {}
+
+    P = FinanceAccountPeriodBalance
+    q = db.query(P.account_id, func.sum(P.debit), func.sum(P.credit)).filter(P.period < period)
+    if ids is not None:
+        q = q.filter(P.account_id.in_(ids))
+    for account_id, debit, credit in q.group_by(P.account_id):
+        out[int(account_id)] = [_dec(debit), _dec(credit)]
+
+    if cutoff > period:
+        L, E = FinanceJournalLine, FinanceJournalEntry
+        q = (
+            db.query(L.account_id, func.sum(L.debit), func.sum(L.credit))
+            .join(E, E.id == L.entry_id)
+            .filter(E.status == "POSTED", E.entry_date >= period, E.entry_date < cutoff)
+        )
+        if ids is not None:
+            q = q.filter(L.account_id.in_(ids))
+        for account_id, debit, credit in q.group_by(L.account_id):
+            t = out.setdefault(int(account_id), [ZERO, ZERO])
+            t[0] += _dec(debit)
+            t[1] += _dec(credit)
+
+    return {k: (v[0], v[1]) for k, v in out.items()}
+
+
+def _children(accounts: list[FinanceAccount]) -> dict[Optional[int], list[FinanceAccount]]:
+    children: dict[Optional[int], list[FinanceAccount]] = {}
+    ids = {a.id for a in accounts}
+    for a in accounts:
+        parent = a.parent_id if a.parent_id in ids else None
+        children.setdefault(parent, []).append(a)
+    for kids in children.values():
+        kids.sort(key=lambda a: a.code or "")
+    return children
+
+
+def descendant_ids(db: Session, account_id: int) -> list[int]:
+    """``account_id`` and every account below it in the ``parent_id`` hierarchy."""
+
+    children = _children(db.query(FinanceAccount).all())
+    out: list[int] = []
+    stack = [account_id]
+    while stack:
+        current = stack.pop()
+        if current in out:
+            continue  # a parent_id cycle
+        out.append(current)
+        stack.extend(a.id for a in children.get(current, []))
+    return out
+
+
+def trial_balance(db: Session, as_of: date) -> dict:
+    accounts = db.query(FinanceAccount).all()
+    totals = totals_before(db, as_of + timedelta(days=1))
+    children = _children(accounts)
+
+    rows: list[dict] = []
+    visited: set[int] = set()
+
+    def _walk(account: FinanceAccount, depth: int) -> tuple[Decimal, Decimal]:
+        visited.add(account.id)
+        debit, credit = totals.get(account.id, (ZERO, ZERO))
+        row = {
+            "account_id": account.id,
+            "code": account.code,
+            "name": account.name,
+            "account_type": account.account_type,
+            "parent_id": account.parent_id,
+            "depth": depth,
+            "debit": debit,
+            "credit": credit,
+        }
+        balance = debit - credit
+        row["balance"] = balance
+        row["debit_balance"] = balance if balance > 0 else ZERO
+        row["credit_balance"] = -balance if balance < 0 else ZERO
+        rows.append(row)
+
+        sub_debit, sub_credit = debit, credit
+        for child in children.get(account.id, []):
+            if child.id in visited:
+                continue
+            d, c = _walk(child, depth + 1)
+            sub_debit += d
+            sub_credit += c
+        row["rollup_debit"] = sub_debit
+        row["rollup_credit"] = sub_credit
+        row["rollup_balance"] = sub_debit - sub_credit
+        return sub_debit, sub_credit
+
+    for root in children.get(None, []):
+        _walk(root, 0)
+    # Accounts only reachable through a parent_id cycle.
+    for account in sorted(accounts, key=lambda a: a.code or ""):
+        if account.id not in visited:
+            _walk(account, 0)
+
+    total_debit = sum((r["debit_balance"] for r in rows), ZERO)
+    total_credit = sum((r["credit_balance"] for r in rows), ZERO)
+    return {
+        "as_of": as_of,
+        "accounts": rows,
+        "total_debit": total_debit,
+        "total_credit": total_credit,
+        "balanced": total_debit == total_credit,
+    }
+
+
+def account_ledger(
+    db: Session,
+    account: FinanceAccount,
+    date_from: date,
+    date_to: date,
+    *,
+    include_children: bool = False,
+) -> dict:
+    ids = descendant_ids(db, account.id) if include_children else [account.id]
+    opening_debit = opening_credit = ZERO
+    for debit, credit in totals_before(db, date_from, ids).values():
+        opening_debit += debit
+        opening_credit += credit
+    opening = opening_debit - opening_credit
+
+    L, E = FinanceJournalLine, FinanceJournalEntry
+    rows = (
+        db.query(L, E.entry_no, E.entry_date, E.memo, E.source_type, E.source_id)
+        .join(E, E.id == L.entry_id)
+        .filter(E.status == "POSTED", L.account_id.in_(ids), E.entry_date >= date_from, E.entry_date <= date_to)
+        .order_by(E.entry_date.asc(), E.id.asc(), L.id.asc())
+        .all()
+    )
+
+    balance = opening
+    period_debit = period_credit = ZERO
+    lines = []
+    for ln, entry_no, entry_date, memo, source_type, source_id in rows:
+        debit, credit = _dec(ln.debit), _dec(ln.credit)
+        balance += debit - credit
+        period_debit += debit
+        period_credit += credit
+        lines.append(
+            {
+                "entry_id": ln.entry_id,
+                "entry_no": entry_no,
+                "entry_date": entry_date,
+                "memo": memo,
+                "source_type": source_type,
+                "source_id": source_id,
+                "line_id": ln.id,
+                "account_id": ln.account_id,
+                "description": ln.description,
+                "debit": debit,
+                "credit": credit,
+                "balance": balance,
+            }
+        )
+
+    return {
+        "account_id": account.id,
+        "code": account.code,
+        "name": account.name,
+        "account_type": account.account_type,
+        "include_children": include_children,
+        "date_from": date_from,
+        "date_to": date_to,
+        "opening_balance": opening,
+        "total_debit": period_debit,
+        "total_credit": period_credit,
+        "closing_balance": balance,
+        "lines": lines,
+    }
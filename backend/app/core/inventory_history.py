@@ -0,0 +1,104 @@
+"""Keyset-paginated inventory transaction history and CSV export.
+
+General and restricted transactions are listed newest first by ``id``.
+A page is ``WHERE id < :cursor ORDER BY id DESC LIMIT :n``, so paging stays
+an index range scan however far back it goes; the composite
+``(item_code, id)``, ``(employee_id, id)`` and ``(action, id)`` indexes
+serve the filtered variants. The next cursor is the last id of a full page.
+
+The CSV export walks the same keyset in chunks on its own session, so
+arbitrarily long histories stream without being held in memory.
+"""
+
+import csv
+import io
+from datetime import date, datetime, timedelta
+from typing import Any, Iterator, List, Optional, Sequence
+
+from sqlalchemy.orm import Query, Session
+
+from app.core.database import SessionLocal
+
+
+EXPORT_CHUNK = 2000
+
+
+def history_query(
+    db: Session,
+    model: Any,
+    *,
+    item_code: Optional[str] = None,
+    employee_id: Optional[str] = None,
+    action: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> Query:
+    q = db.query(model)
+    if item_code:
+        q = q.filter(model.item_code == item_code)
+    if employee_id:
+        q = q.filter(model.employee_id == employee_id)
+    if action:
+        q = q.filter(model.action == action.strip().upper())
+    if date_from:
+        q = q.filter(model.created_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        q = q.filter(model.created_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return q
+
+
+def page(q: Query, model: Any, cursor: Optional[int], limit: int) -> tuple[list, Optional[int]]:
+    """One page of ``q`` before ``cursor`` and the cursor for the next page (``None`` at the end)."""
+
+    if cursor is not None:
+        q = q.filter(model.id < cursor)
+    rows = q.order_by(model.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1].id
+    return rows, None
+
+
+def stream_csv(
+    model: Any,
+    header: Sequence[str],
+    row: Any,
+    filters: dict,
+    *,
+    extra: Optional[Any] = None,
+) -> Iterator[str]:
+    """CSV lines for every transaction matching ``filters``, newest first.
+
+    ``extra(db, rows)`` may return a lookup passed to ``row(tx, lookup)``
+    (e.g. item names or serial numbers for the chunk).
+    """
+
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def _flush() -> str:
+        out = buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+        return out
+
+    writer.writerow(header)
+    yield _flush()
+
+    db = SessionLocal()
+    try:
+        q = history_query(db, model, **filters)
+        cursor: Optional[int] = None
+        while True:
+            rows: List[Any]
+            rows, cursor = page(q, model, cursor, EXPORT_CHUNK)
+            lookup = extra(db, rows) if extra is not None and rows else None
+            for tx in rows:
+                writer.writerow(row(tx, lookup))
+            if rows:
+                yield _flush()
+            db.expunge_all()
+            if cursor is None:
+                break
+    finally:
+        db.close()
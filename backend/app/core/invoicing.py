@@ -0,0 +1,280 @@
+"""Monthly contract invoicing run.
+
+For a billing month every active contract overlapping the month is billed
+for its guards' allocated days:
+
+* billable guard-days come from ``ClientSiteGuardAllocation`` date ranges
+  clipped to the month and the contract period (optionally only days the
+  guard was marked present/late in attendance);
+* each day is priced with the client's ``ClientRateCard`` effective on that
+  day for the guard's type (rank/designation), falling back to any card
+  effective that day; the rate is a monthly per-guard rate, pro-rated by
+  days in the month;
+* contracts without an applicable rate card are billed ``monthly_cost``
+  pro-rated by the contract's active days in the month;
+* a rate-card contract with guard-days no card covers (e.g. a card that
+  starts or ends mid-month) reports them as ``unpriced_days`` and gets
+  status ``unpriced`` instead of an invoice, until the cards are fixed.
+
+All inputs are loaded with one query per table and every invoice is
+inserted in a single transaction. Invoice numbers are
+``INV-<contract_number>-<YYYYMM>``, so re-running a month skips contracts
+that already have their invoice. Invoices are dated the last day of the
+billing month unless an ``invoice_date`` is given, so trends and aging
+that bucket by ``invoice_date`` see them in the month they bill.
+"""
+
+from calendar import monthrange
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.core.cache import mark_tables_changed
+from app.models.attendance import AttendanceRecord
+from app.models.client_contract import ClientContract
+from app.models.client_invoice import ClientInvoice
+from app.models.client_rate_card import ClientRateCard
+from app.models.client_site_guard_allocation import ClientSiteGuardAllocation
+from app.models.employee2 import Employee2
+
+
+WORKED_ATTENDANCE = ("present", "late")
+
+
+@dataclass
+class GuardLine:
+    employee_db_id: int
+    name: str
+    guard_type: Optional[str]
+    days: int = 0
+    amount: float = 0.0
+    unpriced_days: int = 0
+    rate_card_ids: set = field(default_factory=set)
+
+    def to_dict(self) -> dict:
+        return {
+            "employee_db_id": self.employee_db_id,
+            "name": self.name,
+            "guard_type": self.guard_type,
+            "days": self.days,
+            "amount": round(self.amount, 2),
+            "unpriced_days": self.unpriced_days,
+            "rate_card_ids": sorted(self.rate_card_ids),
+        }
+
+
+@dataclass
+class ContractBill:
+    contract_id: int
+    contract_number: str
+    client_id: int
+    invoice_number: str
+    status: str = "pending"  # created / exists / dry_run / nothing_to_bill / unpriced
+    guard_days: int = 0
+    unpriced_days: int = 0
+    amount: float = 0.0
+    priced_by: str = "rate_card"  # rate_card / monthly_cost
+    lines: List[GuardLine] = field(default_factory=list)
+
+    def to_dict(self, include_lines: bool = True) -> dict:
+        out = {
+            "contract_id": self.contract_id,
+            "contract_number": self.contract_number,
+            "client_id": self.client_id,
+            "invoice_number": self.invoice_number,
+            "status": self.status,
+            "guard_days": self.guard_days,
+            "unpriced_days": self.unpriced_days,
+            "amount": round(self.amount, 2),
+            "priced_by": self.priced_by,
+        }
+        if include_lines:
+            out["lines"] = [ln.to_dict() for ln in self.lines]
+        return out
+
+
+def month_bounds(month_start: date) -> tuple[date, date]:
+    return month_start, date(month_start.year, month_start.month, monthrange(month_start.year, month_start.month)[1])
+
+
+def clip_span(start: Optional[date], end: Optional[date], lo: date, hi: date) -> Optional[tuple[date, date]]:
+    s = max(start or lo, lo)
+    e = min(end or hi, hi)
+    return (s, e) if s <= e else None
+
+
+def _days(span: tuple[date, date]) -> Iterable[date]:
+    d = span[0]
+    while d <= span[1]:
+        yield d
+        d += timedelta(days=1)
+
+
+def allocation_end(a: ClientSiteGuardAllocation) -> Optional[date]:
+    # Released allocations without an end date stopped when they were released.
+    if a.end_date is None and a.status == "Released" and a.updated_at is not None:
+        return a.updated_at.date()
+    return a.end_date
+
+
+def _pick_card(cards: list, guard_type: Optional[str], day: date) -> Optional[ClientRateCard]:
+    def effective(c: ClientRateCard) -> bool:
+        return (c.effective_from is None or c.effective_from <= day) and (c.effective_to is None or c.effective_to >= day)
+
+    live = [c for c in cards if effective(c)]
+    if not live:
+        return None
+    gt = (guard_type or "").strip().lower()
+    typed = [c for c in live if (c.guard_type or "").strip().lower() == gt] if gt else []
+    pool = typed or live
+    return max(pool, key=lambda c: (c.effective_from or date.min, c.id))
+
+
+def run_monthly_invoicing(
+    db: Session,
+    month_start: date,
+    *,
+    dry_run: bool = True,
+    use_attendance: bool = False,
+    contract_ids: Optional[List[int]] = None,
+    invoice_date: Optional[date] = None,
+) -> dict:
+    start, end = month_bounds(month_start)
+    days_in_month = (end - start).days + 1
+    ym = f"{start.year:04d}{start.month:02d}"
+
+    q = (
+        db.query(ClientContract)
+        .filter(ClientContract.status == "Active")
+        .filter(or_(ClientContract.start_date.is_(None), ClientContract.start_date <= end))
+        .filter(or_(ClientContract.end_date.is_(None), ClientContract.end_date >= start))
+    )
+    if contract_ids:
+        q = q.filter(ClientContract.id.in_(contract_ids))
+    contracts = q.order_by(ClientContract.id.asc()).all()
+    if not contracts:
+        return {"month": start.isoformat()[:7], "dry_run": dry_run, "contracts": 0, "created": 0, "unpriced": 0, "total_amount": 0.0, "invoices": []}
+
+    ids = [c.id for c in contracts]
+    allocations = (
+        db.query(ClientSiteGuardAllocation)
+        .filter(ClientSiteGuardAllocation.contract_id.in_(ids))
+        .filter(or_(ClientSiteGuardAllocation.start_date.is_(None), ClientSiteGuardAllocation.start_date <= end))
+        .filter(or_(ClientSiteGuardAllocation.end_date.is_(None), ClientSiteGuardAllocation.end_date >= start))
+        .all()
+    )
+    allocs_by_contract: dict[int, list] = {}
+    for a in allocations:
+        allocs_by_contract.setdefault(int(a.contract_id), []).append(a)
+
+    emp_ids = {int(a.employee_db_id) for a in allocations}
+    guards = {e.id: e for e in db.query(Employee2).filter(Employee2.id.in_(emp_ids)).all()} if emp_ids else {}
+
+    cards_by_client: dict[int, list] = {}
+    for card in db.query(ClientRateCard).filter(ClientRateCard.client_id.in_({c.client_id for c in contracts})).all():
+        cards_by_client.setdefault(int(card.client_id), []).append(card)
+
+    worked: Optional[dict[str, set]] = None
+    if use_attendance and guards:
+        keys = {k for e in guards.values() for k in (e.fss_no, e.serial_no, str(e.id)) if k}
+        worked = {}
+        for emp_key, day in (
+            db.query(AttendanceRecord.employee_id, AttendanceRecord.date)
+            .filter(AttendanceRecord.date >= start, AttendanceRecord.date <= end)
+            .filter(AttendanceRecord.employee_id.in_(keys))
+            .filter(func.lower(AttendanceRecord.status).in_(WORKED_ATTENDANCE))
+        ):
+            worked.setdefault(str(emp_key), set()).add(day)
+
+    numbers = {c.id: f"INV-{c.contract_number}-{ym}" for c in contracts}
+    existing = {
+        r[0] for r in db.query(ClientInvoice.invoice_number).filter(ClientInvoice.invoice_number.in_(numbers.values()))
+    }
+
+    bills: List[ContractBill] = []
+    for c in contracts:
+        bill = ContractBill(contract_id=c.id, contract_number=c.contract_number, client_id=c.client_id, invoice_number=numbers[c.id])
+        bills.append(bill)
+        contract_span = clip_span(c.start_date, c.end_date, start, end)
+        cards = cards_by_client.get(int(c.client_id), [])
+
+        lines: dict[int, GuardLine] = {}
+        for a in allocs_by_contract.get(c.id, []):
+            emp = guards.get(int(a.employee_db_id))
+            if emp is None or contract_span is None:
+                continue
+            span = clip_span(a.start_date, allocation_end(a), *contract_span)
+            if span is None:
+                continue
+            guard_type = emp.designation or emp.rank
+            line = lines.setdefault(emp.id, GuardLine(employee_db_id=emp.id, name=emp.name, guard_type=guard_type))
+            attended = None
+            if worked is not None:
+                attended = set().union(*(worked.get(k, set()) for k in (emp.fss_no, emp.serial_no, str(emp.id)) if k))
+            for day in _days(span):
+                if attended is not None and day not in attended:
+                    continue
+                line.days += 1
+                card = _pick_card(cards, guard_type, day)
+                if card is None:
+                    line.unpriced_days += 1
+                    continue
+                line.amount += float(card.rate_per_shift_day_month or 0.0) / days_in_month
+                line.rate_card_ids.add(card.id)
+
+        bill.lines = [ln for ln in lines.values() if ln.days]
+        bill.guard_days = sum(ln.days for ln in bill.lines)
+        bill.amount = sum(ln.amount for ln in bill.lines)
+        if not any(ln.rate_card_ids for ln in bill.lines):
+            bill.priced_by = "monthly_cost"
+            active_days = ((contract_span[1] - contract_span[0]).days + 1) if contract_span else 0
+            bill.amount = float(c.monthly_cost or 0.0) * active_days / days_in_month
+        else:
+            bill.unpriced_days = sum(ln.unpriced_days for ln in bill.lines)
+
+        if bill.invoice_number in existing:
+            bill.status = "exists"
+        elif bill.unpriced_days:
+            bill.status = "unpriced"
+        elif bill.amount <= 0:
+            bill.status = "nothing_to_bill"
+        else:
+            bill.status = "dry_run" if dry_run else "created"
+
+    to_create = [b for b in bills if b.status == "created"]
+    if to_create:
+        period = f"{start.isoformat()} to {end.isoformat()}"
+        inv_date = invoice_date or end
+        db.bulk_insert_mappings(
+            ClientInvoice,
+            [
+                {
+                    "client_id": b.client_id,
+                    "invoice_number": b.invoice_number,
+                    "invoice_date": inv_date,
+                    "billing_period": period,
+                    "total_amount": round(b.amount, 2),
+                    "tax_amount": None,
+                    "net_payable": round(b.amount, 2),
+                    "payment_status": "Pending",
+                }
+                for b in to_create
+            ],
+        )
+        mark_tables_changed(db, ClientInvoice.__tablename__)
+        db.commit()
+
+    billable = [b for b in bills if b.status in ("created", "dry_run")]
+    return {
+        "month": start.isoformat()[:7],
+        "dry_run": dry_run,
+        "use_attendance": use_attendance,
+        "contracts": len(bills),
+        "created": len(to_create),
+        "unpriced": sum(1 for b in bills if b.status == "unpriced"),
+        "total_amount": round(sum(b.amount for b in billable), 2),
+        "invoices": [b.to_dict() for b in bills],
+    }
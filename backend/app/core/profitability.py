@@ -0,0 +1,227 @@
+"""Contract profitability: invoiced revenue vs attributed guard payroll cost.
+
+Each guard's monthly payroll cost (``gross_pay`` from the payroll engine's
+per-employee rows, passed in by the caller) is spread over the contracts
+the guard was allocated to, in proportion to allocated days in the month.
+Cost for days a guard was not allocated anywhere is reported as bench cost.
+
+Revenue is ``net_payable`` of the month's invoices: invoices created by the
+monthly invoicing run (``INV-<contract_number>-<YYYYMM>``) are attributed to
+their contract, any other invoice dated in the month counts for its client
+only. A run invoice for another month is skipped even when dated in this
+one; other numbers of the same shape (e.g. requirement-completion invoices,
+``INV-<client>-<site>-<req>-<seq>``) are not run invoices. Contracts,
+allocations, invoices and clients are each loaded with one query, plus one
+for the contract numbers of other-month candidates.
+"""
+
+import re
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.core.invoicing import allocation_end, clip_span, month_bounds
+from app.models.client import Client
+from app.models.client_contract import ClientContract
+from app.models.client_invoice import ClientInvoice
+from app.models.client_site_guard_allocation import ClientSiteGuardAllocation
+
+
+TABLES = (
+    "attendance_records",
+    "client_contracts",
+    "client_invoices",
+    "client_site_guard_allocations",
+    "clients",
+    "employees2",
+)
+
+ALLOCATION_STATUSES = ("Active", "Released")
+
+_RUN_INVOICE = re.compile(r"^INV-(.+)-(\d{6})$")
+
+
+def _run_invoice(number: Optional[str]) -> Optional[tuple[str, str]]:
+    """``(contract_number, YYYYMM)`` if ``number`` has the shape of a run invoice."""
+
+    m = _RUN_INVOICE.match(number or "")
+    if not m or not 1 <= int(m.group(2)[4:]) <= 12:
+        return None
+    return m.group(1), m.group(2)
+
+
+def _money(v: float) -> float:
+    return round(float(v or 0.0), 2)
+
+
+def _figures(revenue: float, cost: float) -> dict:
+    margin = revenue - cost
+    return {
+        "revenue": _money(revenue),
+        "payroll_cost": _money(cost),
+        "margin": _money(margin),
+        "margin_pct": round(margin / revenue * 100.0, 2) if revenue else None,
+    }
+
+
+def compute_profitability(db: Session, month_start: date, payroll_cost: dict[int, float]) -> dict:
+    """``payroll_cost`` maps ``employees2.id`` to the guard's cost for the month."""
+
+    start, end = month_bounds(month_start)
+    days_in_month = (end - start).days + 1
+    ym = f"{start.year:04d}{start.month:02d}"
+
+    contracts = (
+        db.query(ClientContract)
+        .filter(or_(ClientContract.start_date.is_(None), ClientContract.start_date <= end))
+        .filter(or_(ClientContract.end_date.is_(None), ClientContract.end_date >= start))
+        .all()
+    )
+    by_number = {c.contract_number: c for c in contracts}
+
+    A = ClientSiteGuardAllocation
+    allocations = (
+        db.query(A)
+        .filter(A.contract_id.isnot(None), A.status.in_(ALLOCATION_STATUSES))
+        .filter(or_(A.start_date.is_(None), A.start_date <= end))
+        .filter(or_(A.end_date.is_(None), A.end_date >= start))
+        .all()
+    )
+
+    # guard -> contract -> allocated days in the month
+    days_by_guard: dict[int, dict[int, int]] = {}
+    for a in allocations:
+        span = clip_span(a.start_date, allocation_end(a), start, end)
+        if span is None:
+            continue
+        per_contract = days_by_guard.setdefault(int(a.employee_db_id), {})
+        per_contract[int(a.contract_id)] = per_contract.get(int(a.contract_id), 0) + (span[1] - span[0]).days + 1
+
+    cost_by_contract: dict[int, float] = {}
+    guards_by_contract: dict[int, set] = {}
+    guard_days_by_contract: dict[int, int] = {}
+    allocated_cost = 0.0
+    for emp_id, per_contract in days_by_guard.items():
+        monthly = float(payroll_cost.get(emp_id, 0.0) or 0.0)
+        # Overlapping allocations split the month rather than bill it twice.
+        basis = max(sum(per_contract.values()), days_in_month)
+        for contract_id, days in per_contract.items():
+            share = monthly * days / basis
+            cost_by_contract[contract_id] = cost_by_contract.get(contract_id, 0.0) + share
+            guards_by_contract.setdefault(contract_id, set()).add(emp_id)
+            guard_days_by_contract[contract_id] = guard_days_by_contract.get(contract_id, 0) + days
+            allocated_cost += share
+    bench_cost = sum(float(v or 0.0) for v in payroll_cost.values()) - allocated_cost
+
+    run_numbers = [f"INV-{c.contract_number}-{ym}" for c in contracts]
+    invoices = (
+        db.query(ClientInvoice.client_id, ClientInvoice.invoice_number, ClientInvoice.net_payable)
+        .filter(
+            or_(
+                ClientInvoice.invoice_number.in_(run_numbers),
+                and_(ClientInvoice.invoice_date >= start, ClientInvoice.invoice_date <= end),
+                and_(
+                    ClientInvoice.invoice_date.is_(None),
+                    ClientInvoice.created_at >= datetime(start.year, start.month, start.day),
+                    ClientInvoice.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+                ),
+            )
+        )
+        .all()
+    )
+    other_months: dict[str, str] = {}
+    for _, number, _ in invoices:
+        run = _run_invoice(number)
+        if run is not None and run[1] != ym:
+            other_months[number] = run[0]
+    known_numbers = (
+        {r[0] for r in db.query(ClientContract.contract_number).filter(ClientContract.contract_number.in_(set(other_months.values())))}
+        if other_months
+        else set()
+    )
+
+    revenue_by_contract: dict[int, float] = {}
+    unattributed_by_client: dict[int, float] = {}
+    for client_id, number, net in invoices:
+        if other_months.get(number) in known_numbers:
+            continue  # another month's run, issued this month
+        run = _run_invoice(number)
+        contract = by_number.get(run[0]) if run is not None and run[1] == ym else None
+        if contract is not None and contract.client_id == client_id:
+            revenue_by_contract[contract.id] = revenue_by_contract.get(contract.id, 0.0) + float(net or 0.0)
+        else:
+            unattributed_by_client[int(client_id)] = unattributed_by_client.get(int(client_id), 0.0) + float(net or 0.0)
+
+    client_ids = {int(c.client_id) for c in contracts} | set(unattributed_by_client)
+    clients = {c.id: c for c in db.query(Client).filter(Client.id.in_(client_ids)).all()} if client_ids else {}
+
+    contract_rows = []
+    for c in sorted(contracts, key=lambda c: c.contract_number or ""):
+        revenue = revenue_by_contract.get(c.id, 0.0)
+        cost = cost_by_contract.get(c.id, 0.0)
+        if not revenue and not cost:
+            continue
+        client = clients.get(int(c.client_id))
+        contract_rows.append(
+            {
+                "contract_id": c.id,
+                "contract_number": c.contract_number,
+                "client_id": c.client_id,
+                "client_name": client.client_name if client else None,
+                "industry": (client.industry_type if client else None) or "Unspecified",
+                "status": c.status,
+                "guards": len(guards_by_contract.get(c.id, ())),
+                "guard_days": guard_days_by_contract.get(c.id, 0),
+                **_figures(revenue, cost),
+            }
+        )
+
+    client_totals: dict[int, dict] = {}
+    for row in contract_rows:
+        t = client_totals.setdefault(int(row["client_id"]), {"revenue": 0.0, "cost": 0.0, "contracts": 0})
+        t["revenue"] += revenue_by_contract.get(row["contract_id"], 0.0)
+        t["cost"] += cost_by_contract.get(row["contract_id"], 0.0)
+        t["contracts"] += 1
+    for client_id, amount in unattributed_by_client.items():
+        client_totals.setdefault(client_id, {"revenue": 0.0, "cost": 0.0, "contracts": 0})["revenue"] += amount
+
+    client_rows = []
+    industry_totals: dict[str, dict] = {}
+    for client_id, t in client_totals.items():
+        client = clients.get(client_id)
+        industry = (client.industry_type if client else None) or "Unspecified"
+        client_rows.append(
+            {
+                "client_id": client_id,
+                "client_name": client.client_name if client else None,
+                "industry": industry,
+                "contracts": t["contracts"],
+                "unattributed_revenue": _money(unattributed_by_client.get(client_id, 0.0)),
+                **_figures(t["revenue"], t["cost"]),
+            }
+        )
+        it = industry_totals.setdefault(industry, {"revenue": 0.0, "cost": 0.0, "clients": 0})
+        it["revenue"] += t["revenue"]
+        it["cost"] += t["cost"]
+        it["clients"] += 1
+    client_rows.sort(key=lambda r: r["margin"])
+
+    industry_rows = sorted(
+        ({"industry": k, "clients": v["clients"], **_figures(v["revenue"], v["cost"])} for k, v in industry_totals.items()),
+        key=lambda r: r["margin"],
+    )
+
+    total_revenue = sum(t["revenue"] for t in client_totals.values())
+    totals = _figures(total_revenue, allocated_cost)
+    totals["bench_cost"] = _money(bench_cost)
+    totals["margin_after_bench"] = _money(total_revenue - allocated_cost - bench_cost)
+
+    return {
+        "month": start.isoformat()[:7],
+        "totals": totals,
+        "industries": industry_rows,
+        "clients": client_rows,
+        "contracts": contract_rows,
+    }
@@ -0,0 +1,106 @@
+"""Atomic named sequences backed by the ``sequence_counters`` table.
+
+``reserve`` increments a counter with a single
+``UPDATE ... SET value = value + n ... RETURNING value`` statement (falling
+back to ``SELECT ... FOR UPDATE`` where RETURNING is unavailable). The
+counter row stays locked until the caller's transaction commits, so
+concurrent requests and parallel import workers never hand out the same
+number and a rolled-back transaction does not leave a gap.
+
+The first call for a name seeds the counter (e.g. from existing document
+numbers) so numbering continues where the legacy "scan the last row"
+generators left off.
+"""
+
+from typing import Callable, Optional, Union
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.sequence_counter import SequenceCounter
+
+
+Seed = Union[int, Callable[[], int], None]
+
+
+def _supports_returning(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    return bool(getattr(dialect, "update_returning", False))
+
+
+def _increment(db: Session, name: str, count: int) -> Optional[int]:
+    if _supports_returning(db):
+        stmt = (
+            update(SequenceCounter)
+            .where(SequenceCounter.name == name)
+            .values(value=SequenceCounter.value + count)
+            .returning(SequenceCounter.value)
+            .execution_options(synchronize_session=False)
+        )
+        row = db.execute(stmt).first()
+        return int(row[0]) if row is not None else None
+
+    counter = (
+        db.query(SequenceCounter)
+        .filter(SequenceCounter.name == name)
+        .with_for_update()
+        .first()
+    )
+    if counter is None:
+        return None
+    counter.value = int(counter.value or 0) + count
+    db.flush()
+    return int(counter.value)
+
+
+def _create(db: Session, name: str, seed: Seed) -> None:
+    start = seed() if callable(seed) else seed
+    try:
+        with db.begin_nested():
+            db.add(SequenceCounter(name=name, value=int(start or 0)))
+    except IntegrityError:
+        # Another transaction created the counter first; just use it.
+        pass
+
+
+def reserve(db: Session, name: str, count: int = 1, *, seed: Seed = None) -> range:
+    """Reserve ``count`` consecutive values of sequence ``name``.
+
+    Returns the reserved block as a ``range``. ``seed`` (a value or a
+    callable) is only consulted when the counter does not exist yet and
+    should return the last value already in use.
+    """
+
+    if count < 1:
+        raise ValueError("count must be >= 1")
+
+    last = _increment(db, name, count)
+    if last is None:
+        _create(db, name, seed)
+        last = _increment(db, name, count)
+    if last is None:
+        raise RuntimeError(f"Could not allocate from sequence {name}")
+    return range(last - count + 1, last + 1)
+
+
+def next_value(db: Session, name: str, *, seed: Seed = None) -> int:
+    """Allocate one value from sequence ``name``."""
+
+    return reserve(db, name, 1, seed=seed)[0]
+
+
+def max_numeric_suffix(db: Session, column, prefix: str) -> int:
+    """Largest integer tail of ``column`` values starting with ``prefix`` (0 if none).
+
+    Used once per counter as the seed, so a full scan is acceptable.
+    """
+
+    best = 0
+    for (value,) in db.query(column).filter(column.like(f"{prefix}%")).all():
+        tail = str(value or "")[len(prefix):]
+        try:
+            best = max(best, int(tail))
+        except ValueError:
+            continue
+    return best
@@ -0,0 +1,150 @@
+"""Atomic stock and employee-balance mutations for inventory items.
+
+Quantities are changed with a single conditional ``UPDATE`` instead of
+read-modify-write in Python, so concurrent requests (several workers, or
+several processes sharing one database) can neither oversell stock nor
+lose an update:
+
+* ``take_stock``: ``SET quantity_on_hand = quantity_on_hand - :n WHERE
+  quantity_on_hand >= :n``; no row updated means not enough stock;
+* ``add_balance``: increment, inserting the (employee, item) row on first
+  issue; the unique index on the pair turns a racing insert into a retry
+  of the increment;
+* ``take_balance``: conditional decrement, or clamped at zero for returns.
+
+The helpers work for both general and restricted inventory; callers pass
+the item and balance models. ``add_balances`` is the batch form of
+``add_balance`` used by kit issuance: one prefetch, one executemany
+increment and one bulk insert for any number of (employee, item) pairs.
+"""
+
+from typing import Any
+
+from sqlalchemy import bindparam, case, insert, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+
+def _execute(db: Session, stmt) -> int:
+    return db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+
+
+def take_stock(db: Session, item_model: Any, item_code: str, qty: float) -> bool:
+    """Remove ``qty`` from stock; ``False`` if the item has less than ``qty`` on hand."""
+
+    return (
+        _execute(
+            db,
+            update(item_model)
+            .where(item_model.item_code == item_code, item_model.quantity_on_hand >= qty)
+            .values(quantity_on_hand=item_model.quantity_on_hand - qty),
+        )
+        == 1
+    )
+
+
+def put_stock(db: Session, item_model: Any, item_code: str, qty: float) -> bool:
+    return (
+        _execute(
+            db,
+            update(item_model)
+            .where(item_model.item_code == item_code)
+            .values(quantity_on_hand=item_model.quantity_on_hand + qty),
+        )
+        == 1
+    )
+
+
+def set_stock(db: Session, item_model: Any, item_code: str, qty: float) -> bool:
+    return (
+        _execute(db, update(item_model).where(item_model.item_code == item_code).values(quantity_on_hand=qty))
+        == 1
+    )
+
+
+def _balance_row(balance_model: Any, employee_id: str, item_code: str) -> list:
+    return [balance_model.employee_id == employee_id, balance_model.item_code == item_code]
+
+
+def add_balance(db: Session, balance_model: Any, employee_id: str, item_code: str, qty: float) -> None:
+    increment = (
+        update(balance_model)
+        .where(*_balance_row(balance_model, employee_id, item_code))
+        .values(quantity_issued=balance_model.quantity_issued + qty)
+    )
+    if _execute(db, increment):
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(balance_model).values(employee_id=employee_id, item_code=item_code, quantity_issued=qty))
+    except IntegrityError:
+        # Another request created the row first.
+        _execute(db, increment)
+
+
+def take_balance(
+    db: Session,
+    balance_model: Any,
+    employee_id: str,
+    item_code: str,
+    qty: float,
+    *,
+    clamp: bool = False,
+) -> bool:
+    """Decrement an employee's issued quantity.
+
+    Without ``clamp`` nothing changes and ``False`` is returned when less than
+    ``qty`` is issued. With ``clamp`` the balance floors at zero and ``False``
+    only means there is no balance row.
+    """
+
+    where = _balance_row(balance_model, employee_id, item_code)
+    if clamp:
+        new_qty = case(
+            (balance_model.quantity_issued >= qty, balance_model.quantity_issued - qty),
+            else_=0.0,
+        )
+    else:
+        where.append(balance_model.quantity_issued >= qty)
+        new_qty = balance_model.quantity_issued - qty
+    return _execute(db, update(balance_model).where(*where).values(quantity_issued=new_qty)) == 1
+
+
+def add_balances(db: Session, balance_model: Any, amounts: dict[tuple[str, str], float]) -> None:
+    """Increment many (employee_id, item_code) balances at once."""
+
+    if not amounts:
+        return
+    existing = {
+        (emp, code): bal_id
+        for bal_id, emp, code in db.query(balance_model.id, balance_model.employee_id, balance_model.item_code).filter(
+            tuple_(balance_model.employee_id, balance_model.item_code).in_(list(amounts))
+        )
+    }
+    table = balance_model.__table__
+    if existing:
+        db.connection().execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(quantity_issued=table.c.quantity_issued + bindparam("b_qty")),
+            [{"b_id": bal_id, "b_qty": amounts[key]} for key, bal_id in existing.items()],
+        )
+    new = [key for key in amounts if key not in existing]
+    if new:
+        try:
+            with db.begin_nested():
+                db.bulk_insert_mappings(
+                    balance_model,
+                    [{"employee_id": emp, "item_code": code, "quantity_issued": amounts[(emp, code)]} for emp, code in new],
+                )
+        except IntegrityError:
+            # A concurrent issue created some of the rows; take the slow path.
+            for emp, code in new:
+                add_balance(db, balance_model, emp, code, amounts[(emp, code)])
+
+
+def describe_errors(errors: list[str], limit: int = 10) -> str:
+    """One 400 detail string for a batch that failed validation."""
+
+    shown = "; ".join(errors[:limit])
+    return shown if len(errors) <= limit else f"{shown}; and {len(errors) - limit} more"
@@ -0,0 +1,220 @@
+"""Point-in-time inventory stock: periodic snapshots plus transaction replay.
+
+A snapshot copies every item's ``quantity_on_hand`` and every employee
+balance of one inventory kind (general or restricted) with ``INSERT ...
+SELECT``, together with the highest transaction id it already reflects.
+Stock "as of" a moment is the nearest snapshot at or before it, with only
+the transactions after that snapshot (``id > last_transaction_id`` and
+``created_at <= as_of``) replayed on top.
+
+Replay effects per action (quantity transactions only; serial-unit moves
+are not part of the quantity ledger):
+
+* ISSUE: stock -q, employee +q
+* RETURN: stock +q, employee -q (floored at zero, as the handler does)
+* LOST / DAMAGED: employee -q
+* FOUND: stock +q
+* ADJUST: stock set to q
+* MAINTENANCE / CLEANING / AVAILABLE: no change
+
+Item creation and edits that set ``quantity_on_hand`` are logged as ADJUST
+so the replay sees them too.
+
+Snapshots are taken by ``POST /{kind}-inventory/snapshots`` (e.g. at month
+close), by a scheduled ``python -m app.core.stock_ledger`` and once at
+startup when a kind has none yet.
+"""
+
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import func, literal, null, select, text
+from sqlalchemy.orm import Session
+
+from app.models.general_item import GeneralItem
+from app.models.general_item_employee_balance import GeneralItemEmployeeBalance
+from app.models.general_item_transaction import GeneralItemTransaction
+from app.models.inventory_stock_snapshot import InventoryStockSnapshot
+from app.models.inventory_stock_snapshot_line import InventoryStockSnapshotLine
+from app.models.restricted_item import RestrictedItem
+from app.models.restricted_item_employee_balance import RestrictedItemEmployeeBalance
+from app.models.restricted_item_transaction import RestrictedItemTransaction
+
+
+@dataclass(frozen=True)
+class LedgerKind:
+    item: Any
+    balance: Any
+    transaction: Any
+
+
+KINDS = {
+    "general": LedgerKind(GeneralItem, GeneralItemEmployeeBalance, GeneralItemTransaction),
+    "restricted": LedgerKind(RestrictedItem, RestrictedItemEmployeeBalance, RestrictedItemTransaction),
+}
+
+# action -> (stock delta sign, employee balance delta sign)
+EFFECTS = {
+    "ISSUE": (-1, 1),
+    "RETURN": (1, -1),
+    "LOST": (0, -1),
+    "DAMAGED": (0, -1),
+    "FOUND": (1, 0),
+}
+
+
+def take_snapshot(db: Session, kind: str, label: Optional[str] = None) -> InventoryStockSnapshot:
+    """Copy current stock and balances of ``kind``; returns the snapshot loaded in ``db``.
+
+    The copy runs on a session of its own: the isolation level can only be
+    chosen before a transaction's first statement, and ``db`` (a request
+    session) has usually queried already.
+    """
+
+    k = KINDS[kind]
+    with Session(bind=db.get_bind()) as own:
+        if own.get_bind().dialect.name == "postgresql":
+            # Quantities and the transaction high-water mark must come from one view of the data.
+            own.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            # Ids are handed out at insert but commit in any order: wait for in-flight
+            # writers so no id below the high-water mark commits after the snapshot.
+            # LOCK is not a query, so the view is taken after it is granted.
+            own.execute(text(f"LOCK TABLE {k.transaction.__tablename__} IN SHARE MODE"))
+
+        # Database clock, like the transactions' created_at it is compared with.
+        snap = InventoryStockSnapshot(kind=kind, label=label, taken_at=func.now(), last_transaction_id=0)
+        own.add(snap)
+        own.flush()  # on SQLite this opens the write transaction, holding off other writers
+        snap.last_transaction_id = int(own.query(func.coalesce(func.max(k.transaction.id), 0)).scalar() or 0)
+
+        line = InventoryStockSnapshotLine.__table__
+        own.execute(
+            line.insert().from_select(
+                ["snapshot_id", "item_code", "employee_id", "quantity"],
+                select(
+                    literal(snap.id),
+                    k.item.item_code,
+                    null(),
+                    func.coalesce(k.item.quantity_on_hand, 0.0),
+                ),
+            )
+        )
+        own.execute(
+            line.insert().from_select(
+                ["snapshot_id", "item_code", "employee_id", "quantity"],
+                select(
+                    literal(snap.id),
+                    k.balance.item_code,
+                    k.balance.employee_id,
+                    func.coalesce(k.balance.quantity_issued, 0.0),
+                ).where(k.balance.quantity_issued != 0),
+            )
+        )
+        own.commit()
+        snap_id = snap.id
+    return db.get(InventoryStockSnapshot, snap_id)
+
+
+def nearest_snapshot(db: Session, kind: str, as_of: datetime) -> Optional[InventoryStockSnapshot]:
+    return (
+        db.query(InventoryStockSnapshot)
+        .filter(InventoryStockSnapshot.kind == kind, InventoryStockSnapshot.taken_at <= as_of)
+        .order_by(InventoryStockSnapshot.taken_at.desc(), InventoryStockSnapshot.id.desc())
+        .first()
+    )
+
+
+def stock_as_of(
+    db: Session,
+    kind: str,
+    as_of: datetime,
+    *,
+    item_code: Optional[str] = None,
+    employee_id: Optional[str] = None,
+) -> Optional[dict]:
+    """Stock on hand and employee balances at ``as_of``; ``None`` if no snapshot precedes it."""
+
+    k = KINDS[kind]
+    snap = nearest_snapshot(db, kind, as_of)
+    if snap is None:
+        return None
+
+    L = InventoryStockSnapshotLine
+    lines = db.query(L.item_code, L.employee_id, L.quantity).filter(L.snapshot_id == snap.id)
+    if item_code:
+        lines = lines.filter(L.item_code == item_code)
+    stock: dict[str, float] = {}
+    balances: dict[tuple[str, str], float] = {}
+    for code, emp, qty in lines:
+        if emp is None:
+            stock[code] = float(qty or 0.0)
+        elif not employee_id or emp == employee_id:
+            balances[(emp, code)] = float(qty or 0.0)
+
+    T = k.transaction
+    txs = (
+        db.query(T.item_code, T.employee_id, T.action, T.quantity)
+        .filter(T.id > snap.last_transaction_id, T.created_at <= as_of, T.quantity.isnot(None))
+        .order_by(T.id.asc())
+    )
+    if item_code:
+        txs = txs.filter(T.item_code == item_code)
+
+    replayed = 0
+    for code, emp, action, qty in txs:
+        replayed += 1
+        qty = float(qty or 0.0)
+        action = (action or "").upper()
+        if action == "ADJUST":
+            stock[code] = qty
+            continue
+        stock_sign, balance_sign = EFFECTS.get(action, (0, 0))
+        if stock_sign:
+            stock[code] = stock.get(code, 0.0) + stock_sign * qty
+        if balance_sign and emp and (not employee_id or emp == employee_id):
+            key = (emp, code)
+            balances[key] = max(balances.get(key, 0.0) + balance_sign * qty, 0.0)
+
+    return {
+        "kind": kind,
+        "as_of": as_of,
+        "snapshot_id": snap.id,
+        "snapshot_taken_at": snap.taken_at,
+        "replayed_transactions": replayed,
+        "items": [{"item_code": c, "quantity_on_hand": q} for c, q in sorted(stock.items()) if not employee_id],
+        "balances": [
+            {"employee_id": e, "item_code": c, "quantity_issued": q}
+            for (e, c), q in sorted(balances.items())
+            if q
+        ],
+    }
+
+
+def ensure_baseline_snapshots(db: Session) -> None:
+    """Take a first snapshot for every kind that has none, so as-of queries have a starting point."""
+
+    for kind in KINDS:
+        if not db.query(InventoryStockSnapshot.id).filter(InventoryStockSnapshot.kind == kind).first():
+            take_snapshot(db, kind, label="baseline")
+
+
+def main(argv: list[str]) -> int:
+    """``python -m app.core.stock_ledger [label]``: snapshot every inventory kind (for cron)."""
+
+    from app.core.database import SessionLocal
+
+    label = argv[0] if argv else None
+    db = SessionLocal()
+    try:
+        for kind in KINDS:
+            snap = take_snapshot(db, kind, label=label)
+            print(f"{kind}: snapshot {snap.id} at {snap.taken_at:%Y-%m-%d %H:%M:%S} (through transaction {snap.last_transaction_id})")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
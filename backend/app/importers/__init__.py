@@ -0,0 +1,19 @@
+"""Importers package initialization.
+
+Shared import pipeline for employees, employees2, clients and vehicles,
+replacing the one-off ``import_*.py`` scripts.
+"""
+
+from app.importers.runner import ImportResult, run_import
+from app.importers.sources import detect_format, read_rows, register_source
+from app.importers.writers import ENTITIES, get_entity
+
+__all__ = [
+    "ImportResult",
+    "run_import",
+    "detect_format",
+    "read_rows",
+    "register_source",
+    "ENTITIES",
+    "get_entity",
+]
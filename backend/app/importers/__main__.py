@@ -0,0 +1,68 @@
+"""Command line entry point.
+
+Usage (from backend/):
+    python -m app.importers employees2 staff.json
+    python -m app.importers clients clients.csv --mode upsert --job clients-2025
+    python -m app.importers employees sheet.tsv --map fss_number="FSS No." --workers 4
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from app.core.database import SessionLocal
+from app.importers import ENTITIES, detect_format, run_import
+
+
+def _parse_map(values: list[str]) -> dict[str, str]:
+    out: dict[str, str] = {}
+    for v in values or []:
+        if "=" not in v:
+            raise SystemExit(f"--map expects target=Header, got: {v}")
+        k, h = v.split("=", 1)
+        out[k.strip()] = h.strip()
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.importers", description="Bulk import records from CSV/TSV/JSON.")
+    parser.add_argument("entity", choices=sorted(ENTITIES))
+    parser.add_argument("file", help="Path to a .csv, .tsv/.txt or .json file")
+    parser.add_argument("--format", dest="fmt", default=None, help="csv | tsv | txt | json (default: detect)")
+    parser.add_argument("--mode", default="insert", choices=["preview", "insert", "upsert"])
+    parser.add_argument("--map", action="append", default=[], help="Column override, e.g. cnic=\"CNIC #\"")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--job", dest="job_id", default=None, help="Checkpoint id; re-run with the same id to resume")
+    args = parser.parse_args(argv)
+
+    path = Path(args.file)
+    raw = path.read_bytes()
+    try:
+        text = raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        text = raw.decode("latin-1", errors="ignore")
+
+    db = SessionLocal()
+    try:
+        result = run_import(
+            db,
+            entity=args.entity,
+            text=text,
+            fmt=args.fmt or detect_format(path.name, text),
+            mode=args.mode,
+            mapping=_parse_map(args.map),
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            job_id=args.job_id,
+        )
+    finally:
+        db.close()
+
+    print(json.dumps(result.to_dict(), indent=2))
+    return 1 if result.errors and not (result.created or result.updated) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Resumable import checkpoints.
+
+A checkpoint is a small JSON file under ``uploads/imports/checkpoints`` that
+records how many source rows of a job have been committed. Re-running a job
+with the same ``job_id`` skips those rows.
+"""
+
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+
+def _checkpoint_dir() -> Path:
+    root = Path(__file__).resolve().parents[3]
+    p = root / "uploads" / "imports" / "checkpoints"
+    p.mkdir(parents=True, exist_ok=True)
+    return p
+
+
+def _checkpoint_path(job_id: str) -> Path:
+    safe = re.sub(r"[^a-zA-Z0-9_.-]+", "-", job_id or "").strip("-")
+    if not safe:
+        raise ValueError("job_id is required")
+    return _checkpoint_dir() / f"{safe}.json"
+
+
+def load_checkpoint(job_id: str) -> Optional[dict[str, Any]]:
+    path = _checkpoint_path(job_id)
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+
+def save_checkpoint(job_id: str, state: dict[str, Any]) -> None:
+    path = _checkpoint_path(job_id)
+    data = {**state, "job_id": job_id, "updated_at": datetime.utcnow().isoformat()}
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def clear_checkpoint(job_id: str) -> None:
+    try:
+        _checkpoint_path(job_id).unlink()
+    except FileNotFoundError:
+        pass
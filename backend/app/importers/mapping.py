@@ -0,0 +1,71 @@
+"""Column mapping helpers.
+
+A mapping is ``{target_field: [source header aliases...]}``. Headers are
+normalised before matching so ``"FSS #"``, ``"fss no"`` and ``"FSS No."``
+all resolve to the same column.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+
+ColumnMapping = Dict[str, List[str]]
+
+
+def normalize_header(h: str) -> str:
+    s = (h or "").strip().lower()
+    s = s.replace("#", " no")
+    s = s.replace("/", " ")
+    s = s.replace("&", " and ")
+    s = re.sub(r"\s+", " ", s)
+    s = re.sub(r"[^a-z0-9 ]+", "", s)
+    return s.strip()
+
+
+def clean_value(v: Any) -> Optional[str]:
+    if v is None:
+        return None
+    s = str(v).strip()
+    if not s or s in {"-", "--"}:
+        return None
+    return s
+
+
+def merge_mapping(base: ColumnMapping, overrides: Optional[Dict[str, Any]]) -> ColumnMapping:
+    """Overlay user-provided ``{target: header | [headers]}`` on a default mapping."""
+
+    out: ColumnMapping = {k: list(v) for k, v in base.items()}
+    for target, src in (overrides or {}).items():
+        if not target:
+            continue
+        aliases = src if isinstance(src, list) else [src]
+        aliases = [str(a) for a in aliases if a is not None and str(a).strip()]
+        if aliases:
+            out[str(target)] = aliases + [a for a in out.get(str(target), []) if a not in aliases]
+    return out
+
+
+def apply_mapping(row: dict[str, Any], mapping: ColumnMapping) -> dict[str, Optional[str]]:
+    """Resolve one raw row into ``{target_field: value}`` using the first matching alias."""
+
+    raw: dict[str, Any] = {}
+    norm: dict[str, Any] = {}
+    for k, v in (row or {}).items():
+        key = str(k)
+        raw.setdefault(key, v)
+        nk = normalize_header(key)
+        if nk and nk not in norm:
+            norm[nk] = v
+
+    out: dict[str, Optional[str]] = {}
+    for target, aliases in mapping.items():
+        value = None
+        for alias in aliases:
+            if alias in raw:
+                value = clean_value(raw[alias])
+            else:
+                value = clean_value(norm.get(normalize_header(alias)))
+            if value is not None:
+                break
+        out[target] = value
+    return out
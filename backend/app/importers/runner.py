@@ -0,0 +1,134 @@
+"""Import pipeline: source -> mapping -> validation -> bulk upsert."""
+
+import hashlib
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.importers.checkpoint import clear_checkpoint, load_checkpoint, save_checkpoint
+from app.importers.mapping import merge_mapping
+from app.importers.sources import read_rows
+from app.importers.validation import validate_rows
+from app.importers.writers import get_entity
+
+
+MODES = {"preview", "insert", "upsert"}
+
+
+@dataclass
+class ImportResult:
+    entity: str
+    mode: str
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    resumed_from: int = 0
+    errors: List[str] = field(default_factory=list)
+    created_keys: List[str] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
+
+    def to_dict(self, max_errors: int = 50, max_keys: int = 200) -> dict[str, Any]:
+        out = asdict(self)
+        out["errors"] = self.errors[:max_errors]
+        out["error_count"] = len(self.errors)
+        out["created_keys"] = self.created_keys[:max_keys]
+        return out
+
+
+def _fingerprint(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8", errors="ignore")).hexdigest()
+
+
+def run_import(
+    db: Session,
+    *,
+    entity: str,
+    text: str,
+    fmt: str,
+    mode: str = "insert",
+    mapping: Optional[Dict[str, Any]] = None,
+    chunk_size: int = 500,
+    workers: int = 1,
+    job_id: Optional[str] = None,
+) -> ImportResult:
+    """Import ``text`` into ``entity``.
+
+    mode:
+      - preview: validate + match against existing rows, no DB writes
+      - insert: create missing rows, skip rows whose natural key exists
+      - upsert: create missing rows and update existing ones
+
+    Each chunk is committed on its own; when ``job_id`` is given the committed
+    row offset is checkpointed so a failed run can be resumed.
+    """
+
+    mode = (mode or "insert").strip().lower()
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(sorted(MODES))}")
+    chunk_size = max(1, int(chunk_size or 500))
+
+    started = time.perf_counter()
+    spec = get_entity(entity)
+    col_mapping = merge_mapping(spec.mapping, mapping)
+
+    rows = read_rows(text, fmt)
+    if spec.prepare_rows is not None:
+        rows = spec.prepare_rows(rows)
+    numbered = list(enumerate(rows, start=1))
+
+    result = ImportResult(entity=spec.name, mode=mode, rows=len(numbered))
+
+    fingerprint = _fingerprint(text)
+    start_at = 0
+    if job_id and mode != "preview":
+        state = load_checkpoint(job_id)
+        if state and state.get("fingerprint") == fingerprint and state.get("entity") == spec.name:
+            start_at = int(state.get("offset") or 0)
+            result.resumed_from = start_at
+
+    validated = validate_rows(spec.name, col_mapping, numbered[start_at:], workers=workers, chunk_size=chunk_size)
+    result.skipped += validated.skipped
+    result.errors.extend(validated.errors)
+
+    payloads = validated.payloads
+    for i in range(0, len(payloads), chunk_size):
+        chunk = payloads[i : i + chunk_size]
+        batch = [p for _, p in chunk]
+        try:
+            written = spec.write(db, batch, "insert" if mode == "preview" else mode)
+            if mode == "preview":
+                db.rollback()
+            else:
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            result.errors.append(f"Rows {chunk[0][0]}-{chunk[-1][0]}: {e}")
+            if job_id:
+                # Stop so the job can be resumed from the last committed chunk.
+                break
+            continue
+
+        result.created += written.created
+        result.updated += written.updated
+        result.skipped += written.skipped
+        if mode != "preview":
+            result.created_keys.extend(written.created_keys)
+
+        if job_id and mode != "preview":
+            next_idx = payloads[i + chunk_size][0] - 1 if i + chunk_size < len(payloads) else len(numbered)
+            save_checkpoint(
+                job_id,
+                {"entity": spec.name, "fingerprint": fingerprint, "offset": next_idx, "rows": len(numbered)},
+            )
+    else:
+        if job_id and mode != "preview":
+            clear_checkpoint(job_id)
+
+    result.elapsed_seconds = round(time.perf_counter() - started, 4)
+    processed = result.rows - result.resumed_from
+    result.rows_per_second = round(processed / result.elapsed_seconds, 1) if result.elapsed_seconds else 0.0
+    return result
@@ -0,0 +1,95 @@
+"""Row sources for the import pipeline.
+
+A source turns raw text (CSV, TSV or a JSON array) into an iterator of
+``dict`` rows keyed by the header / JSON key. Register extra formats with
+``register_source``.
+"""
+
+import csv
+import io
+import json
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+RowIterator = Iterator[dict[str, Any]]
+
+_SOURCES: Dict[str, Callable[[str], RowIterator]] = {}
+
+
+def register_source(fmt: str, reader: Callable[[str], RowIterator]) -> None:
+    _SOURCES[fmt.strip().lower()] = reader
+
+
+def _find_header_index(rows: list[list[str]]) -> int:
+    # Sheets exported from Google often carry a title row or two before the header.
+    for i, r in enumerate(rows[:25]):
+        joined = ",".join([str(x or "") for x in r]).lower()
+        if "name" in joined and ("cnic" in joined or "fss" in joined or "client" in joined):
+            return i
+    return 0
+
+
+def _iter_delimited(text: str, delimiter: str) -> RowIterator:
+    rows = list(csv.reader(io.StringIO(text), delimiter=delimiter))
+    if not rows:
+        return
+    header_idx = _find_header_index(rows)
+    headers = rows[header_idx]
+    for r in rows[header_idx + 1 :]:
+        if not any(str(x or "").strip() for x in r):
+            continue
+        d: dict[str, Any] = {}
+        for j, h in enumerate(headers):
+            if j >= len(r):
+                continue
+            key = str(h or "") or f"col_{j}"
+            # Keep the first occurrence; sheets repeat rank/status/unit columns.
+            if key in d:
+                continue
+            d[key] = r[j]
+        yield d
+
+
+def iter_csv(text: str) -> RowIterator:
+    return _iter_delimited(text, ",")
+
+
+def iter_tsv(text: str) -> RowIterator:
+    return _iter_delimited(text, "\t")
+
+
+def iter_json(text: str) -> RowIterator:
+    data = json.loads(text)
+    if isinstance(data, dict):
+        # Accept {"rows": [...]} / {"data": [...]} envelopes
+        data = data.get("rows") or data.get("data") or []
+    if not isinstance(data, list):
+        raise ValueError("JSON must be an array of records")
+    for item in data:
+        if isinstance(item, dict):
+            yield item
+
+
+register_source("csv", iter_csv)
+register_source("tsv", iter_tsv)
+register_source("txt", iter_tsv)
+register_source("json", iter_json)
+
+
+def detect_format(filename: Optional[str], text: str) -> str:
+    name = (filename or "").strip().lower()
+    for ext in ("csv", "tsv", "txt", "json"):
+        if name.endswith(f".{ext}"):
+            return ext
+    head = text.lstrip()[:1]
+    if head in {"[", "{"}:
+        return "json"
+    first_line = text.split("\n", 1)[0]
+    return "tsv" if first_line.count("\t") > first_line.count(",") else "csv"
+
+
+def read_rows(text: str, fmt: str) -> list[dict[str, Any]]:
+    reader = _SOURCES.get((fmt or "").strip().lower())
+    if reader is None:
+        raise ValueError(f"Unsupported format: {fmt}. Use one of {', '.join(sorted(_SOURCES))}")
+    return list(reader(text))
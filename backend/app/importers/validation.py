@@ -0,0 +1,69 @@
+"""Row validation in a worker pool.
+
+Mapping + cleaning is pure Python with no DB access, so it is fanned out in
+chunks to a ``ProcessPoolExecutor``. Small inputs (or ``workers <= 1``) run
+inline to avoid the process start-up cost.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from app.importers.mapping import ColumnMapping, apply_mapping
+
+
+INLINE_THRESHOLD = 2000
+
+
+@dataclass
+class ValidatedRows:
+    payloads: List[tuple[int, dict[str, Any]]] = field(default_factory=list)
+    skipped: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def _validate_chunk(entity: str, mapping: ColumnMapping, rows: List[tuple[int, dict[str, Any]]]) -> ValidatedRows:
+    # Imported lazily so worker processes only pay for the models they use.
+    from app.importers.writers import get_entity
+
+    spec = get_entity(entity)
+    out = ValidatedRows()
+    for idx, row in rows:
+        try:
+            payload = spec.clean(apply_mapping(row, mapping))
+        except Exception as e:
+            out.errors.append(f"Row {idx}: {e}")
+            continue
+        if payload is None:
+            out.skipped += 1
+            continue
+        out.payloads.append((idx, payload))
+    return out
+
+
+def validate_rows(
+    entity: str,
+    mapping: ColumnMapping,
+    rows: List[tuple[int, dict[str, Any]]],
+    *,
+    workers: int = 1,
+    chunk_size: int = 500,
+    executor: Optional[ProcessPoolExecutor] = None,
+) -> ValidatedRows:
+    """Map + clean ``(row_number, raw_row)`` pairs, preserving input order."""
+
+    if workers <= 1 or len(rows) < INLINE_THRESHOLD:
+        return _validate_chunk(entity, mapping, rows)
+
+    chunks = [rows[i : i + chunk_size] for i in range(0, len(rows), chunk_size)]
+    result = ValidatedRows()
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    try:
+        for part in pool.map(_validate_chunk, [entity] * len(chunks), [mapping] * len(chunks), chunks):
+            result.payloads.extend(part.payloads)
+            result.skipped += part.skipped
+            result.errors.extend(part.errors)
+    finally:
+        if executor is None:
+            pool.shutdown()
+    return result
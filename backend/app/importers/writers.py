@@ -0,0 +1,490 @@
+"""Per-entity import specs and bulk upsert writers.
+
+Each entity declares a default column mapping, a ``clean`` function that
+turns a mapped row into a model payload (raising ``ValueError`` for invalid
+rows, returning ``None`` to skip), the natural keys used to match existing
+rows and a writer that upserts a chunk of payloads with a single prefetch
+query plus ``bulk_insert_mappings`` / ``bulk_update_mappings``.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.core.cache import mark_tables_changed
+from app.core.sequences import max_numeric_suffix, reserve
+from app.importers.mapping import ColumnMapping
+from app.models.client import Client
+from app.models.employee import Employee
+from app.models.employee2 import Employee2
+from app.models.vehicle import Vehicle
+
+
+@dataclass
+class WriteResult:
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    created_keys: List[str] = field(default_factory=list)
+
+
+@dataclass
+class EntitySpec:
+    name: str
+    model: Any
+    mapping: ColumnMapping
+    clean: Callable[[dict[str, Optional[str]]], Optional[dict[str, Any]]]
+    keys: List[str]
+    write: Callable[[Session, List[dict[str, Any]], str], WriteResult]
+    prepare_rows: Optional[Callable[[List[dict[str, Any]]], List[dict[str, Any]]]] = None
+
+
+def _chunk_keys(payloads: Iterable[dict[str, Any]], keys: List[str]) -> Dict[str, set]:
+    out: Dict[str, set] = {k: set() for k in keys}
+    for p in payloads:
+        for k in keys:
+            v = p.get(k)
+            if v:
+                out[k].add(v)
+    return out
+
+
+def _prefetch_existing(db: Session, model: Any, payloads: List[dict[str, Any]], keys: List[str]) -> Dict[tuple, int]:
+    """Return ``{(key, value): id}`` for every existing row matching any key in the chunk."""
+
+    wanted = _chunk_keys(payloads, keys)
+    conds = [getattr(model, k).in_(list(vals)) for k, vals in wanted.items() if vals]
+    if not conds:
+        return {}
+    cols = [model.id] + [getattr(model, k) for k in keys]
+    found: Dict[tuple, int] = {}
+    for row in db.query(*cols).filter(or_(*conds)).all():
+        for k, v in zip(keys, row[1:]):
+            if v:
+                found.setdefault((k, v), row[0])
+    return found
+
+
+def _match(existing: Dict[tuple, int], payload: dict[str, Any], keys: List[str]) -> Optional[int]:
+    for k in keys:
+        v = payload.get(k)
+        if v and (k, v) in existing:
+            return existing[(k, v)]
+    return None
+
+
+def _upsert(
+    db: Session,
+    model: Any,
+    payloads: List[dict[str, Any]],
+    keys: List[str],
+    mode: str,
+    before_insert: Optional[Callable[[Session, List[dict[str, Any]]], None]] = None,
+    label: Optional[str] = None,
+) -> WriteResult:
+    result = WriteResult()
+    existing = _prefetch_existing(db, model, payloads, keys)
+
+    inserts: List[dict[str, Any]] = []
+    updates: List[dict[str, Any]] = []
+    seen: set = set()
+    for p in payloads:
+        ident = tuple((k, p.get(k)) for k in keys if p.get(k))
+        if ident and any(i in seen for i in ident):
+            result.skipped += 1
+            continue
+        seen.update(ident)
+
+        row_id = _match(existing, p, keys)
+        if row_id is None:
+            inserts.append(p)
+        elif mode == "upsert":
+            updates.append({"id": row_id, **{k: v for k, v in p.items() if v is not None}})
+        else:
+            result.skipped += 1
+
+    if inserts and before_insert is not None:
+        before_insert(db, inserts)
+    if inserts:
+        db.bulk_insert_mappings(model, inserts)
+        result.created += len(inserts)
+        result.created_keys.extend(str(p.get(label or keys[0]) or "") for p in inserts)
+    if updates:
+        db.bulk_update_mappings(model, updates)
+        result.updated += len(updates)
+    if inserts or updates:
+        # Bulk mappings bypass the flush hooks the lookup cache listens to.
+        mark_tables_changed(db, model.__tablename__)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Employee (master employee records, SEC-NNNN ids)
+# ---------------------------------------------------------------------------
+
+EMPLOYEE_MAPPING: ColumnMapping = {
+    "full_name": ["name", "full name", "employee name"],
+    "first_name": ["first name"],
+    "last_name": ["last name"],
+    "email": ["email"],
+    "father_name": ["fathers name", "father name"],
+    "total_salary": ["salary", "total salary"],
+    "status": ["status"],
+    "service_unit": ["unit"],
+    "service_rank": ["rank"],
+    "blood_group": ["blood gp", "blood group"],
+    "cnic": ["cnic no", "cnic"],
+    "date_of_birth": ["dob", "date of birth"],
+    "cnic_expiry_date": ["cnic expr", "cnic expiry"],
+    "original_doc_held": ["documents held"],
+    "documents_handed_over_to": ["documents reciving handed over to", "documents handed over to"],
+    "photo_on_document": ["photo on docu", "photo on document"],
+    "eobi_no": ["eobi no", "eobi"],
+    "insurance": ["insurance"],
+    "social_security": ["social security"],
+    "mobile_number": ["mob no", "mob", "mobile", "mobile number"],
+    "home_contact_no": ["home contact number", "home contact no", "home contact"],
+    "particulars_verified_by_sho_on": ["verified by sho"],
+    "verified_by_khidmat_markaz": ["verified by khidmat markaz"],
+    "domicile": ["domicile"],
+    "particulars_verified_by_ssp_on": ["verified by ssp"],
+    "service_enrollment_date": ["enrolled"],
+    "service_reenrollment_date": ["re enrolled", "reenrolled"],
+    "permanent_village": ["village"],
+    "permanent_post_office": ["post office"],
+    "permanent_thana": ["thana"],
+    "permanent_tehsil": ["tehsil"],
+    "permanent_district": ["district"],
+    "base_location": ["duty location"],
+    "police_training_letter_date": ["police trg ltr and date", "police trg ltr date"],
+    "vaccination_certificate": ["vacanation cert", "vaccination cert"],
+    "volume_no": ["vol no", "vol"],
+    "payments": ["payments"],
+    "fss_number": ["fss no", "fss", "fss number"],
+    "designation": ["designation"],
+    "department": ["department"],
+    "date_of_entry": ["date of entry"],
+    "card_number": ["card", "card number"],
+}
+
+
+def _guess_email(*, fssl_no: Optional[str], cnic: Optional[str], idx: int) -> str:
+    base = (fssl_no or cnic or f"import-{idx}").strip()
+    base = re.sub(r"[^a-zA-Z0-9]+", "-", base).strip("-").lower() or f"import-{idx}"
+    return f"{base}@import.local"
+
+
+def clean_employee(row: dict[str, Optional[str]]) -> Optional[dict[str, Any]]:
+    full_name = row.get("full_name") or ""
+    first_name = row.get("first_name")
+    last_name = row.get("last_name")
+    if not first_name:
+        parts = [p for p in re.split(r"\s+", full_name.strip()) if p]
+        if not parts:
+            return None
+        first_name = parts[0]
+        last_name = last_name or (" ".join(parts[1:]) or "-")
+    if full_name.strip().lower() == "name":
+        return None
+
+    salary = row.get("total_salary")
+    if salary:
+        salary = re.sub(r"[^0-9.]+", "", salary.replace(",", "")) or None
+
+    status_val = (row.get("status") or "").strip().lower()
+    payload: dict[str, Any] = {k: v for k, v in row.items() if k not in {"full_name", "status"}}
+    payload.update(
+        {
+            "first_name": first_name,
+            "last_name": last_name or "-",
+            "total_salary": salary,
+            "employment_status": status_val.title() if status_val in {"active", "inactive", "left"} else "Active",
+        }
+    )
+    if payload.get("email") and "@" not in str(payload["email"]):
+        raise ValueError(f"Invalid email: {payload['email']}")
+    return {k: v for k, v in payload.items() if v is not None}
+
+
+def _next_employee_numbers(db: Session, count: int) -> List[str]:
+    # One block reservation per chunk instead of one counter round-trip per row.
+    block = reserve(db, "employee_id", count, seed=lambda: max_numeric_suffix(db, Employee.employee_id, "SEC-"))
+    return [f"SEC-{n:04d}" for n in block]
+
+
+def _assign_employee_ids(db: Session, inserts: List[dict[str, Any]]) -> None:
+    ids = _next_employee_numbers(db, len(inserts))
+
+    wanted = [p["email"] for p in inserts if p.get("email")]
+    taken = {r[0] for r in db.query(Employee.email).filter(Employee.email.in_(wanted)).all()} if wanted else set()
+    for idx, (p, employee_id) in enumerate(zip(inserts, ids), start=1):
+        p["employee_id"] = employee_id
+        email = p.get("email") or _guess_email(fssl_no=p.get("fss_number"), cnic=p.get("cnic"), idx=idx)
+        if email in taken:
+            email = _guess_email(fssl_no=employee_id, cnic=None, idx=idx)
+        taken.add(email)
+        p["email"] = email
+
+
+def write_employees(db: Session, payloads: List[dict[str, Any]], mode: str) -> WriteResult:
+    return _upsert(
+        db,
+        Employee,
+        payloads,
+        ["cnic", "fss_number"],
+        mode,
+        before_insert=_assign_employee_ids,
+        label="employee_id",
+    )
+
+
+# ---------------------------------------------------------------------------
+# Employee2 (legacy sheet, columns A..AP)
+# ---------------------------------------------------------------------------
+
+EMPLOYEE2_MAPPING: ColumnMapping = {
+    "serial_no": ["A", "#", "serial no", "sr no"],
+    "fss_no": ["B", "fss no", "fss"],
+    "rank": ["C", "rank"],
+    "name": ["D", "name"],
+    "father_name": ["E", "fathers name", "father name"],
+    "salary": ["F", "salary"],
+    "status": ["G", "status"],
+    "unit": ["H", "unit"],
+    "service_rank": ["I"],
+    "blood_group": ["J", "blood gp", "blood group"],
+    "status2": ["K"],
+    "unit2": ["L"],
+    "rank2": ["M"],
+    "cnic": ["N", "cnic no", "cnic"],
+    "dob": ["O", "dob"],
+    "cnic_expiry": ["P", "cnic expr", "cnic expiry"],
+    "documents_held": ["Q", "documents held"],
+    "documents_handed_over_to": ["R", "documents reciving handed over to"],
+    "photo_on_doc": ["S", "photo on docu"],
+    "eobi_no": ["T", "eobi no"],
+    "insurance": ["W", "insurance"],
+    "social_security": ["X", "social security"],
+    "mobile_no": ["Y", "mob no", "mobile"],
+    "home_contact": ["Z", "home contact number"],
+    "verified_by_sho": ["AA", "verified by sho"],
+    "verified_by_khidmat_markaz": ["AB", "verified by khidmat markaz"],
+    "domicile": ["AC", "domicile"],
+    "verified_by_ssp": ["AD", "verified by ssp"],
+    "enrolled": ["AE", "enrolled"],
+    "re_enrolled": ["AF", "re enrolled"],
+    "village": ["AG", "village"],
+    "post_office": ["AH", "post office"],
+    "thana": ["AI", "thana"],
+    "tehsil": ["AJ", "tehsil"],
+    "district": ["AK", "district"],
+    "duty_location": ["AL", "duty location"],
+    "police_trg_ltr_date": ["AM", "police trg ltr and date"],
+    "vaccination_cert": ["AN", "vacanation cert"],
+    "vol_no": ["AO", "vol no"],
+    "payments": ["AP", "payments"],
+    "category": ["category"],
+    "designation": ["designation"],
+}
+
+
+def prepare_employee2_rows(rows: List[dict[str, Any]]) -> List[dict[str, Any]]:
+    """Carry category heading rows (text in A, no name) down onto the rows beneath them."""
+
+    out: List[dict[str, Any]] = []
+    current_category = None
+    for row in rows:
+        a_val = str(row.get("A", "") or "").strip()
+        d_val = str(row.get("D", "") or "").strip()
+        if "A" in row and a_val and not a_val.isdigit() and not d_val and a_val != "#":
+            current_category = a_val
+            continue
+        if current_category and not row.get("category"):
+            row = {**row, "category": current_category}
+        out.append(row)
+    return out
+
+
+def clean_employee2(row: dict[str, Optional[str]]) -> Optional[dict[str, Any]]:
+    if row.get("serial_no") == "#" or (row.get("name") or "").lower() == "name":
+        return None
+    if not row.get("name"):
+        return None
+    return {k: v for k, v in row.items() if v is not None}
+
+
+def write_employees2(db: Session, payloads: List[dict[str, Any]], mode: str) -> WriteResult:
+    return _upsert(db, Employee2, payloads, ["fss_no", "cnic"], mode, label="name")
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+CLIENT_MAPPING: ColumnMapping = {
+    "sr_no": ["#", "sr no", "serial no"],
+    "client_code": ["client code", "code"],
+    "client_name": ["Client Name", "client name", "name"],
+    "client_type": ["client type", "type"],
+    "industry_type": ["industry type", "industry"],
+    "status": ["status"],
+    "location": ["location", "city"],
+    "address": ["address"],
+    "phone": ["phone", "contact"],
+    "email": ["email"],
+}
+
+_CLIENT_LOCATIONS = [
+    ("rawalpindi", "Rawalpindi"),
+    ("lahore", "Lahore"),
+    ("peshawar", "Peshawar"),
+    ("karachi", "Karachi"),
+    ("multan", "Multan"),
+    ("kpk", "KPK"),
+    ("khyber", "KPK"),
+    ("sindh", "Sindh"),
+    ("ajk", "Azad Kashmir"),
+    ("azad", "Azad Kashmir"),
+]
+
+
+def clean_client(row: dict[str, Optional[str]]) -> Optional[dict[str, Any]]:
+    name = row.get("client_name")
+    sr_no = row.get("sr_no") or ""
+    if not name or sr_no == "#" or name.lower() == "client name":
+        return None
+
+    lname = name.lower()
+    client_type = row.get("client_type") or "Corporate"
+    industry_type = row.get("industry_type")
+    if not industry_type:
+        industry_type = "Bank" if "bank" in lname else "Commercial"
+        if "embassy" in lname:
+            client_type = row.get("client_type") or "Government"
+            industry_type = "Government"
+        elif "school" in lname or "university" in lname:
+            industry_type = "Educational"
+        elif "hospital" in lname or "medical" in lname:
+            industry_type = "Hospital"
+
+    location = row.get("location")
+    if not location:
+        location = next((label for needle, label in _CLIENT_LOCATIONS if needle in lname), "Islamabad")
+
+    code = row.get("client_code")
+    if not code:
+        base = name.replace(" ", "_").replace(",", "").replace(".", "").upper()[:20]
+        code = f"{base}_{sr_no}" if sr_no else base
+
+    payload = {
+        "client_code": code,
+        "client_name": name,
+        "client_type": client_type,
+        "industry_type": industry_type,
+        "status": row.get("status") or "Active",
+        "location": location,
+        "address": row.get("address") or name,
+        "phone": row.get("phone"),
+        "email": row.get("email"),
+        "notes": f"Imported from client list - SR No: {sr_no}" if sr_no else None,
+    }
+    return {k: v for k, v in payload.items() if v is not None}
+
+
+def write_clients(db: Session, payloads: List[dict[str, Any]], mode: str) -> WriteResult:
+    return _upsert(db, Client, payloads, ["client_code", "client_name"], mode, label="client_code")
+
+
+# ---------------------------------------------------------------------------
+# Vehicle
+# ---------------------------------------------------------------------------
+
+VEHICLE_MAPPING: ColumnMapping = {
+    "sr_no": ["A", "sr no"],
+    "vehicle_id": ["B", "vehicle id", "vehicle"],
+    "user": ["C", "user"],
+    "vehicle_type": ["vehicle type", "type"],
+    "category": ["category"],
+    "make_model": ["make model", "make and model"],
+    "license_plate": ["license plate", "registration no"],
+    "chassis_number": ["chassis number", "chassis no"],
+    "year": ["year", "model year"],
+    "status": ["status"],
+}
+
+
+def clean_vehicle(row: dict[str, Optional[str]]) -> Optional[dict[str, Any]]:
+    vehicle_id = row.get("vehicle_id")
+    if not vehicle_id or vehicle_id.lower() == "vehicle" or (row.get("sr_no") or "") == "Sr.\nNo":
+        return None
+    user = (row.get("user") or "").lower()
+
+    year_raw = row.get("year")
+    try:
+        year = int(float(year_raw)) if year_raw else 2024
+    except ValueError as e:
+        raise ValueError(f"Invalid year: {year_raw}") from e
+
+    return {
+        "vehicle_id": vehicle_id,
+        "vehicle_type": row.get("vehicle_type") or ("Motorcycle" if "motorcycle" in user else "Car"),
+        "category": row.get("category") or ("Pool" if "pool" in user else "Assigned"),
+        "make_model": row.get("make_model") or "Imported Vehicle",
+        "license_plate": row.get("license_plate") or vehicle_id,
+        "chassis_number": row.get("chassis_number"),
+        "year": year,
+        "status": row.get("status") or ("Inactive" if "not in use" in user else "Active"),
+        "compliance": "Compliant",
+        "government_permit": "Standard",
+    }
+
+
+def write_vehicles(db: Session, payloads: List[dict[str, Any]], mode: str) -> WriteResult:
+    return _upsert(db, Vehicle, payloads, ["vehicle_id"], mode)
+
+
+ENTITIES: Dict[str, EntitySpec] = {
+    "employees": EntitySpec(
+        name="employees",
+        model=Employee,
+        mapping=EMPLOYEE_MAPPING,
+        clean=clean_employee,
+        keys=["cnic", "fss_number"],
+        write=write_employees,
+    ),
+    "employees2": EntitySpec(
+        name="employees2",
+        model=Employee2,
+        mapping=EMPLOYEE2_MAPPING,
+        clean=clean_employee2,
+        keys=["fss_no", "cnic"],
+        write=write_employees2,
+        prepare_rows=prepare_employee2_rows,
+    ),
+    "clients": EntitySpec(
+        name="clients",
+        model=Client,
+        mapping=CLIENT_MAPPING,
+        clean=clean_client,
+        keys=["client_code", "client_name"],
+        write=write_clients,
+    ),
+    "vehicles": EntitySpec(
+        name="vehicles",
+        model=Vehicle,
+        mapping=VEHICLE_MAPPING,
+        clean=clean_vehicle,
+        keys=["vehicle_id"],
+        write=write_vehicles,
+    ),
+}
+
+
+def get_entity(name: str) -> EntitySpec:
+    spec = ENTITIES.get((name or "").strip().lower())
+    if spec is None:
+        raise ValueError(f"Unknown entity: {name}. Use one of {', '.join(sorted(ENTITIES))}")
+    return spec
@@ -19,6 +19,7 @@ from app.models import (
     employee,
     employee_document,
     employee_warning,
+    employee_language,
     employee_warning_document,
     attendance,
     leave_period,
@@ -31,6 +32,9 @@ from app.models import (
     general_item,
     general_item_transaction,
     general_item_employee_balance,
+    inventory_assignment_item,
+    inventory_stock_snapshot,
+    inventory_stock_snapshot_line,
     client,
     client_contact,
     client_address,
@@ -47,10 +51,12 @@ from app.models import (
     restricted_item_transaction,
     restricted_item_employee_balance,
     finance_account,
+    finance_account_period_balance,
     finance_journal_line,
     finance_journal_entry,
     expense,
     employee2,
+    sequence_counter,
 )  # Import models to create tables
 
 from app.models.rbac import Permission, Role
@@ -322,6 +328,71 @@ def _ensure_employee_columns_exist() -> None:
 _ensure_employee_columns_exist()
 
 
+def _ensure_employee_warning_count_column() -> None:
+    # Denormalised count maintained by the warning routes; backfilled once when the column is added.
+    with engine.begin() as conn:
+        try:
+            if engine.dialect.name == "sqlite":
+                rows = conn.execute(text("PRAGMA table_info(employees)")).fetchall()
+                existing = {r[1] for r in rows}
+            else:
+                rows = conn.execute(
+                    text(
+                        "SELECT column_name FROM information_schema.columns WHERE table_name='employees'"
+                    )
+                ).fetchall()
+                existing = {r[0] for r in rows}
+
+            if "warning_count" not in existing:
+                conn.execute(text("ALTER TABLE employees ADD COLUMN warning_count INTEGER NOT NULL DEFAULT 0"))
+                conn.execute(
+                    text(
+                        "UPDATE employees SET warning_count = "
+                        "(SELECT COUNT(*) FROM employee_warnings w WHERE w.employee_db_id = employees.id)"
+                    )
+                )
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_employees_warning_count ON employees (warning_count)"))
+        except Exception:
+            pass
+
+
+_ensure_employee_warning_count_column()
+
+
+def _ensure_employee_languages_backfilled() -> None:
+    # employee_languages is derived from the JSON language columns; fill it once for existing rows.
+    from app.api.routes.employees import employee_language_rows
+
+    with engine.begin() as conn:
+        try:
+            if conn.execute(text("SELECT 1 FROM employee_languages LIMIT 1")).first():
+                return
+            rows = conn.execute(
+                text(
+                    "SELECT id, languages_spoken, languages_proficiency FROM employees "
+                    "WHERE languages_spoken IS NOT NULL OR languages_proficiency IS NOT NULL"
+                )
+            ).fetchall()
+            values = [
+                {"employee_db_id": int(r[0]), **lang}
+                for r in rows
+                for lang in employee_language_rows(r[1], r[2])
+            ]
+            if values:
+                conn.execute(
+                    text(
+                        "INSERT INTO employee_languages (employee_db_id, language, display_name, level) "
+                        "VALUES (:employee_db_id, :language, :display_name, :level)"
+                    ),
+                    values,
+                )
+        except Exception:
+            pass
+
+
+_ensure_employee_languages_backfilled()
+
+
 def _ensure_employee_warning_columns_exist() -> None:
     cols = {
         "found_with": "TEXT",
@@ -611,6 +682,182 @@ def _ensure_client_site_guard_allocation_columns_exist() -> None:
 _ensure_client_site_guard_allocation_columns_exist()
 _ensure_client_site_guard_allocation_employee_fk()
 
+
+def _ensure_client_site_guard_allocation_range_index() -> None:
+    # Composite index for date-range conflict checks (app.core.allocations). On PostgreSQL also
+    # reject overlapping active allocations per guard and allocation kind with an exclusion constraint.
+    with engine.begin() as conn:
+        try:
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_client_site_guard_allocations_employee_dates "
+                    "ON client_site_guard_allocations (employee_db_id, start_date, end_date)"
+                )
+            )
+        except Exception:
+            pass
+
+    if engine.dialect.name != "postgresql":
+        return
+
+    with engine.begin() as conn:
+        try:
+            exists = conn.execute(
+                text("SELECT 1 FROM pg_constraint WHERE conname = 'ex_client_site_guard_allocations_overlap'")
+            ).first()
+            if not exists:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+                conn.execute(
+                    text(
+                        "ALTER TABLE client_site_guard_allocations "
+                        "ADD CONSTRAINT ex_client_site_guard_allocations_overlap "
+                        "EXCLUDE USING gist ("
+                        "employee_db_id WITH =, status WITH =, daterange(start_date, end_date, '[]') WITH &&"
+                        ") WHERE (status IN ('Allocated', 'Active'))"
+                    )
+                )
+        except Exception:
+            # Existing overlapping rows or missing privileges: keep the application-level checks only.
+            pass
+
+
+_ensure_client_site_guard_allocation_range_index()
+
+
+def _ensure_client_invoice_status_date_index() -> None:
+    with engine.begin() as conn:
+        try:
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_client_invoices_status_invoice_date "
+                    "ON client_invoices (payment_status, invoice_date)"
+                )
+            )
+        except Exception:
+            pass
+
+
+_ensure_client_invoice_status_date_index()
+
+
+def _ensure_inventory_balance_unique_indexes() -> None:
+    # One balance row per (employee, item): stock mutations increment it in place.
+    for table in ("general_item_employee_balances", "restricted_item_employee_balances"):
+        with engine.begin() as conn:
+            try:
+                conn.execute(
+                    text(
+                        f"UPDATE {table} SET quantity_issued = ("
+                        f"SELECT SUM(b.quantity_issued) FROM {table} b "
+                        f"WHERE b.employee_id = {table}.employee_id AND b.item_code = {table}.item_code) "
+                        f"WHERE id IN (SELECT MIN(id) FROM {table} GROUP BY employee_id, item_code HAVING COUNT(*) > 1)"
+                    )
+                )
+                conn.execute(
+                    text(f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY employee_id, item_code)")
+                )
+                conn.execute(
+                    text(f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{table}_employee_item ON {table} (employee_id, item_code)")
+                )
+            except Exception:
+                pass
+
+
+_ensure_inventory_balance_unique_indexes()
+
+
+def _ensure_inventory_transaction_history_indexes() -> None:
+    # Keyset paging (id < :cursor) per item / employee / action, and date-range filters.
+    for table in ("general_item_transactions", "restricted_item_transactions"):
+        for name, cols in (
+            ("item_id", "item_code, id"),
+            ("employee_id_id", "employee_id, id"),
+            ("action_id", "action, id"),
+            ("created_at", "created_at"),
+        ):
+            with engine.begin() as conn:
+                try:
+                    conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_{name} ON {table} ({cols})"))
+                except Exception:
+                    pass
+
+
+_ensure_inventory_transaction_history_indexes()
+
+
+def _ensure_inventory_stock_baseline() -> None:
+    # As-of stock queries start from a snapshot; take the first one for existing data.
+    from app.core.database import SessionLocal
+    from app.core.stock_ledger import ensure_baseline_snapshots
+
+    db = SessionLocal()
+    try:
+        ensure_baseline_snapshots(db)
+    except Exception:
+        db.rollback()
+    finally:
+        db.close()
+
+
+_ensure_inventory_stock_baseline()
+
+
+def _ensure_inventory_assignments_normalised() -> None:
+    # The assignments map moved from one JSON blob to inventory_assignment_items plus a version.
+    with engine.begin() as conn:
+        try:
+            if engine.dialect.name == "sqlite":
+                rows = conn.execute(text("PRAGMA table_info(inventory_assignments_state)")).fetchall()
+                existing = {r[1] for r in rows}
+            else:
+                rows = conn.execute(
+                    text(
+                        "SELECT column_name FROM information_schema.columns "
+                        "WHERE table_name='inventory_assignments_state'"
+                    )
+                ).fetchall()
+                existing = {r[0] for r in rows}
+            if "version" not in existing:
+                conn.execute(text("ALTER TABLE inventory_assignments_state ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+        except Exception:
+            pass
+
+    from app.core.database import SessionLocal
+    from app.api.routes.inventory_assignments import normalise_legacy_state
+
+    db = SessionLocal()
+    try:
+        normalise_legacy_state(db)
+    except Exception:
+        db.rollback()
+    finally:
+        db.close()
+
+
+_ensure_inventory_assignments_normalised()
+
+
+def _ensure_finance_period_balances() -> None:
+    # Period totals are maintained on posting; build them once for entries posted before they existed.
+    from app.core.database import SessionLocal
+    from app.core.finance_balances import rebuild_period_balances
+    from app.models.finance_account_period_balance import FinanceAccountPeriodBalance
+    from app.models.finance_journal_entry import FinanceJournalEntry
+
+    db = SessionLocal()
+    try:
+        if db.query(FinanceAccountPeriodBalance.id).first():
+            return
+        if db.query(FinanceJournalEntry.id).filter(FinanceJournalEntry.status == "POSTED").first():
+            rebuild_period_balances(db)
+    except Exception:
+        db.rollback()
+    finally:
+        db.close()
+
+
+_ensure_finance_period_balances()
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
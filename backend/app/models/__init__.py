@@ -6,6 +6,7 @@ from app.models.vehicle_document import VehicleDocument
 from app.models.vehicle_assignment import VehicleAssignment
 from app.models.employee_document import EmployeeDocument
 from app.models.employee_warning import EmployeeWarning
+from app.models.employee_language import EmployeeLanguage
 from app.models.employee_warning_document import EmployeeWarningDocument
 from app.models.vehicle_image import VehicleImage
 from app.models.fuel_entry import FuelEntry
@@ -29,12 +30,16 @@ from app.models.client_site import ClientSite
 from app.models.client_site_guard_allocation import ClientSiteGuardAllocation
 from app.models.employee2 import Employee2
 from app.models.finance_account import FinanceAccount
+from app.models.finance_account_period_balance import FinanceAccountPeriodBalance
 from app.models.finance_journal_entry import FinanceJournalEntry
 from app.models.finance_journal_line import FinanceJournalLine
 from app.models.general_item import GeneralItem
 from app.models.general_item_employee_balance import GeneralItemEmployeeBalance
 from app.models.general_item_transaction import GeneralItemTransaction
 from app.models.inventory_assignment import InventoryAssignmentState
+from app.models.inventory_assignment_item import InventoryAssignmentItem
+from app.models.inventory_stock_snapshot import InventoryStockSnapshot
+from app.models.inventory_stock_snapshot_line import InventoryStockSnapshotLine
 from app.models.leave_period import LeavePeriod
 from app.models.rbac import Role, Permission
 from app.models.restricted_item import RestrictedItem
@@ -42,6 +47,7 @@ from app.models.restricted_item_employee_balance import RestrictedItemEmployeeBa
 from app.models.restricted_item_image import RestrictedItemImage
 from app.models.restricted_item_serial_unit import RestrictedItemSerialUnit
 from app.models.restricted_item_transaction import RestrictedItemTransaction
+from app.models.sequence_counter import SequenceCounter
 
 __all__ = [
     "User",
@@ -49,6 +55,7 @@ __all__ = [
     "VehicleDocument",
     "EmployeeDocument",
     "EmployeeWarning",
+    "EmployeeLanguage",
     "EmployeeWarningDocument",
     "VehicleImage",
     "FuelEntry",
@@ -72,12 +79,16 @@ __all__ = [
     "ClientSiteGuardAllocation",
     "Employee2",
     "FinanceAccount",
+    "FinanceAccountPeriodBalance",
     "FinanceJournalEntry",
     "FinanceJournalLine",
     "GeneralItem",
     "GeneralItemEmployeeBalance",
     "GeneralItemTransaction",
     "InventoryAssignmentState",
+    "InventoryAssignmentItem",
+    "InventoryStockSnapshot",
+    "InventoryStockSnapshotLine",
     "LeavePeriod",
     "Role",
     "Permission",
@@ -86,4 +97,5 @@ __all__ = [
     "RestrictedItemImage",
     "RestrictedItemSerialUnit",
     "RestrictedItemTransaction",
+    "SequenceCounter",
 ]
@@ -1,4 +1,5 @@
 from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -29,3 +30,13 @@ class Client(Base):
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Read-only child collections for eager loading the client detail page (newest first).
+    # viewonly so deleting a client keeps its existing (non-cascading) behaviour.
+    contacts = relationship("ClientContact", viewonly=True, order_by="desc(ClientContact.id)")
+    addresses = relationship("ClientAddress", viewonly=True, order_by="desc(ClientAddress.id)")
+    sites = relationship("ClientSite", viewonly=True, order_by="desc(ClientSite.id)")
+    contracts = relationship("ClientContract", viewonly=True, order_by="desc(ClientContract.id)")
+    rate_cards = relationship("ClientRateCard", viewonly=True, order_by="desc(ClientRateCard.id)")
+    invoices = relationship("ClientInvoice", viewonly=True, order_by="desc(ClientInvoice.id)")
+    documents = relationship("ClientDocument", viewonly=True, order_by="desc(ClientDocument.id)")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Index, Integer, String
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -7,6 +7,11 @@ from app.core.database import Base
 class ClientInvoice(Base):
     __tablename__ = "client_invoices"
 
+    __table_args__ = (
+        # Dashboard trend / aging queries filter by status and bucket by invoice month
+        Index("ix_client_invoices_status_invoice_date", "payment_status", "invoice_date"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     client_id = Column(Integer, ForeignKey("clients.id"), index=True, nullable=False)
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Date, DateTime, ForeignKey, Integer, String
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Index, Integer, String
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -7,6 +7,11 @@ from app.core.database import Base
 class ClientSiteGuardAllocation(Base):
     __tablename__ = "client_site_guard_allocations"
 
+    __table_args__ = (
+        # Range lookups for conflict checks (app.core.allocations)
+        Index("ix_client_site_guard_allocations_employee_dates", "employee_db_id", "start_date", "end_date"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
 
     site_id = Column(Integer, ForeignKey("client_sites.id"), index=True, nullable=True)
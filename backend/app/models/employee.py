@@ -88,6 +88,7 @@ class Employee(Base):
     employment_status = Column(Text, default="Active")
     last_site_assigned = Column(Text)
     remarks = Column(Text)
+    warning_count = Column(Integer, nullable=False, default=0, server_default="0", index=True)  # denormalised count of employee_warnings
 
     retired_from = Column(Text)  # JSON array string
     service_unit = Column(Text)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, ForeignKey, Integer, String, UniqueConstraint
+
+from app.core.database import Base
+
+
+class EmployeeLanguage(Base):
+    """One row per language an employee speaks (normalised from the JSON columns on employees)."""
+
+    __tablename__ = "employee_languages"
+
+    __table_args__ = (
+        UniqueConstraint("employee_db_id", "language", name="uq_employee_languages_employee_language"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    employee_db_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), index=True, nullable=False)
+
+    language = Column(String(80), index=True, nullable=False)  # lower-cased, used for matching
+    display_name = Column(String(80), nullable=False)
+    level = Column(String(40), nullable=True)
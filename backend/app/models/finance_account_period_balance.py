@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Index, Integer, Numeric
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class FinanceAccountPeriodBalance(Base):
+    """Debit/credit totals of POSTED journal lines per account and month."""
+
+    __tablename__ = "finance_account_period_balances"
+    __table_args__ = (
+        Index("uq_finance_account_period_balances_account_period", "account_id", "period", unique=True),
+        Index("ix_finance_account_period_balances_period", "period"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    account_id = Column(Integer, ForeignKey("finance_accounts.id"), nullable=False)
+    # First day of the month the entries are dated in.
+    period = Column(Date, nullable=False)
+
+    debit = Column(Numeric(14, 2), nullable=False, default=0)
+    credit = Column(Numeric(14, 2), nullable=False, default=0)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
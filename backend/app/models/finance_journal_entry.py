@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Date, DateTime, Integer, String, event
+from sqlalchemy import Column, Date, DateTime, Integer, String, event, inspect
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -32,7 +32,10 @@ class FinanceJournalEntry(Base):
 
 @event.listens_for(FinanceJournalEntry, "before_update")
 def _prevent_posted_entry_update(mapper, connection, target):
-    if getattr(target, "status", None) == "POSTED":
+    # Judge by the status before this flush, so DRAFT -> POSTED itself is allowed.
+    history = inspect(target).attrs.status.history
+    previous = history.deleted[0] if history.deleted else getattr(target, "status", None)
+    if previous == "POSTED":
         raise ValueError("Posted journal entries cannot be modified")
 
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -6,6 +6,7 @@ from app.core.database import Base
 
 class GeneralItemEmployeeBalance(Base):
     __tablename__ = "general_item_employee_balances"
+    __table_args__ = (Index("uq_general_item_employee_balances_employee_item", "employee_id", "item_code", unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -6,6 +6,12 @@ from app.core.database import Base
 
 class GeneralItemTransaction(Base):
     __tablename__ = "general_item_transactions"
+    __table_args__ = (
+        Index("ix_general_item_transactions_item_id", "item_code", "id"),
+        Index("ix_general_item_transactions_employee_id_id", "employee_id", "id"),
+        Index("ix_general_item_transactions_action_id", "action", "id"),
+        Index("ix_general_item_transactions_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -1,8 +1,8 @@
-"""Inventory assignment state stored as a single JSON blob.
+"""Inventory assignment state: the version counter of the assignments map.
 
-This is a lightweight persistence layer for the frontend's inventoryAssignments
-map (item/employee quantities), so that the state survives server restarts and
-browser refreshes.
+The map itself lives in ``inventory_assignment_items``, one row per
+(employee, item); the ``data`` blob is only read once, to migrate rows
+written before the map was normalised.
 """
 
 from sqlalchemy import Column, Integer, Text, DateTime
@@ -12,9 +12,9 @@ from app.core.database import Base
 
 
 class InventoryAssignmentState(Base):
-    """Stores all inventory assignment data as a JSON string.
+    """Holds the version of the inventory assignments map.
 
-    The frontend currently manages a dictionary structure like:
+    The frontend manages a dictionary structure like:
 
         {
             "EMP-001": [{"itemId": "INV-0001", "quantity": 4}, ...],
@@ -22,14 +22,16 @@ class InventoryAssignmentState(Base):
             ...
         }
 
-    Instead of modeling this in a normalized way, we keep a single row
-    with a JSON Text column to mirror the localStorage structure.
+    stored one row per pair in ``inventory_assignment_items``. The single
+    row here holds the current ``version`` of that map, bumped by every
+    write; PATCH requests name the version they were based on.
     """
 
     __tablename__ = "inventory_assignments_state"
 
     id = Column(Integer, primary_key=True, index=True)
-    # JSON string for the entire assignments map
+    # Legacy JSON string for the entire assignments map (see inventory_assignment_items)
     data = Column(Text, nullable=False, default="{}")
+    version = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -0,0 +1,31 @@
+"""Normalised rows of the frontend's inventoryAssignments map.
+
+One row per (employee, item) pair. ``version`` is the assignments version
+that last changed the row, so clients holding version N fetch only rows
+with ``version > N``; removed pairs stay behind as ``deleted`` tombstones
+so that removals are visible to those clients too.
+"""
+
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class InventoryAssignmentItem(Base):
+    __tablename__ = "inventory_assignment_items"
+    __table_args__ = (
+        Index("uq_inventory_assignment_items_employee_item", "employee_id", "item_id", unique=True),
+        Index("ix_inventory_assignment_items_version", "version"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    employee_id = Column(String(100), nullable=False)
+    item_id = Column(String(100), nullable=False)
+    quantity = Column(Integer, nullable=False, default=0)
+
+    version = Column(Integer, nullable=False, default=0)
+    deleted = Column(Boolean, nullable=False, default=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
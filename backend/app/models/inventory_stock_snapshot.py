@@ -0,0 +1,25 @@
+from sqlalchemy import Column, DateTime, Index, Integer, String
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class InventoryStockSnapshot(Base):
+    """Point-in-time copy of item stock and employee balances for one inventory kind."""
+
+    __tablename__ = "inventory_stock_snapshots"
+    __table_args__ = (Index("ix_inventory_stock_snapshots_kind_taken_at", "kind", "taken_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    kind = Column(String(20), nullable=False)  # general | restricted
+    label = Column(String(120), nullable=True)  # e.g. "2026-01 close"
+
+    taken_at = Column(DateTime(timezone=True), nullable=False)
+    # Highest transaction id already reflected in the copied quantities.
+    last_transaction_id = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    lines = relationship("InventoryStockSnapshotLine", back_populates="snapshot", cascade="all, delete-orphan")
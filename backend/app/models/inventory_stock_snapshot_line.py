@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Float, ForeignKey, Integer, String
+from sqlalchemy.orm import relationship
+
+from app.core.database import Base
+
+
+class InventoryStockSnapshotLine(Base):
+    __tablename__ = "inventory_stock_snapshot_lines"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    snapshot_id = Column(Integer, ForeignKey("inventory_stock_snapshots.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    item_code = Column(String(50), nullable=False, index=True)
+    employee_id = Column(String(50), nullable=True)  # NULL: item stock on hand; else the employee's issued balance
+
+    quantity = Column(Float, nullable=False, default=0.0)
+
+    snapshot = relationship("InventoryStockSnapshot", back_populates="lines")
@@ -0,0 +1,16 @@
+from sqlalchemy import BigInteger, Column, DateTime, String
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class SequenceCounter(Base):
+    """Named monotonically increasing counter used by document number generators."""
+
+    __tablename__ = "sequence_counters"
+
+    name = Column(String(100), primary_key=True)  # e.g. employee_id, journal_entry:202501
+    value = Column(BigInteger, nullable=False, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
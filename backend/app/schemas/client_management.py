@@ -54,6 +54,10 @@ class SuggestedEmployeeOut(BaseModel):
     first_name: str
     last_name: str
     languages: List[str] = []
+    language_level: Optional[str] = None
+    proximity: int = 0  # 3 same site, 2 same client, 1 same city, 0 elsewhere
+    last_site_id: Optional[int] = None
+    idle_days: Optional[int] = None  # None when never allocated
 
 
 class ClientSiteGuardAllocationBase(BaseModel):
@@ -87,6 +91,25 @@ class ClientSiteGuardAllocationOut(ClientSiteGuardAllocationBase):
         from_attributes = True
 
 
+class AllocationCheckItem(BaseModel):
+    employee_db_id: int
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+
+class AllocationBatchCheck(BaseModel):
+    kind: str = "site"  # site (employees, Allocated) / contract (employees2, Active)
+    items: List[AllocationCheckItem] = []
+
+
+class AllocationConflictOut(BaseModel):
+    index: int
+    employee_db_id: int
+    reason: str
+    allocation_id: Optional[int] = None
+    batch_index: Optional[int] = None
+
+
 class ClientContactBase(BaseModel):
     name: str
     designation: Optional[str] = None
@@ -373,10 +396,12 @@ class ClientDocumentOut(ClientDocumentBase):
 
 
 class ClientDetailOut(ClientOut):
-    contacts: List[ClientContactOut]
-    addresses: List[ClientAddressOut]
-    sites: List[ClientSiteOut]
-    contracts: List[ClientContractOut]
-    rate_cards: List[ClientRateCardOut]
-    invoices: List[ClientInvoiceOut]
-    documents: List[ClientDocumentOut]
+    # Sections not requested via ?include= are returned empty; see `included`.
+    contacts: List[ClientContactOut] = []
+    addresses: List[ClientAddressOut] = []
+    sites: List[ClientSiteOut] = []
+    contracts: List[ClientContractOut] = []
+    rate_cards: List[ClientRateCardOut] = []
+    invoices: List[ClientInvoiceOut] = []
+    documents: List[ClientDocumentOut] = []
+    included: List[str] = []
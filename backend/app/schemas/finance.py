@@ -80,3 +80,71 @@ class FinanceJournalEntry(FinanceJournalEntryBase):
 
     class Config:
         from_attributes = True
+
+
+class FinanceJournalEntryListItem(FinanceJournalEntryBase):
+    id: int
+    entry_no: str
+    status: str
+    created_at: datetime
+    posted_at: Optional[datetime] = None
+    line_count: int = 0
+    total_debit: Decimal = Decimal("0")
+    # Omitted (null) in summary mode.
+    lines: Optional[List[FinanceJournalLine]] = None
+
+
+class TrialBalanceRow(BaseModel):
+    account_id: int
+    code: str
+    name: str
+    account_type: str
+    parent_id: Optional[int] = None
+    depth: int
+    debit: Decimal
+    credit: Decimal
+    balance: Decimal
+    debit_balance: Decimal
+    credit_balance: Decimal
+    # Including every account below this one in the parent_id hierarchy.
+    rollup_debit: Decimal
+    rollup_credit: Decimal
+    rollup_balance: Decimal
+
+
+class TrialBalance(BaseModel):
+    as_of: date
+    accounts: List[TrialBalanceRow]
+    total_debit: Decimal
+    total_credit: Decimal
+    balanced: bool
+
+
+class AccountLedgerLine(BaseModel):
+    entry_id: int
+    entry_no: str
+    entry_date: date
+    memo: Optional[str] = None
+    source_type: Optional[str] = None
+    source_id: Optional[str] = None
+    line_id: int
+    account_id: int
+    description: Optional[str] = None
+    debit: Decimal
+    credit: Decimal
+    balance: Decimal
+
+
+class AccountLedger(BaseModel):
+    account_id: int
+    code: str
+    name: str
+    account_type: str
+    include_children: bool
+    date_from: date
+    date_to: date
+    opening_balance: Decimal
+    total_debit: Decimal
+    total_credit: Decimal
+    closing_balance: Decimal
+    lines: List[AccountLedgerLine]
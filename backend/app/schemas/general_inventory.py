@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -82,6 +82,25 @@ class AdjustRequest(BaseModel):
     notes: Optional[str] = None
 
 
+class BatchIssueLine(BaseModel):
+    employee_id: str
+    item_code: str
+    quantity: float
+    notes: Optional[str] = None
+
+
+class BatchIssueRequest(BaseModel):
+    lines: List[BatchIssueLine]
+    notes: Optional[str] = None
+
+
+class BatchIssueResult(BaseModel):
+    lines: int
+    employees: int
+    transactions: int
+    quantities: Dict[str, float]
+
+
 class EmployeeGeneralIssuedQuantity(BaseModel):
     item_code: str
     item_name: str
@@ -3,7 +3,7 @@
 These mirror the structure used by the frontend's inventoryAssignments map.
 """
 
-from typing import Dict, List
+from typing import Dict, List, Literal, Optional
 
 from pydantic import BaseModel
 
@@ -19,6 +19,33 @@ InventoryAssignmentsMap = Dict[str, List[InventoryAssignmentEntry]]
 
 class InventoryAssignmentsState(BaseModel):
     data: InventoryAssignmentsMap
+    version: int = 0
 
     class Config:
         from_attributes = True
+
+
+class InventoryAssignmentOp(BaseModel):
+    """One JSON-patch-style change to the map.
+
+    ``path`` is ``/<employeeId>/<itemId>`` (JSON pointer escaping: ``~0`` for
+    ``~``, ``~1`` for ``/``). ``add``/``replace`` set the quantity to
+    ``value``; ``remove`` drops the pair, or every item of the employee when
+    the path is just ``/<employeeId>``.
+    """
+
+    op: Literal["add", "replace", "remove"]
+    path: str
+    value: Optional[int] = None
+
+
+class InventoryAssignmentsPatch(BaseModel):
+    # Version the client last saw; the patch is rejected if the map moved on.
+    version: int
+    ops: List[InventoryAssignmentOp]
+
+
+class InventoryAssignmentsDelta(BaseModel):
+    since_version: int
+    version: int
+    ops: List[InventoryAssignmentOp]
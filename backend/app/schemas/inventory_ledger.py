@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class StockSnapshotOut(BaseModel):
+    id: int
+    kind: str
+    label: Optional[str] = None
+    taken_at: datetime
+    last_transaction_id: int
+
+    class Config:
+        from_attributes = True
+
+
+class StockAsOfItem(BaseModel):
+    item_code: str
+    quantity_on_hand: float
+
+
+class StockAsOfBalance(BaseModel):
+    employee_id: str
+    item_code: str
+    quantity_issued: float
+
+
+class StockAsOfOut(BaseModel):
+    kind: str
+    as_of: datetime
+    snapshot_id: int
+    snapshot_taken_at: datetime
+    replayed_transactions: int
+    items: List[StockAsOfItem]
+    balances: List[StockAsOfBalance]
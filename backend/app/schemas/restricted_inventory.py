@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -129,3 +129,33 @@ class LostRequest(BaseModel):
     quantity: Optional[float] = None
     serial_numbers: Optional[List[str]] = None
     notes: Optional[str] = None
+
+
+class BatchIssueLine(BaseModel):
+    employee_id: str
+    item_code: str
+    quantity: Optional[float] = None
+    serial_numbers: Optional[List[str]] = None
+    notes: Optional[str] = None
+
+
+class BatchIssueRequest(BaseModel):
+    lines: List[BatchIssueLine]
+    notes: Optional[str] = None
+
+
+class BatchIssueResult(BaseModel):
+    lines: int
+    employees: int
+    transactions: int
+    quantities: Dict[str, float]
+    serials: Dict[str, int]
+
+
+class ItemActionResult(BaseModel):
+    item_code: str
+    action: str
+    employee_id: Optional[str] = None
+    serials: int = 0
+    quantity: Optional[float] = None
+    transactions: int
@@ -0,0 +1,133 @@
+"""
+Benchmark: app.importers bulk pipeline (and the batched client-sheet import)
+vs the legacy row-by-row import style.
+
+Runs against a throwaway SQLite database so it never touches flash_erp.db.
+
+Usage (from backend/):
+    python benchmark_imports.py [rows] [workers]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+_TMP_DB = os.path.join(tempfile.mkdtemp(prefix="import-bench-"), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DB}"
+
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.api.routes.client_management import _client_from_import_row, import_client_rows  # noqa: E402
+from app.importers import run_import  # noqa: E402
+from app.models.client import Client  # noqa: E402
+from app.models.employee2 import Employee2  # noqa: E402
+from app.models.vehicle import Vehicle  # noqa: E402
+import app.models  # noqa: E402,F401
+
+
+def make_employee2_rows(n, offset=0):
+    rows = [{"A": "#", "B": "FSS #", "D": "Name"}, {"A": "Office Staff"}]
+    for i in range(offset, offset + n):
+        rows.append({
+            "A": str(i + 1), "B": f"FSS{i:07d}", "C": "Guard", "D": f"Guard {i}",
+            "E": f"Father {i}", "F": "30,000", "G": "Civil", "N": f"37401-{i:07d}-1",
+            "Y": "0300-0000000", "AL": "Islamabad",
+        })
+    return rows
+
+
+def make_vehicle_rows(n, offset=0):
+    return [{"A": str(i + 1), "B": f"VEH-{i:06d}", "C": "Pool car"} for i in range(offset, offset + n)]
+
+
+def make_client_rows(n, offset=0):
+    cities = ["Lahore", "Karachi", "Rawalpindi", "Peshawar", "Multan"]
+    return [{"#": i + 1, "Client Name": f"Client {i} Bank {cities[i % 5]}"} for i in range(offset, offset + n)]
+
+
+def legacy_clients(db, rows):
+    """Mirror of the old client-management /import-bulk: per-row name lookup + commit."""
+    for item in rows:
+        m = _client_from_import_row(item)
+        if m is None:
+            continue
+        if db.query(Client).filter(Client.client_name == m["client_name"]).first():
+            continue
+        db.add(Client(**m))
+        db.commit()
+
+
+def legacy_employee2(db, rows):
+    """Mirror of employees2 import-json / import_*.py: per-row checks, per-row commit."""
+    current_category = None
+    for row in rows:
+        a_val = str(row.get("A", "") or "").strip()
+        d_val = str(row.get("D", "") or "").strip()
+        if a_val == "#" or d_val == "Name":
+            continue
+        if a_val and not a_val.isdigit() and not d_val:
+            current_category = a_val
+            continue
+        if db.query(Employee2).filter(Employee2.fss_no == row.get("B")).first():
+            continue
+        db.add(Employee2(serial_no=a_val, fss_no=row.get("B"), rank=row.get("C"), name=d_val,
+                         father_name=row.get("E"), salary=row.get("F"), status=row.get("G"),
+                         cnic=row.get("N"), mobile_no=row.get("Y"), duty_location=row.get("AL"),
+                         category=current_category))
+        db.commit()
+
+
+def legacy_vehicles(db, rows):
+    """Mirror of vehicles /import-bulk: per-row existence query + commit."""
+    for item in rows:
+        vehicle_id = item["B"]
+        if db.query(Vehicle).filter(Vehicle.vehicle_id == vehicle_id).first():
+            continue
+        db.add(Vehicle(vehicle_id=vehicle_id, vehicle_type="Car", category="Pool", make_model="Imported Vehicle",
+                       license_plate=vehicle_id, year=2024, status="Active", compliance="Compliant",
+                       government_permit="Standard"))
+        db.commit()
+
+
+def timed(label, n, fn):
+    t0 = time.perf_counter()
+    fn()
+    dt = time.perf_counter() - t0
+    print(f"  {label:<28} {n:>7} rows  {dt:8.3f}s  {n / dt if dt else 0:10.1f} rows/sec")
+    return dt
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+
+    print("=" * 80)
+    print(f"IMPORT BENCHMARK  ({n} rows per run, workers={workers}, db={_TMP_DB})")
+    print("=" * 80)
+
+    print("\nemployees2")
+    legacy = timed("legacy row-by-row", n, lambda: legacy_employee2(db, make_employee2_rows(n)))
+    text = json.dumps(make_employee2_rows(n, offset=n))
+    bulk = timed("app.importers bulk", n, lambda: run_import(db, entity="employees2", text=text, fmt="json", workers=workers))
+    print(f"  speed-up: {legacy / bulk:.1f}x")
+
+    print("\nvehicles")
+    legacy = timed("legacy row-by-row", n, lambda: legacy_vehicles(db, make_vehicle_rows(n)))
+    text = json.dumps(make_vehicle_rows(n, offset=n))
+    bulk = timed("app.importers bulk", n, lambda: run_import(db, entity="vehicles", text=text, fmt="json", workers=workers))
+    print(f"  speed-up: {legacy / bulk:.1f}x")
+
+    print("\nclients (client-management /import-bulk)")
+    legacy = timed("legacy row-by-row", n, lambda: legacy_clients(db, make_client_rows(n)))
+    rows = make_client_rows(n, offset=n)
+    bulk = timed("batched import_client_rows", n, lambda: import_client_rows(db, rows))
+    print(f"  speed-up: {legacy / bulk:.1f}x")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Concurrency check for inventory stock mutations.
+
+Many threads, each with its own database session, hammer the general and
+restricted issue/return handlers for the same items and employees. At the
+end stock + issued balances must equal the starting stock, no quantity may
+go negative, and the balances must match the ISSUE/RETURN ledger. The
+"naive" run repeats the exercise with the old read-modify-write pattern to
+show the lost updates it suffers.
+
+Runs against a throwaway SQLite database unless DATABASE_URL is given.
+
+Usage (from backend/):
+    python stress_inventory_concurrency.py [threads] [ops_per_thread]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+if "DATABASE_URL" not in os.environ:
+    _TMP_DB = os.path.join(tempfile.mkdtemp(prefix="inventory-stress-"), "stress.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DB}"
+
+from fastapi import HTTPException  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.api.routes import general_inventory, restricted_inventory  # noqa: E402
+from app.models.employee import Employee  # noqa: E402
+from app.models.general_item import GeneralItem  # noqa: E402
+from app.models.general_item_employee_balance import GeneralItemEmployeeBalance  # noqa: E402
+from app.models.general_item_transaction import GeneralItemTransaction  # noqa: E402
+from app.models.restricted_item import RestrictedItem  # noqa: E402
+from app.models.restricted_item_employee_balance import RestrictedItemEmployeeBalance  # noqa: E402
+from app.models.restricted_item_transaction import RestrictedItemTransaction  # noqa: E402
+from app.schemas.general_inventory import IssueRequest as GeneralIssue, ReturnRequest as GeneralReturn  # noqa: E402
+from app.schemas.restricted_inventory import IssueRequest as RestrictedIssue, ReturnRequest as RestrictedReturn  # noqa: E402
+import app.models  # noqa: E402,F401
+
+STOCK = 40.0
+EMPLOYEES = [f"STRESS-{i:02d}" for i in range(6)]
+
+KINDS = {
+    "general": (
+        GeneralItem,
+        GeneralItemEmployeeBalance,
+        GeneralItemTransaction,
+        general_inventory.issue_item,
+        general_inventory.return_item,
+        GeneralIssue,
+        GeneralReturn,
+    ),
+    "restricted": (
+        RestrictedItem,
+        RestrictedItemEmployeeBalance,
+        RestrictedItemTransaction,
+        restricted_inventory.issue_item,
+        restricted_inventory.return_item,
+        RestrictedIssue,
+        RestrictedReturn,
+    ),
+}
+
+
+def setup():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        for model, balance, tx, *_ in KINDS.values():
+            db.query(tx).delete()
+            db.query(balance).delete()
+            db.query(model).delete()
+        db.query(Employee).filter(Employee.employee_id.in_(EMPLOYEES)).delete(synchronize_session=False)
+        for emp in EMPLOYEES:
+            db.add(Employee(employee_id=emp, first_name="Stress", last_name=emp))
+        db.add(GeneralItem(item_code="STRESS-G", category="other", name="Stress general", quantity_on_hand=STOCK))
+        db.add(RestrictedItem(item_code="STRESS-R", category="ammo", name="Stress restricted", quantity_on_hand=STOCK))
+        db.commit()
+    finally:
+        db.close()
+
+
+def naive_issue(db, model, balance, emp, code):
+    # The pre-fix pattern: read into Python, check, write back.
+    item = db.query(model).filter(model.item_code == code).first()
+    if float(item.quantity_on_hand) < 1:
+        raise HTTPException(status_code=400, detail="Not enough stock")
+    bal = db.query(balance).filter(balance.employee_id == emp, balance.item_code == code).first()
+    if bal is None:
+        bal = balance(employee_id=emp, item_code=code, quantity_issued=0.0)
+        db.add(bal)
+    time.sleep(0.001)
+    item.quantity_on_hand = float(item.quantity_on_hand) - 1
+    bal.quantity_issued = float(bal.quantity_issued or 0.0) + 1
+    db.commit()
+
+
+def worker(kind, code, ops, naive, stats, lock):
+    model, balance, _tx, issue, ret, issue_req, return_req = KINDS[kind]
+    rnd = random.Random()
+    db = SessionLocal()
+    local = {"issued": 0, "returned": 0, "rejected": 0, "errors": 0}
+    # Only return what this thread issued, so every return is backed by a held unit
+    # (returning more than is held floors the balance at 0 by design).
+    held = {emp: 0 for emp in EMPLOYEES}
+    try:
+        for _ in range(ops):
+            emp = rnd.choice(EMPLOYEES)
+            try:
+                if naive:
+                    naive_issue(db, model, balance, emp, code)
+                    local["issued"] += 1
+                elif rnd.random() < 0.6 or not held[emp]:
+                    asyncio.run(issue(code, issue_req(employee_id=emp, quantity=1), db))
+                    held[emp] += 1
+                    local["issued"] += 1
+                else:
+                    asyncio.run(ret(code, return_req(employee_id=emp, quantity=1), db))
+                    held[emp] -= 1
+                    local["returned"] += 1
+            except HTTPException:
+                db.rollback()
+                local["rejected"] += 1
+            except Exception:
+                db.rollback()
+                local["errors"] += 1
+    finally:
+        db.close()
+    with lock:
+        for k, v in local.items():
+            stats[k] += v
+
+
+def check(kind, code):
+    model, balance, tx, *_ = KINDS[kind]
+    db = SessionLocal()
+    try:
+        on_hand = float(db.query(model.quantity_on_hand).filter(model.item_code == code).scalar())
+        issued = float(db.query(func.coalesce(func.sum(balance.quantity_issued), 0.0)).filter(balance.item_code == code).scalar())
+        negative = db.query(func.count(balance.id)).filter(balance.item_code == code, balance.quantity_issued < 0).scalar()
+        duplicates = (
+            db.query(balance.employee_id)
+            .filter(balance.item_code == code)
+            .group_by(balance.employee_id)
+            .having(func.count(balance.id) > 1)
+            .count()
+        )
+        ledger = {
+            action: float(q or 0.0)
+            for action, q in db.query(tx.action, func.sum(tx.quantity)).filter(tx.item_code == code).group_by(tx.action)
+        }
+    finally:
+        db.close()
+    return {
+        "on_hand": on_hand,
+        "issued": issued,
+        "conserved": abs(on_hand + issued - STOCK) < 1e-9,
+        "negative_balances": negative,
+        "duplicate_balance_rows": duplicates,
+        "ledger_matches": abs(ledger.get("ISSUE", 0.0) - ledger.get("RETURN", 0.0) - issued) < 1e-9,
+    }
+
+
+def run(kind, threads, ops, naive=False):
+    setup()
+    code = "STRESS-G" if kind == "general" else "STRESS-R"
+    stats = {"issued": 0, "returned": 0, "rejected": 0, "errors": 0}
+    lock = threading.Lock()
+    pool = [threading.Thread(target=worker, args=(kind, code, ops, naive, stats, lock)) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    result = check(kind, code)
+    label = f"{kind}{' (naive)' if naive else ''}"
+    print(f"{label:<22} {elapsed:6.2f}s  {stats}")
+    print(f"{'':<22} {result}")
+    if naive:
+        # Successful naive issues vs what actually left stock.
+        print(f"{'':<22} issues acknowledged={stats['issued']}  stock consumed={STOCK - result['on_hand']:.0f}")
+    return result
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    ops = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    print(f"database: {engine.url}")
+    print(f"{threads} threads x {ops} ops, starting stock {STOCK:.0f}\n")
+
+    ok = True
+    for kind in KINDS:
+        r = run(kind, threads, ops)
+        ok = ok and r["conserved"] and r["ledger_matches"] and not r["negative_balances"] and not r["duplicate_balance_rows"]
+    print()
+    run("general", threads, max(ops // 4, 5), naive=True)
+    print("\nOK: no lost updates" if ok else "\nFAILED: stock or balances drifted")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())